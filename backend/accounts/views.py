@@ -1,5 +1,6 @@
 from django.utils import timezone
 from django.contrib.auth import authenticate
+from django.views.decorators.cache import never_cache
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -13,11 +14,12 @@ from .tokens import CustomTokenObtainPairSerializer
 from .permissions import IsAuthenticatedUser
 from audit.services import log_action
 
-from records.services import submissions_count_for_year
+from records.services import YEARLY_LIMIT, submission_year, submissions_count_for_year
 
 class TokenView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+@never_cache
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def register(request):
@@ -41,6 +43,7 @@ def register(request):
         "refresh": str(refresh),
     }, status=status.HTTP_201_CREATED)
 
+@never_cache
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def login(request):
@@ -65,6 +68,7 @@ def login(request):
         "role": user.role,
     })
 
+@never_cache
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def refresh(request):
@@ -77,13 +81,13 @@ def refresh(request):
     except Exception:
         return Response({"error": "INVALID_REFRESH"}, status=401)
 
+@never_cache
 @api_view(["GET"])
 @permission_classes([IsAuthenticatedUser])
 def me(request):
-    now = timezone.localtime(timezone.now())
-    year = now.year
+    year = submission_year()
     cnt = submissions_count_for_year(request.user.uid, year)
-    remaining = max(0, 2 - cnt)
+    remaining = max(0, YEARLY_LIMIT - cnt)
     return Response({
         "user_id": request.user.uid,
         "email": request.user.email,
@@ -1,87 +1,252 @@
 import csv
+import os
+from datetime import datetime
 from io import TextIOWrapper
 from decimal import Decimal
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
 from accounts.models import Person
+from records.dictionary import dictionary
 from records.models import SalaryRecord, EXPERIENCE_CHOICES
+from dashboard.events import records_added
+from dashboard.rollups import DIMENSIONS, ID_FIELDS
+from .models import ImportFailureRow
+from .parallel import validate_file
 
 EXPERIENCE_SET = set([c[0] for c in EXPERIENCE_CHOICES])
 
 REQUIRED_FIELDS = ["email","University","Major","Industry","Occupation","Experience","City","Salary","Submission_Date"]
+MAX_NAME_LENGTH = 255  # records.models.Dimension.name
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y")
+DATE_SAMPLE = 1000  # rows used to detect a file's date format
 
 def parse_date(s: str):
     # Accept common formats: YYYY-MM-DD, MM/DD/YYYY, DD/MM/YYYY (best-effort)
     s = (s or "").strip()
     if not s:
         return None
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y"):
+    for fmt in DATE_FORMATS:
         try:
-            from datetime import datetime
             dt = datetime.strptime(s, fmt)
             return timezone.make_aware(dt)
         except Exception:
             pass
     return None
 
-def import_csv(file_obj, batch, admin_user):
-    wrapper = TextIOWrapper(file_obj, encoding="utf-8-sig")
-    reader = csv.DictReader(wrapper)
-    rows = list(reader)
-    batch.rows_total = len(rows)
-    batch.save(update_fields=["rows_total"])
+def detect_date_format(values):
+    """The first of DATE_FORMATS that parses every non-empty value, e.g. DD/MM/YYYY once a day exceeds 12."""
+    values = [v for v in {(v or "").strip() for v in values} if v]
+    for fmt in DATE_FORMATS:
+        try:
+            for v in values:
+                datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+        return fmt if values else None
+    return None
+
+class DateParser:
+    """parse_date for one file: values in the detected format are split and converted directly,
+    anything else falls back to parse_date. Results are memoised, as dates repeat heavily."""
+
+    FIELDS = {"%Y-%m-%d": ("-", (0, 1, 2)), "%m/%d/%Y": ("/", (2, 0, 1)), "%d/%m/%Y": ("/", (2, 1, 0))}
+    MEMO_SIZE = 10000
+
+    def __init__(self, fmt: str | None):
+        self.fields = self.FIELDS.get(fmt)
+        self.tz = timezone.get_current_timezone()
+        self.memo = {}
+
+    def __call__(self, s: str):
+        s = (s or "").strip()
+        if not s:
+            return None
+        dt = self.memo.get(s)
+        if dt is None:
+            dt = self._fast(s) or parse_date(s)
+            if len(self.memo) < self.MEMO_SIZE:
+                self.memo[s] = dt
+        return dt
+
+    def _fast(self, s: str):
+        if self.fields is None:
+            return None
+        sep, (y, m, d) = self.fields
+        parts = s.split(sep)
+        if len(parts) != 3 or not all(p.isdigit() for p in parts):
+            return None
+        try:
+            return datetime(int(parts[y]), int(parts[m]), int(parts[d]), tzinfo=self.tz)
+        except ValueError:
+            return None
+
+def parse_row(row, parse_dt=parse_date):
+    """Validate one CSV row; returns (email, {dimension: name}, salary, submission datetime)."""
+    # Basic required fields
+    for f in REQUIRED_FIELDS:
+        if f not in row:
+            raise ValueError(f"Missing column: {f}")
+
+    email = (row.get("email") or "").strip() or None
+    uni = (row.get("University") or "").strip()
+    major = (row.get("Major") or "").strip()
+    industry = (row.get("Industry") or "").strip()
+    occupation = (row.get("Occupation") or "").strip()
+    exp = (row.get("Experience") or "").strip()
+    city = (row.get("City") or "").strip()
+    salary_raw = (row.get("Salary") or "").strip()
+    sub_date_raw = (row.get("Submission_Date") or "").strip()
+
+    if exp not in EXPERIENCE_SET:
+        raise ValueError(f"Invalid Experience: {exp}")
+    if not all([uni, major, industry, occupation, city, salary_raw]):
+        raise ValueError("Empty required field")
+    dims = {
+        "university": uni,
+        "major": major,
+        "industry": industry,
+        "occupation": occupation,
+        "experience_category": exp,
+        "city": city,
+    }
+    if any(len(v) > MAX_NAME_LENGTH for v in dims.values()):
+        raise ValueError(f"Value longer than {MAX_NAME_LENGTH} characters")
+    if email and len(email) > 254:
+        raise ValueError("Invalid email")
+
+    try:
+        salary = Decimal(salary_raw)
+    except Exception:
+        raise ValueError(f"Invalid Salary: {salary_raw}")
+    if not salary.is_finite() or salary <= 0:
+        raise ValueError("Salary must be positive")
+    if salary.as_tuple().exponent < -2 or salary >= Decimal("1e10"):
+        raise ValueError(f"Invalid Salary: {salary_raw}")
 
-    successes = 0
-    failures = []
+    sub_dt = parse_dt(sub_date_raw) or timezone.now()
+    return email, dims, salary, sub_dt
 
-    for idx, row in enumerate(rows, start=2):  # header is row 1
+def read_rows(file_obj):
+    """Yield (row number, raw row) lazily."""
+    wrapper = TextIOWrapper(file_obj, encoding="utf-8-sig")
+    try:
+        yield from enumerate(csv.DictReader(wrapper), start=2)  # header is row 1
+    finally:
+        wrapper.detach()  # leave file_obj open for the caller
+
+def validate_rows(rows, parse_dt=parse_date):
+    """Yield (row number, parsed row or raw row, error or None)."""
+    for idx, row in rows:
         try:
-            # Basic required fields
-            for f in REQUIRED_FIELDS:
-                if f not in row:
-                    raise ValueError(f"Missing column: {f}")
-
-            email = (row.get("email") or "").strip() or None
-            uni = (row.get("University") or "").strip()
-            major = (row.get("Major") or "").strip()
-            industry = (row.get("Industry") or "").strip()
-            occupation = (row.get("Occupation") or "").strip()
-            exp = (row.get("Experience") or "").strip()
-            city = (row.get("City") or "").strip()
-            salary_raw = (row.get("Salary") or "").strip()
-            sub_date_raw = (row.get("Submission_Date") or "").strip()
-
-            if exp not in EXPERIENCE_SET:
-                raise ValueError(f"Invalid Experience: {exp}")
-            if not all([uni, major, industry, occupation, city, salary_raw]):
-                raise ValueError("Empty required field")
-
-            try:
-                salary = Decimal(salary_raw)
-            except Exception:
-                raise ValueError(f"Invalid Salary: {salary_raw}")
-            if salary <= 0:
-                raise ValueError("Salary must be positive")
-
-            sub_dt = parse_date(sub_date_raw) or timezone.now()
-
-            # Create Person (consumes global user_id)
-            person = Person.objects.create(email=email)
-
-            SalaryRecord.objects.create(
-                user=person,
-                batch=batch,
-                university=uni,
-                major=major,
-                industry=industry,
-                occupation=occupation,
-                experience_category=exp,
-                city=city,
-                salary_eur=salary,
-                submission_date=sub_dt,
-            )
-            successes += 1
+            yield idx, parse_row(row, parse_dt), None
         except Exception as e:
-            failures.append((idx, str(e), row))
+            yield idx, row, str(e)
+
+def _processes() -> int:
+    return settings.IMPORT_PROCESSES or os.cpu_count() or 1
+
+def _file_size(file_obj):
+    try:
+        return os.fstat(file_obj.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        return file_obj.getbuffer().nbytes
+    except AttributeError:
+        return None
+
+def validated(file_obj, skip: int = 0):
+    """Yield (row number, parsed or raw row, error or None, bytes read) in file order, skipping ``skip`` rows.
+
+    Files of at least two IMPORT_RANGE_BYTES ranges are split and validated in a process pool.
+    """
+    processes = _processes()
+    size = _file_size(file_obj)
+    if processes > 1 and size and size >= 2 * settings.IMPORT_RANGE_BYTES:
+        yield from validate_file(file_obj, skip, processes, settings.IMPORT_RANGE_BYTES, DATE_SAMPLE)
+        return
+
+    rows = read_rows(file_obj)
+    sample = list(islice(rows, DATE_SAMPLE))
+    parse_dt = DateParser(detect_date_format(row.get("Submission_Date") for _, row in sample))
+    for idx, parsed, err in validate_rows(chain(sample, rows), parse_dt):
+        if idx - 1 > skip:
+            yield idx, parsed, err, file_obj.tell()
+
+def chunked(iterable, size: int):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+def _write_bulk(batch, rows, memo):
+    # bulk_create returns the new Person ids, reserving one block per chunk
+    people = Person.objects.bulk_create([Person(email=email) for email, _, _, _ in rows])
+    return SalaryRecord.objects.bulk_create([
+        SalaryRecord(user=person, batch=batch, **dictionary.encode(dims, memo), salary_eur=salary, submission_date=when)
+        for person, (_, dims, salary, when) in zip(people, rows)
+    ])
+
+def _write_copy(batch, rows, memo):
+    # PostgreSQL: reserve a block of Person ids from the sequence, then COPY both tables
+    encoded = [dictionary.encode(dims, memo) for _, dims, _, _ in rows]  # may INSERT; not allowed mid-COPY
+    keys = [tuple(e[f] for f in ID_FIELDS) for e in encoded]
+    qn = connection.ops.quote_name
+    person_table = qn(Person._meta.db_table)
+    record_table = qn(SalaryRecord._meta.db_table)
+    dim_columns = ", ".join(qn(SalaryRecord._meta.get_field(d).column) for d in DIMENSIONS)
+    now = timezone.now()
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'user_id')) FROM generate_series(1, %s)",
+            [Person._meta.db_table, len(rows)],
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        with cur.copy(f"COPY {person_table} (user_id, email, created_at) FROM STDIN") as copy:
+            for uid, (email, _, _, _) in zip(ids, rows):
+                copy.write_row((uid, email, now))
+        with cur.copy(
+            f"COPY {record_table} (user_id, batch_id, {dim_columns}, salary_eur, submission_date, created_at) FROM STDIN"
+        ) as copy:
+            for uid, key, (_, _, salary, when) in zip(ids, keys, rows):
+                copy.write_row((uid, batch.batch_id, *key, salary, when, now))
+    return [key + (salary,) for key, (_, _, salary, _) in zip(keys, rows)]
+
+def import_csv(file_obj, batch, admin_user, chunk_size: int | None = None, on_chunk=None):
+    """Stream ``file_obj`` into ``batch``, committing every ``chunk_size`` rows.
+
+    Each chunk's records, failure rows, rollup deltas and the batch counters are written in
+    one transaction, so ``batch.rows_processed`` is a checkpoint: a rerun on the same batch
+    skips the rows already committed. ``on_chunk(batch)`` runs first in every chunk's
+    transaction and may raise to abort it. Returns (rows succeeded, rows failed) for the batch.
+    """
+    size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    use_copy = connection.vendor == "postgresql" and settings.IMPORT_COPY
+    write = _write_copy if use_copy else _write_bulk
+    memo = {}  # dimension ids resolved by this import
+
+    for chunk in chunked(validated(file_obj, batch.rows_processed), size):
+        good = [parsed for _, parsed, err, _ in chunk if err is None]
+        failed = [
+            ImportFailureRow(batch=batch, row_number=idx, error=err[:255], raw=raw)
+            for idx, raw, err, _ in chunk if err is not None
+        ]
+        with transaction.atomic():
+            if on_chunk is not None:
+                on_chunk(batch)
+            if good:
+                records_added(write(batch, good, memo))
+            ImportFailureRow.objects.bulk_create(failed, batch_size=1000)
+            batch.rows_success += len(good)
+            batch.rows_failed += len(failed)
+            batch.rows_processed += len(chunk)
+            batch.rows_total = batch.rows_processed
+            batch.bytes_read = chunk[-1][3]
+            batch.heartbeat_at = timezone.now()
+            batch.save(update_fields=["rows_total", "rows_success", "rows_failed", "rows_processed",
+                                      "bytes_read", "heartbeat_at"])
 
-    return successes, failures
+    return batch.rows_success, batch.rows_failed
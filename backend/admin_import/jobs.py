@@ -0,0 +1,111 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from dashboard.caching import warm_async
+from .csv_utils import import_csv
+from .models import ImportBatch
+
+logger = logging.getLogger(__name__)
+
+TERMINAL = ("SUCCESS", "PARTIAL", "FAILED")
+
+class LostClaim(Exception):
+    """Another worker took the batch over (this worker's heartbeat went stale)."""
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim(worker: str):
+    """Lock and take the oldest queued batch, or a running one whose worker stopped heartbeating."""
+    stale = timezone.now() - timedelta(seconds=settings.IMPORT_STALE_SECONDS)
+    with transaction.atomic():
+        batch = (
+            ImportBatch.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="QUEUED") | Q(status="RUNNING", heartbeat_at__lt=stale))
+            .exclude(file="")
+            .order_by("created_at")
+            .first()
+        )
+        if batch is None:
+            return None
+        now = timezone.now()
+        batch.status = "RUNNING"
+        batch.worker = worker
+        batch.resumed_from = batch.rows_processed
+        batch.started_at = now
+        batch.heartbeat_at = now
+        batch.error = ""
+        batch.save(update_fields=["status", "worker", "resumed_from", "started_at", "heartbeat_at", "error"])
+    return batch
+
+def _check_claim(batch):
+    # runs inside each chunk's transaction; the row lock also keeps claim() off the batch meanwhile
+    worker = ImportBatch.objects.select_for_update().filter(pk=batch.pk).values_list("worker", flat=True).first()
+    if worker != batch.worker:
+        raise LostClaim(f"batch {batch.pk} was taken over by {worker or 'nobody'}")
+
+def run(batch):
+    """Import a claimed batch from its checkpoint to the end of its file."""
+    try:
+        with batch.file.open("rb") as f:
+            successes, failed = import_csv(f.file, batch, batch.admin, on_chunk=_check_claim)
+    except LostClaim:
+        logger.warning("import batch %s lost to another worker", batch.pk)
+        return
+    except Exception as e:
+        # committed chunks stay; the stored file is kept so the batch can be resumed
+        logger.exception("import batch %s failed", batch.pk)
+        batch.status = "FAILED"
+        batch.error = str(e)[:255]
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=["status", "error", "finished_at"])
+        return
+
+    if successes == 0 and failed:
+        batch.status = "FAILED"
+    elif failed:
+        batch.status = "PARTIAL"
+    else:
+        batch.status = "SUCCESS"
+    batch.finished_at = timezone.now()
+    batch.file.delete(save=False)
+    batch.save(update_fields=["status", "finished_at", "file"])
+    if successes:
+        warm_async()
+
+def resume(batch) -> bool:
+    """Queue a failed batch again; it continues after its last committed chunk."""
+    return bool(
+        ImportBatch.objects.filter(pk=batch.pk, status="FAILED").exclude(file="")
+        .update(status="QUEUED", error="", finished_at=None)
+    )
+
+def progress(batch) -> dict:
+    elapsed = None
+    rate = None
+    if batch.started_at:
+        end = batch.finished_at or batch.heartbeat_at or batch.started_at
+        elapsed = (end - batch.started_at).total_seconds()
+        if elapsed > 0:
+            rate = (batch.rows_processed - batch.resumed_from) / elapsed
+    fraction = None
+    if batch.status in TERMINAL and not batch.error:
+        fraction = 1.0
+    elif batch.file_size:
+        fraction = min(batch.bytes_read / batch.file_size, 1.0)
+    eta = None
+    if rate and fraction and fraction < 1 and batch.rows_processed:
+        eta = batch.rows_processed * (1 - fraction) / fraction / rate
+    return {
+        "progress": fraction,
+        "rows_per_second": rate,
+        "elapsed_seconds": elapsed,
+        "eta_seconds": eta,
+    }
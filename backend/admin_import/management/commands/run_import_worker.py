@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from admin_import import jobs
+
+class Command(BaseCommand):
+    help = (
+        "Process queued CSV imports. Any number of workers can run side by side; a batch whose "
+        "worker stops heartbeating is taken over and resumed after its last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the queue until it is empty, then exit.")
+        parser.add_argument("--poll", type=float, default=None, help="Seconds between queue polls when idle.")
+
+    def handle(self, *args, **options):
+        poll = options["poll"] or settings.IMPORT_WORKER_POLL_SECONDS
+        worker = jobs.worker_name()
+        self.stdout.write(f"import worker {worker} started")
+        while True:
+            close_old_connections()
+            try:
+                batch = jobs.claim(worker)
+            except DatabaseError as e:
+                # database restarting or not migrated yet
+                self.stderr.write(f"cannot claim an import: {e}")
+                batch = None
+            if batch is None:
+                if options["once"]:
+                    return
+                time.sleep(poll)
+                continue
+            self.stdout.write(f"batch {batch.pk}: {batch.filename} from row {batch.rows_processed + 1}")
+            jobs.run(batch)
+            batch.refresh_from_db()
+            self.stdout.write(
+                f"batch {batch.pk}: {batch.status}, {batch.rows_success} imported, {batch.rows_failed} failed"
+            )
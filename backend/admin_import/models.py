@@ -5,15 +5,34 @@ class ImportBatch(models.Model):
     batch_id = models.BigAutoField(primary_key=True)
     admin = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="import_batches")
     filename = models.CharField(max_length=255, blank=True, default="")
-    status = models.CharField(max_length=16, default="RUNNING")  # RUNNING|SUCCESS|PARTIAL|FAILED
+    status = models.CharField(max_length=16, default="QUEUED")  # QUEUED|RUNNING|SUCCESS|PARTIAL|FAILED
     rows_total = models.IntegerField(default=0)
     rows_success = models.IntegerField(default=0)
     rows_failed = models.IntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)  # checkpoint: CSV data rows committed so far
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # background job state (admin_import.jobs)
+    file = models.FileField(upload_to="imports/%Y/%m/", max_length=255, blank=True)  # removed once the import completes
+    file_size = models.BigIntegerField(default=0)
+    bytes_read = models.BigIntegerField(default=0)  # approximate, for progress
+    worker = models.CharField(max_length=255, blank=True, default="")
+    resumed_from = models.IntegerField(default=0)  # rows_processed when the current run started
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
 class ImportFailureRow(models.Model):
     id = models.BigAutoField(primary_key=True)
-    batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE, related_name="failures")
+    batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE, related_name="failures", db_index=False)
     row_number = models.IntegerField()
     error = models.CharField(max_length=255)
     raw = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        # failure reports stream in row order straight off this index
+        indexes = [models.Index(fields=["batch", "row_number"])]
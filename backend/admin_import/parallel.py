@@ -0,0 +1,99 @@
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+
+# Parallel parsing and validation of large CSV uploads. Only the standard library is imported
+# at module level: pool processes unpickle references to this module before Django is set up.
+
+BLOCK = 1 << 20
+
+def split_ranges(f, target: int) -> list:
+    """Byte ranges [start, end) of ``f`` holding whole CSV records, about ``target`` bytes each.
+
+    Cuts fall on newlines outside quoted fields (even number of quotes before them), so a
+    quoted value spanning lines stays in one range. The first range is the header record.
+    """
+    f.seek(0)
+    cuts = [0]
+    pos = 0  # file offset of data[0]
+    odd = False  # quote parity before data[i]
+    while data := f.read(BLOCK):
+        i = 0
+        while True:
+            want = cuts[-1] + target if len(cuts) > 1 else 0
+            k = data.find(b"\n", max(want - pos, i))
+            if k < 0:
+                break
+            odd ^= bool(data.count(b'"', i, k) & 1)
+            i = k + 1
+            if not odd:
+                cuts.append(pos + i)
+        odd ^= bool(data.count(b'"', i) & 1)
+        pos += len(data)
+    if cuts[-1] < pos:
+        cuts.append(pos)
+    return list(zip(cuts, cuts[1:]))
+
+def _records(data: bytes, header):
+    return csv.DictReader(io.StringIO(data.decode("utf-8")), fieldnames=header)
+
+def _init_worker():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+def parse_range(data: bytes, header, date_format):
+    """Validate the records in ``data``: (record count, [(record number in range, parsed or raw row, error)])."""
+    from .csv_utils import DateParser, validate_rows
+
+    rows = enumerate(_records(data, header), start=1)
+    results = list(validate_rows(rows, DateParser(date_format)))
+    return len(results), results
+
+def validate_file(f, skip: int, processes: int, range_bytes: int, sample_size: int):
+    """Yield (row number, parsed or raw row, error or None, bytes done) for ``f`` in row order.
+
+    Ranges are parsed by a pool of ``processes`` while earlier results are being consumed;
+    at most two ranges per process are in flight, so memory stays bounded.
+    """
+    from .csv_utils import detect_date_format
+
+    ranges = split_ranges(f, range_bytes)
+    if not ranges:
+        return
+    (_, header_end), body = ranges[0], iter(ranges[1:])
+    f.seek(0)
+    header = next(csv.reader(io.StringIO(f.read(header_end).decode("utf-8-sig"))), [])
+    first = ranges[1] if len(ranges) > 1 else (header_end, header_end)
+    f.seek(first[0])
+    sample = islice(_records(f.read(first[1] - first[0]), header), sample_size)
+    date_format = detect_date_format(r.get("Submission_Date") for r in sample)
+
+    pool = ProcessPoolExecutor(processes, mp_context=get_context("spawn"), initializer=_init_worker)
+    pending = deque()
+
+    def submit():
+        r = next(body, None)
+        if r is not None:
+            f.seek(r[0])
+            pending.append((r[1], pool.submit(parse_range, f.read(r[1] - r[0]), header, date_format)))
+
+    try:
+        for _ in range(processes * 2):
+            submit()
+        base = 1  # the header is row 1
+        while pending:
+            end, future = pending.popleft()
+            count, results = future.result()
+            submit()
+            for n, parsed, err in results:
+                if base + n - 1 > skip:
+                    yield base + n, parsed, err, end
+            base += count
+    finally:
+        pool.shutdown(cancel_futures=True)
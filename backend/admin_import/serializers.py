@@ -4,4 +4,5 @@ from .models import ImportBatch
 class ImportBatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = ImportBatch
-        fields = ["batch_id","status","filename","rows_total","rows_success","rows_failed","created_at"]
+        fields = ["batch_id","status","filename","rows_total","rows_success","rows_failed","rows_processed","created_at",
+                  "started_at","heartbeat_at","finished_at","error"]
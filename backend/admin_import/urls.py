@@ -1,9 +1,13 @@
 from django.urls import path
-from .views import create_import, list_imports, download_failures, delete_record_admin, delete_batch
+from .views import (
+    create_import, list_imports, import_status, resume_import, download_failures, delete_record_admin, delete_batch,
+)
 
 urlpatterns = [
     path("admin/imports", create_import),
     path("admin/imports/list", list_imports),
+    path("admin/imports/<int:batch_id>/status", import_status),
+    path("admin/imports/<int:batch_id>/resume", resume_import),
     path("admin/imports/<int:batch_id>/failures", download_failures),
     path("admin/records/<int:record_id>", delete_record_admin),
     path("admin/imports/<int:batch_id>", delete_batch),
@@ -1,7 +1,10 @@
 from io import StringIO
 import csv
+import json
+import zlib
 
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.response import Response
@@ -10,10 +13,12 @@ from rest_framework.parsers import MultiPartParser, FormParser
 
 from accounts.permissions import IsAdminRole
 from audit.services import log_action
+from dashboard.events import ROW_FIELDS, records_removed
 from .models import ImportBatch, ImportFailureRow
 from .serializers import ImportBatchSerializer
-from .csv_utils import import_csv
+from . import jobs
 from records.models import SalaryRecord
+from records.services import release_submission
 
 @api_view(["POST"])
 @permission_classes([IsAdminRole])
@@ -23,31 +28,41 @@ def create_import(request):
     if not f:
         return Response({"error": "MISSING_FILE"}, status=400)
 
-    batch = ImportBatch.objects.create(admin=request.user, filename=f.name, status="RUNNING")
+    # imported in the background by `manage.py run_import_worker`
+    batch = ImportBatch.objects.create(admin=request.user, filename=f.name, status="QUEUED", file=f, file_size=f.size)
     log_action(request.user, "ADMIN_IMPORT", "IMPORT_BATCH", target_id=batch.batch_id, metadata={"filename": f.name})
 
-    with transaction.atomic():
-        successes, failures = import_csv(f.file, batch, request.user)
-
-        for row_number, err, raw in failures:
-            ImportFailureRow.objects.create(batch=batch, row_number=row_number, error=err[:255], raw=raw)
+    return Response(_status_payload(batch), status=202)
 
-        batch.rows_success = successes
-        batch.rows_failed = len(failures)
-        batch.rows_total = successes + len(failures)
+def _status_payload(batch):
+    return {
+        **ImportBatchSerializer(batch).data,
+        **jobs.progress(batch),
+        "status_url": f"/api/admin/imports/{batch.batch_id}/status",
+        "failure_report_url": f"/api/admin/imports/{batch.batch_id}/failures" if batch.rows_failed else None,
+    }
 
-        if successes == 0 and failures:
-            batch.status = "FAILED"
-        elif failures:
-            batch.status = "PARTIAL"
-        else:
-            batch.status = "SUCCESS"
-        batch.save(update_fields=["rows_total","rows_success","rows_failed","status"])
+@api_view(["GET"])
+@permission_classes([IsAdminRole])
+def import_status(request, batch_id: int):
+    try:
+        batch = ImportBatch.objects.get(batch_id=batch_id)
+    except ImportBatch.DoesNotExist:
+        return Response({"error": "NOT_FOUND"}, status=404)
+    return Response(_status_payload(batch))
 
-    return Response({
-        **ImportBatchSerializer(batch).data,
-        "failure_report_url": f"/api/admin/imports/{batch.batch_id}/failures" if batch.rows_failed else None
-    }, status=201)
+@api_view(["POST"])
+@permission_classes([IsAdminRole])
+def resume_import(request, batch_id: int):
+    try:
+        batch = ImportBatch.objects.get(batch_id=batch_id)
+    except ImportBatch.DoesNotExist:
+        return Response({"error": "NOT_FOUND"}, status=404)
+    if not jobs.resume(batch):
+        return Response({"error": "NOT_RESUMABLE"}, status=400)
+    log_action(request.user, "ADMIN_IMPORT_RESUME", "IMPORT_BATCH", target_id=batch_id)
+    batch.refresh_from_db()
+    return Response(_status_payload(batch), status=202)
 
 @api_view(["GET"])
 @permission_classes([IsAdminRole])
@@ -63,14 +78,45 @@ def download_failures(request, batch_id: int):
     except ImportBatch.DoesNotExist:
         return Response({"error": "NOT_FOUND"}, status=404)
 
-    failures = ImportFailureRow.objects.filter(batch=batch).order_by("row_number")
-    output = StringIO()
-    writer = csv.writer(output)
+    content = _failure_csv(batch)
+    filename = f"import-{batch.batch_id}-failures.csv"
+    if request.query_params.get("gzip") in ("1", "true"):
+        response = StreamingHttpResponse(_gzipped(content), content_type="application/gzip")
+        filename += ".gz"
+    else:
+        response = StreamingHttpResponse(content, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+def _failure_csv(batch, rows_per_chunk: int = 1000):
+    # one encoded chunk per rows_per_chunk rows; the header goes out before the first query
+    buf = StringIO()
+    writer = csv.writer(buf)
     writer.writerow(["row_number","error","raw_json"])
-    for f in failures:
-        writer.writerow([f.row_number, f.error, f.raw])
-
-    return Response(output.getvalue(), content_type="text/csv")
+    yield buf.getvalue().encode()
+    failures = (
+        ImportFailureRow.objects.filter(batch=batch).order_by("row_number")
+        .values_list("row_number", "error", "raw").iterator(chunk_size=2000)
+    )
+    buf.seek(0)
+    buf.truncate()
+    for i, (row_number, error, raw) in enumerate(failures, start=1):
+        writer.writerow([row_number, error, json.dumps(raw, ensure_ascii=False)])
+        if i % rows_per_chunk == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+def _gzipped(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for i, chunk in enumerate(chunks):
+        # sync-flush the header chunk so the download starts immediately
+        out = z.compress(chunk) + (z.flush(zlib.Z_SYNC_FLUSH) if i == 0 else b"")
+        if out:
+            yield out
+    yield z.flush()
 
 @api_view(["DELETE"])
 @permission_classes([IsAdminRole])
@@ -80,8 +126,11 @@ def delete_record_admin(request, record_id: int):
     except SalaryRecord.DoesNotExist:
         return Response({"error": "NOT_FOUND"}, status=404)
 
-    rec.deleted_at = timezone.now()
-    rec.save(update_fields=["deleted_at"])
+    with transaction.atomic():
+        rec.deleted_at = timezone.now()
+        rec.save(update_fields=["deleted_at"])
+        release_submission(rec)
+        records_removed([rec])
     log_action(request.user, "ADMIN_DELETE_RECORD", "SALARY_RECORD", target_id=record_id)
     return Response(status=204)
 
@@ -93,7 +142,13 @@ def delete_batch(request, batch_id: int):
     except ImportBatch.DoesNotExist:
         return Response({"error": "NOT_FOUND"}, status=404)
 
-    SalaryRecord.objects.filter(batch=batch, deleted_at__isnull=True).update(deleted_at=timezone.now())
-    batch.delete()
+    live = SalaryRecord.objects.filter(batch=batch, deleted_at__isnull=True)
+    with transaction.atomic():
+        rows = list(live.values_list(*ROW_FIELDS))
+        live.update(deleted_at=timezone.now())
+        records_removed(rows)
+        batch.delete()
+    if batch.file:
+        batch.file.delete(save=False)
     log_action(request.user, "ADMIN_DELETE_BATCH", "IMPORT_BATCH", target_id=batch_id)
     return Response(status=204)
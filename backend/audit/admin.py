@@ -5,4 +5,7 @@ from .models import AuditLog
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ("audit_id", "created_at", "actor", "action", "target_type", "target_id")
     search_fields = ("action", "target_type", "target_id", "actor__email")
-    list_filter = ("action", "target_type", "created_at")
+    list_filter = ("created_at",)  # distinct action/target_type filters would scan the whole table
+    list_select_related = ("actor",)
+    ordering = ("-created_at", "-audit_id")
+    show_full_result_count = False
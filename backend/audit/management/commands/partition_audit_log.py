@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from audit import partitions
+
+class Command(BaseCommand):
+    help = (
+        "PostgreSQL: convert the audit log to monthly range partitions on created_at (once, copying "
+        "existing rows) and create the partitions for the coming months. Safe to rerun; schedule it monthly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Months to create beyond the current one.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(f"audit log partitioning needs PostgreSQL; {connection.vendor} keeps a single table")
+            return
+        if not partitions.is_partitioned():
+            copied = partitions.convert(options["ahead"])
+            self.stdout.write(self.style.SUCCESS(f"Partitioned {partitions.TABLE} ({copied} rows copied)."))
+        created = partitions.ensure_partitions(options["ahead"])
+        for name in created:
+            self.stdout.write(f"created {name}")
+        self.stdout.write(f"{len(partitions.partitions())} monthly partitions")
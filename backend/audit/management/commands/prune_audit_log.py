@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from audit import partitions
+
+class Command(BaseCommand):
+    help = (
+        "Remove audit log entries from before the last N whole months. Partitioned tables (see "
+        "partition_audit_log) drop old monthly partitions instead of deleting rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=None, help="Months to keep besides the current one.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be removed.")
+
+    def handle(self, *args, **options):
+        months = settings.AUDIT_RETENTION_MONTHS if options["months"] is None else options["months"]
+        if months < 0:
+            raise CommandError("--months must be >= 0")
+        cutoff = partitions.month_start(timezone.now(), -months)
+        dropped, deleted = partitions.prune(cutoff, dry_run=options["dry_run"])
+        verb = "would remove" if options["dry_run"] else "removed"
+        for name in dropped:
+            self.stdout.write(f"{verb} partition {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Entries before {cutoff:%Y-%m-%d}: {verb} {len(dropped)} partitions and {deleted} rows."
+        ))
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AuditLog(models.Model):
     audit_id = models.BigAutoField(primary_key=True)
@@ -9,18 +10,22 @@ class AuditLog(models.Model):
         null=True,
         blank=True,
         related_name="audit_logs",
+        db_index=False,  # covered by the (actor, created_at, audit_id) index
     )
     action = models.CharField(max_length=64)
     target_type = models.CharField(max_length=64)
     target_id = models.CharField(max_length=64, blank=True, default="")
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)  # set when the action happened, not when written
 
     class Meta:
+        # every list index ends in (created_at, audit_id): the /api/admin/audit keyset order
         indexes = [
-            models.Index(fields=["action"]),
+            models.Index(fields=["created_at", "audit_id"]),
+            models.Index(fields=["action", "created_at", "audit_id"]),
+            models.Index(fields=["target_type", "created_at", "audit_id"]),
+            models.Index(fields=["actor", "created_at", "audit_id"]),
             models.Index(fields=["target_type", "target_id"]),
-            models.Index(fields=["created_at"]),
         ]
 
     def __str__(self):
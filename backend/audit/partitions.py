@@ -0,0 +1,167 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+from .models import AuditLog
+
+# PostgreSQL monthly range partitions of the audit table on created_at (UTC month bounds).
+# Partitions are named <table>_pYYYYMM; rows outside every partition land in <table>_default.
+
+TABLE = AuditLog._meta.db_table
+DEFAULT = f"{TABLE}_default"
+
+def month_start(dt: datetime, offset: int = 0) -> datetime:
+    months = dt.year * 12 + dt.month - 1 + offset
+    return datetime(months // 12, months % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+def partition_name(lo: datetime) -> str:
+    return f"{TABLE}_p{lo:%Y%m}"
+
+def _literal(dt: datetime) -> str:
+    return f"'{dt.isoformat()}'"
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cur.fetchone() is not None
+
+def partitions() -> list:
+    """[(name, lower bound, upper bound)] of the monthly partitions, oldest first."""
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        names = [r[0] for r in cur.fetchall()]
+    out = []
+    for name in names:
+        suffix = name[len(TABLE) + 2:]
+        if name.startswith(f"{TABLE}_p") and len(suffix) == 6 and suffix.isdigit():
+            lo = datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=dt_timezone.utc)
+            out.append((name, lo, month_start(lo, 1)))
+    return sorted(out, key=lambda p: p[1])
+
+def create_partition(cur, lo: datetime):
+    hi = month_start(lo, 1)
+    name = partition_name(lo)
+    bounds = f"FROM ({_literal(lo)}) TO ({_literal(hi)})"
+    cur.execute(f"SELECT 1 FROM {DEFAULT} WHERE created_at >= {_literal(lo)} AND created_at < {_literal(hi)} LIMIT 1")
+    if cur.fetchone() is None:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}")
+        return name
+    # rows for this month already sit in the default partition: move them over, then attach
+    cur.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    cur.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT} WHERE created_at >= {_literal(lo)} AND created_at < {_literal(hi)} "
+        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+    )
+    cur.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+    return name
+
+def ensure_partitions(ahead: int, now: datetime | None = None) -> list:
+    """Create the partitions for this month and the next ``ahead`` months; returns the new names."""
+    now = now or datetime.now(dt_timezone.utc)
+    existing = {p[0] for p in partitions()}
+    created = []
+    with transaction.atomic(), connection.cursor() as cur:
+        for i in range(ahead + 1):
+            lo = month_start(now, i)
+            if partition_name(lo) not in existing:
+                created.append(create_partition(cur, lo))
+    return created
+
+def convert(ahead: int) -> int:
+    """Rebuild the plain audit table as a partitioned one (same columns, indexes and FKs); returns rows copied.
+
+    Takes an exclusive lock on the table for the duration of the copy.
+    """
+    legacy = f"{TABLE}_unpartitioned"
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        cur.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cur.fetchall()
+        cur.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass AND NOT x.indisprimary
+            """,
+            [TABLE],
+        )
+        indexes = cur.fetchall()
+        cur.execute("SELECT min(created_at), max(created_at) FROM " + TABLE)
+        first, last = cur.fetchone()
+
+        cur.execute(f"ALTER TABLE {TABLE} RENAME TO {legacy}")
+        for name, _ in foreign_keys:
+            cur.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {name}")
+        for name, _ in indexes:
+            cur.execute(f"DROP INDEX {name}")
+        cur.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {TABLE}_pkey TO {legacy}_pkey")
+
+        # the primary key of a partitioned table has to include the partition key
+        cur.execute(
+            f"CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING IDENTITY, "
+            f"PRIMARY KEY (audit_id, created_at)) PARTITION BY RANGE (created_at)"
+        )
+        cur.execute(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLE} DEFAULT")
+        now = datetime.now(dt_timezone.utc)
+        lo = month_start(first or now)
+        while lo <= month_start(now, ahead):
+            cur.execute(
+                f"CREATE TABLE {partition_name(lo)} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ({_literal(lo)}) TO ({_literal(month_start(lo, 1))})"
+            )
+            lo = month_start(lo, 1)
+        for name, definition in indexes:
+            cur.execute(definition.replace(f" ON public.{legacy} ", f" ON {TABLE} ").replace(f" ON {legacy} ", f" ON {TABLE} "))
+        for name, definition in foreign_keys:
+            cur.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+        cur.execute(f"INSERT INTO {TABLE} SELECT * FROM {legacy}")
+        copied = cur.rowcount
+        cur.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'audit_id'), (SELECT coalesce(max(audit_id), 0) + 1 FROM {TABLE}), false)",
+            [TABLE],
+        )
+        cur.execute(f"DROP TABLE {legacy}")
+    return copied
+
+def drop_before(cutoff: datetime, dry_run: bool = False) -> list:
+    """Detach and drop the partitions wholly older than ``cutoff``; returns their names."""
+    old = [name for name, _, hi in partitions() if hi <= cutoff]
+    if not dry_run:
+        with transaction.atomic(), connection.cursor() as cur:
+            for name in old:
+                cur.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+                cur.execute(f"DROP TABLE {name}")
+    return old
+
+def prune(cutoff: datetime, dry_run: bool = False, batch_size: int = 10000) -> tuple:
+    """Remove audit rows older than ``cutoff``: (partitions dropped, rows deleted).
+
+    Partitioned tables drop whole months and only DELETE from the default partition;
+    anywhere else rows are deleted in ``batch_size`` batches to keep transactions short.
+    """
+    if is_partitioned():
+        dropped = drop_before(cutoff, dry_run)
+        with connection.cursor() as cur:
+            if dry_run:
+                cur.execute(f"SELECT count(*) FROM {DEFAULT} WHERE created_at < %s", [cutoff])
+                return dropped, cur.fetchone()[0]
+            cur.execute(f"DELETE FROM {DEFAULT} WHERE created_at < %s", [cutoff])
+            return dropped, cur.rowcount
+    old = AuditLog.objects.filter(created_at__lt=cutoff)
+    if dry_run:
+        return [], old.count()
+    deleted = 0
+    while ids := list(old.order_by("created_at", "audit_id").values_list("pk", flat=True)[:batch_size]):
+        deleted += AuditLog.objects.filter(pk__in=ids).delete()[0]
+    return [], deleted
@@ -1,10 +1,25 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
 from .models import AuditLog
+from .writer import writer
 
 def log_action(actor, action: str, target_type: str, target_id: str = "", metadata: dict | None = None):
-    AuditLog.objects.create(
-        actor=actor,
+    entry = AuditLog(
+        actor_id=actor.pk if actor is not None else None,
         action=action,
         target_type=target_type,
         target_id=str(target_id) if target_id is not None else "",
         metadata=metadata or {},
+        created_at=timezone.now(),
     )
+    if getattr(settings, "AUDIT_WRITER_MODE", "async") == "sync":
+        entry.save()
+        return
+    # queued once the surrounding transaction (if any) commits, so rolled back actions stay unlogged
+    transaction.on_commit(lambda: writer.submit(entry))
+
+def flush(timeout: float | None = None) -> bool:
+    """Write all queued audit rows now (async mode); see audit.writer."""
+    return writer.flush(timeout)
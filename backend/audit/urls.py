@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import list_audit, export_audit
+
+urlpatterns = [
+    path("admin/audit", list_audit),
+    path("admin/audit/export", export_audit),
+]
@@ -0,0 +1,102 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from accounts.permissions import IsAdminRole
+from .models import AuditLog
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+FIELDS = ("audit_id", "created_at", "actor_id", "action", "target_type", "target_id", "metadata")
+
+class BadParam(ValueError):
+    pass
+
+def _filtered(params):
+    """AuditLog rows matching ?action=&target_type=&target_id=&actor=&since=&until= (since inclusive, until exclusive)."""
+    qs = AuditLog.objects.all()
+    for name in ("action", "target_type", "target_id"):
+        value = params.get(name)
+        if value:
+            qs = qs.filter(**{name: value})
+    actor = params.get("actor")
+    if actor:
+        if not actor.isdigit():
+            raise BadParam("INVALID_ACTOR")
+        qs = qs.filter(actor_id=int(actor))
+    for name, lookup in (("since", "created_at__gte"), ("until", "created_at__lt")):
+        value = params.get(name)
+        if value:
+            dt = parse_datetime(value)
+            if dt is None or dt.tzinfo is None:
+                raise BadParam(f"INVALID_{name.upper()}")
+            qs = qs.filter(**{lookup: dt})
+    return qs
+
+def _encode_cursor(created_at, audit_id) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{audit_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, audit_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        dt = parse_datetime(created_at)
+        if dt is None:
+            raise ValueError(created_at)
+        return dt, int(audit_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise BadParam("INVALID_CURSOR")
+
+@api_view(["GET"])
+@permission_classes([IsAdminRole])
+def list_audit(request):
+    """Newest first, keyset-paginated on (created_at, audit_id): ?cursor= takes the previous page's "next"."""
+    try:
+        qs = _filtered(request.query_params)
+        limit = int(request.query_params.get("limit") or DEFAULT_LIMIT)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            created_at, audit_id = _decode_cursor(cursor)
+            # the redundant created_at__lte bound keeps this an index range scan (and prunes partitions)
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, audit_id__lt=audit_id),
+                           created_at__lte=created_at)
+    except BadParam as e:
+        return Response({"error": str(e)}, status=400)
+    except ValueError:
+        return Response({"error": "INVALID_LIMIT"}, status=400)
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    rows = list(qs.order_by("-created_at", "-audit_id").values(*FIELDS, actor_email=F("actor__email"))[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["audit_id"])
+    return Response({"results": rows, "next": next_cursor})
+
+@api_view(["GET"])
+@permission_classes([IsAdminRole])
+def export_audit(request):
+    """Every matching entry as newline-delimited JSON, oldest first, streamed."""
+    try:
+        qs = _filtered(request.query_params)
+    except BadParam as e:
+        return Response({"error": str(e)}, status=400)
+    response = StreamingHttpResponse(_ndjson(qs.order_by("created_at", "audit_id")), content_type="application/x-ndjson")
+    response["Content-Disposition"] = 'attachment; filename="audit.ndjson"'
+    return response
+
+def _ndjson(qs, rows_per_chunk: int = 1000):
+    lines = []
+    for row in qs.values(*FIELDS).iterator(chunk_size=2000):
+        row["created_at"] = row["created_at"].isoformat()
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) == rows_per_chunk:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
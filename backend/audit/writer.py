@@ -0,0 +1,133 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+class AuditWriter:
+    """Buffers AuditLog rows and writes them with bulk_create from a background thread.
+
+    A batch is written once ``batch_size`` rows are waiting or ``interval`` seconds after its
+    first row, whichever comes first. When the queue is full the caller writes its row itself,
+    so events are never dropped for lack of space. Pending rows are flushed at interpreter exit.
+    """
+
+    def __init__(self, batch_size: int, interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._wake = threading.Event()
+
+    def _ensure_started(self):
+        # one thread per process; a forked worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.max_queue)
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name="audit-writer", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, entry):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._write([entry])
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Write everything queued so far; False if it did not finish within ``timeout``."""
+        if self._pid != os.getpid():
+            return True
+        self._wake.set()
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            time.sleep(0.01)
+        return True
+
+    def _take(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._wake.wait(remaining):
+                self._wake.clear()
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            try:
+                close_old_connections()
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        from .models import AuditLog
+
+        error = None
+        for _ in range(2):
+            try:
+                AuditLog.objects.bulk_create(batch)
+                return
+            except IntegrityError as e:
+                # an actor was deleted before the row was written: SET_NULL, as the FK would have
+                error = e
+                actors = {entry.actor_id for entry in batch if entry.actor_id is not None}
+                alive = set(get_user_model().objects.filter(pk__in=actors).values_list("pk", flat=True))
+                for entry in batch:
+                    if entry.actor_id not in alive:
+                        entry.actor_id = None
+            except Exception as e:
+                error = e
+                time.sleep(0.5)
+        # last resort: keep the events in the application log
+        logger.error(
+            "audit write failed; %d events not stored: %s",
+            len(batch),
+            json.dumps([_as_dict(e) for e in batch], default=str),
+            exc_info=error,
+        )
+
+def _as_dict(e) -> dict:
+    return {
+        "actor_id": e.actor_id, "action": e.action, "target_type": e.target_type,
+        "target_id": e.target_id, "metadata": e.metadata, "created_at": e.created_at,
+    }
+
+writer = AuditWriter(
+    batch_size=getattr(settings, "AUDIT_BATCH_SIZE", 500),
+    interval=getattr(settings, "AUDIT_FLUSH_INTERVAL", 1.0),
+    max_queue=getattr(settings, "AUDIT_QUEUE_SIZE", 10000),
+)
+atexit.register(writer.flush, 10)
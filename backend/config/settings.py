@@ -30,9 +30,11 @@ INSTALLED_APPS = [
     "records",
     "dashboard",
     "admin_import",
+    "metrics",
 ]
 
 MIDDLEWARE = [
+    "metrics.middleware.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -76,6 +78,7 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = "static/"
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", str(BASE_DIR / "media"))
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # CORS
@@ -83,6 +86,9 @@ CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "ht
 
 # Cache (Redis)
 REDIS_URL = os.getenv("REDIS_URL", "")
+# Without Redis, the processes of one host can share a memory-mapped cache file of this many MB
+# (SHARED_CACHE_PATH, default /dev/shm/salary-platform-cache); 0 keeps a LocMemCache per process
+SHARED_CACHE_MB = int(os.getenv("SHARED_CACHE_MB", "0"))
 if REDIS_URL:
     CACHES = {
         "default": {
@@ -92,9 +98,87 @@ if REDIS_URL:
             "TIMEOUT": 60,
         }
     }
+elif SHARED_CACHE_MB:
+    CACHES = {
+        "default": {
+            "BACKEND": "config.shmcache.SharedMemoryCache",
+            "LOCATION": os.getenv("SHARED_CACHE_PATH", ""),
+            "OPTIONS": {"SIZE": SHARED_CACHE_MB * 1024 * 1024},
+            "TIMEOUT": 60,
+        }
+    }
 else:
     CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
+# Dashboard analytics: "sql" scans records_salaryrecord live, "rollup" answers from dashboard rollup cells,
+# "snapshot" keeps an in-memory NumPy copy of the records per dataset version (needs numpy, works on SQLite)
+DASHBOARD_ENGINE = os.getenv("DASHBOARD_ENGINE", "sql")
+# Maintain the rollup cells on every record change; needed by the rollup engine and accuracy=approx
+# (served as exact when off). Run rebuild_rollups after turning it on
+DASHBOARD_ROLLUPS = os.getenv("DASHBOARD_ROLLUPS", "1" if DASHBOARD_ENGINE == "rollup" else "0") == "1"
+DASHBOARD_ROLLUP_BUCKET_EUR = int(os.getenv("DASHBOARD_ROLLUP_BUCKET_EUR", "500"))
+# Cached dashboard results are invalidated by dataset generations, so the TTL only bounds memory use
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", str(6 * 3600)))
+# A process-local cache (LocMemCache) never sees other processes' generation bumps: results and generations
+# then expire after this many seconds instead (dashboard.W001 warns about it)
+DASHBOARD_UNSHARED_CACHE_TTL = int(os.getenv("DASHBOARD_UNSHARED_CACHE_TTL", "60"))
+# Serve the previous result while a changed/expired key is recomputed in the background (0 disables)
+DASHBOARD_CACHE_STALE_TTL = int(os.getenv("DASHBOARD_CACHE_STALE_TTL", str(24 * 3600)))
+DASHBOARD_REFRESH_WORKERS = int(os.getenv("DASHBOARD_REFRESH_WORKERS", "2"))
+# Concurrent requests for the same missing result wait up to this many seconds for the one computing it,
+# in this process or (through a cache lock) another one, instead of running the query again (0 disables)
+DASHBOARD_SINGLE_FLIGHT_TIMEOUT = int(os.getenv("DASHBOARD_SINGLE_FLIGHT_TIMEOUT", "15"))
+# With Redis, dash:* keys are also kept in a per-process LRU of this many MB (0 disables) for at most
+# DASHBOARD_LOCAL_CACHE_TTL seconds; generation changes are broadcast over Redis pub/sub to every process
+DASHBOARD_LOCAL_CACHE_MB = float(os.getenv("DASHBOARD_LOCAL_CACHE_MB", "32"))
+DASHBOARD_LOCAL_CACHE_TTL = float(os.getenv("DASHBOARD_LOCAL_CACHE_TTL", "30"))
+# Results are cached as JSON response bodies; bodies of at least this size are zlib-compressed (0 disables)
+DASHBOARD_CACHE_COMPRESS_MIN_BYTES = int(os.getenv("DASHBOARD_CACHE_COMPRESS_MIN_BYTES", "1024"))
+# Warm the top-N most requested dashboard queries at start-up and after each import
+DASHBOARD_WARM_ON_START = os.getenv("DASHBOARD_WARM_ON_START", "1") == "1"
+DASHBOARD_WARM_TOP_N = int(os.getenv("DASHBOARD_WARM_TOP_N", "20"))
+DASHBOARD_HOT_FLUSH_SECONDS = 60
+DASHBOARD_HOT_HALF_LIFE = 3600
+# Dashboard GETs carry a strong ETag (dataset version + path + arguments) and may be cached by browsers and
+# shared caches for this many seconds; change DASHBOARD_ETAG_SALT when a deploy changes the response format
+DASHBOARD_HTTP_MAX_AGE = int(os.getenv("DASHBOARD_HTTP_MAX_AGE", "60"))
+DASHBOARD_ETAG_SALT = os.getenv("DASHBOARD_ETAG_SALT", "")
+# /api/dashboard/cohorts computes cohorts concurrently, each pool thread on its own DB connection
+DASHBOARD_COHORT_WORKERS = int(os.getenv("DASHBOARD_COHORT_WORKERS", "6"))
+DASHBOARD_MAX_COHORTS = 8
+# how often observed filter combinations are written to dashboard.FilterUsage (advise_indexes)
+DASHBOARD_FILTER_USAGE_FLUSH_SECONDS = 60
+
+# Per-endpoint query/cache/render metrics: Server-Timing headers and Prometheus text at /api/metrics.
+# Values are per process (labelled worker="<pid>") and are not combined across workers
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# when set, /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"; when unset it is
+# open only with DEBUG, otherwise it needs an ADMIN user's JWT
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Audit log writes: "async" queues rows for a background thread that bulk inserts them every
+# AUDIT_FLUSH_INTERVAL seconds or AUDIT_BATCH_SIZE rows (a hard crash loses at most that window);
+# "sync" inserts each row in the request, as tests and strict deployments may want
+AUDIT_WRITER_MODE = os.getenv("AUDIT_WRITER_MODE", "async")
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+# `manage.py prune_audit_log` keeps the current month plus this many previous months
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "24"))
+
+# CSV imports stream the upload and commit every IMPORT_CHUNK_SIZE rows; on PostgreSQL rows are
+# written with COPY unless IMPORT_COPY=0 (bulk INSERTs otherwise)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+IMPORT_COPY = os.getenv("IMPORT_COPY", "1") == "1"
+# Files of at least two IMPORT_RANGE_BYTES ranges are parsed and validated by IMPORT_PROCESSES
+# processes (0 = one per CPU, 1 = in the importing process)
+IMPORT_PROCESSES = int(os.getenv("IMPORT_PROCESSES", "0"))
+IMPORT_RANGE_BYTES = int(os.getenv("IMPORT_RANGE_BYTES", str(4 << 20)))
+# Uploads are stored under MEDIA_ROOT and imported by `manage.py run_import_worker`; a RUNNING batch
+# without a heartbeat (one per committed chunk) for IMPORT_STALE_SECONDS is taken over and resumed
+IMPORT_WORKER_POLL_SECONDS = float(os.getenv("IMPORT_WORKER_POLL_SECONDS", "2"))
+IMPORT_STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", "120"))
+
 # Auth: custom user model
 AUTH_USER_MODEL = "accounts.Account"
 
@@ -104,12 +188,18 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "metrics.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=14),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Account's primary key is the user_id one-to-one field; it has no "id" attribute
+    "USER_ID_FIELD": "pk",
 }
 
 # Security defaults for dev
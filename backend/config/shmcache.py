@@ -0,0 +1,351 @@
+import fcntl
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from hashlib import blake2b
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+# A cache shared by the processes of one host through a memory-mapped file.
+#
+# The file is split into stripes; a key hashes to one stripe and lives there. Each stripe holds
+# a dense array of 8-byte key hashes (searched with mmap.find), a parallel array of slot records
+# and a data area the entries are appended to. Deleted entries leave holes that are compacted
+# away when the data area fills up. Eviction is LRU within the stripe, using a per-stripe access
+# clock. Every operation on a stripe holds its fcntl byte-range lock (between processes) and a
+# thread lock (fcntl locks belong to the process, so they do not exclude its own threads).
+
+MAGIC = b"SPCACHE1"
+HEADER = struct.Struct("<8sIIQ")  # magic, stripes, slots per stripe, data bytes per stripe
+STRIPE = struct.Struct("<IIQ")  # data bytes used, slots used, access clock
+SLOT = struct.Struct("<IIIdQ")  # data offset, key length, value length, expires (0: never), last access
+HASH = 8
+INIT_LOCK = 0  # lock offset serialising creation; stripe i locks offset i + 1
+
+def _default_location() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "salary-platform-cache")
+
+def _digest(key: str) -> bytes:
+    return blake2b(key.encode(), digest_size=HASH).digest()
+
+class _Segment:
+    """The mapped file of one LOCATION, shared by every cache instance (and thread) of the process."""
+
+    def __init__(self, path: str, stripes: int, slots: int, data_bytes: int):
+        self.path = path
+        self.stripes = stripes
+        self.slots = slots
+        self.data_bytes = data_bytes
+        self.stripe_size = STRIPE.size + slots * (HASH + SLOT.size) + data_bytes
+        self.size = HEADER.size + stripes * self.stripe_size
+        self.fd, self.map = self._open()
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def _open(self):
+        expected = HEADER.pack(MAGIC, self.stripes, self.slots, self.data_bytes)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            ready = False
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, INIT_LOCK, os.SEEK_SET)
+            try:
+                if os.fstat(fd).st_ino != _inode(self.path):
+                    continue  # replaced by another process while we waited
+                size = os.fstat(fd).st_size
+                if size == 0:
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, expected, 0)
+                elif size != self.size or os.pread(fd, HEADER.size, 0) != expected:
+                    # replacing it would split the workers between two caches
+                    raise ImproperlyConfigured(
+                        f"{self.path} was created with other SIZE/STRIPES/MAX_ENTRIES settings; stop every "
+                        "process using it, delete the file and start again"
+                    )
+                ready = True
+                return fd, mmap.mmap(fd, self.size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, INIT_LOCK, os.SEEK_SET)
+                if not ready:
+                    os.close(fd)
+
+    @contextmanager
+    def locked(self, i: int):
+        with self.locks[i]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, i + 1, os.SEEK_SET)
+            try:
+                yield _Stripe(self, i)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, i + 1, os.SEEK_SET)
+
+def _inode(path: str):
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+class _Stripe:
+    """Operations on one stripe; only valid while its lock is held."""
+
+    def __init__(self, seg: _Segment, i: int):
+        self.map = seg.map
+        self.slots = seg.slots
+        self.data_bytes = seg.data_bytes
+        self.base = HEADER.size + i * seg.stripe_size
+        self.hashes = self.base + STRIPE.size
+        self.records = self.hashes + seg.slots * HASH
+        self.data = self.records + seg.slots * SLOT.size
+        self.used, self.count, self.clock = STRIPE.unpack_from(self.map, self.base)
+
+    def _save(self):
+        STRIPE.pack_into(self.map, self.base, self.used, self.count, self.clock)
+
+    def _slot(self, n: int):
+        return SLOT.unpack_from(self.map, self.records + n * SLOT.size)
+
+    def find(self, digest: bytes, key: bytes):
+        """(slot number, slot record) of ``key``, or None; expired entries are removed."""
+        end = self.hashes + self.count * HASH
+        pos = self.map.find(digest, self.hashes, end)
+        while pos != -1:
+            n, misaligned = divmod(pos - self.hashes, HASH)
+            if not misaligned:
+                slot = self._slot(n)
+                offset, klen = self.data + slot[0], slot[1]
+                if self.map[offset:offset + klen] == key:
+                    if slot[3] and slot[3] <= time.time():
+                        self.remove(n)
+                        return None
+                    return n, slot
+            pos = self.map.find(digest, pos + 1, end)
+        return None
+
+    def read(self, n: int, slot) -> bytes:
+        self.clock += 1
+        SLOT.pack_into(self.map, self.records + n * SLOT.size, *slot[:4], self.clock)
+        self._save()
+        start = self.data + slot[0] + slot[1]
+        return self.map[start:start + slot[2]]
+
+    def write(self, n: int, slot, value: bytes):
+        # a value of the same size replaces the old one in place: nothing moves or is evicted
+        start = self.data + slot[0] + slot[1]
+        self.map[start:start + slot[2]] = value
+
+    def touch(self, n: int, slot, expires: float):
+        SLOT.pack_into(self.map, self.records + n * SLOT.size, slot[0], slot[1], slot[2], expires, slot[4])
+
+    def remove(self, n: int):
+        # keep the arrays dense: the last slot takes the freed place
+        last = self.count - 1
+        if n != last:
+            h, r = self.hashes, self.records
+            self.map[h + n * HASH:h + (n + 1) * HASH] = self.map[h + last * HASH:h + (last + 1) * HASH]
+            self.map[r + n * SLOT.size:r + (n + 1) * SLOT.size] = self.map[r + last * SLOT.size:r + (last + 1) * SLOT.size]
+        self.count = last
+        if not self.count:
+            self.used = 0
+        self._save()
+
+    def fits(self, key: bytes, value: bytes) -> bool:
+        # larger entries would flush most of the stripe
+        return len(key) + len(value) <= self.data_bytes // 2
+
+    def insert(self, digest: bytes, key: bytes, value: bytes, expires: float) -> bool:
+        if not self.fits(key, value):
+            return False
+        need = len(key) + len(value)
+        if self.count >= self.slots or self.used + need > self.data_bytes:
+            self._make_room(need)
+        offset = self.used
+        self.map[self.data + offset:self.data + offset + need] = key + value
+        self.clock += 1
+        self.map[self.hashes + self.count * HASH:self.hashes + (self.count + 1) * HASH] = digest
+        SLOT.pack_into(self.map, self.records + self.count * SLOT.size, offset, len(key), len(value), expires, self.clock)
+        self.count += 1
+        self.used += need
+        self._save()
+        return True
+
+    def _make_room(self, need: int):
+        # drop expired entries, then the least recently used until one more entry of ``need``
+        # bytes fits, and compact the survivors to the start of the data area
+        now = time.time()
+        live = []
+        for n in range(self.count):
+            slot = self._slot(n)
+            if not slot[3] or slot[3] > now:
+                h = self.hashes + n * HASH
+                live.append((slot, self.map[h:h + HASH]))
+        live.sort(key=lambda e: e[0][4], reverse=True)
+        kept, total = [], 0
+        for slot, digest in live:
+            size = slot[1] + slot[2]
+            if len(kept) + 1 >= self.slots or total + size + need > self.data_bytes:
+                break
+            kept.append((slot, digest))
+            total += size
+        kept.sort(key=lambda e: e[0][0])
+        offset = 0
+        for n, ((start, klen, vlen, expires, atime), digest) in enumerate(kept):
+            size = klen + vlen
+            if start != offset:
+                self.map.move(self.data + offset, self.data + start, size)
+            self.map[self.hashes + n * HASH:self.hashes + (n + 1) * HASH] = digest
+            SLOT.pack_into(self.map, self.records + n * SLOT.size, offset, klen, vlen, expires, atime)
+            offset += size
+        self.count = len(kept)
+        self.used = offset
+        self._save()
+
+    def clear(self):
+        self.used = self.count = 0
+        self._save()
+
+_segments = {}
+_segments_lock = threading.Lock()
+_segments_pid = None
+
+def _segment(path: str, stripes: int, slots: int, data_bytes: int) -> _Segment:
+    # one mapping per process; a forked worker opens its own (locks are not inherited)
+    global _segments_pid
+    with _segments_lock:
+        if _segments_pid != os.getpid():
+            _segments.clear()
+            _segments_pid = os.getpid()
+        args = (path, stripes, slots, data_bytes)
+        seg = _segments.get(args)
+        if seg is None:
+            seg = _segments[args] = _Segment(*args)
+        return seg
+
+class SharedMemoryCache(BaseCache):
+    """Django cache backend storing pickled values in a memory-mapped file shared by the host's processes.
+
+    ``LOCATION`` is the file (default /dev/shm/salary-platform-cache). OPTIONS: ``SIZE`` in bytes
+    (default 64 MiB), ``STRIPES`` (default 64) and ``MAX_ENTRIES`` (default one per KiB of SIZE).
+    ``incr``/``decr`` and ``add`` are atomic across processes.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        size = int(options.get("SIZE", 64 * 1024 * 1024))
+        stripes = int(options.get("STRIPES", 64))
+        max_entries = int(options.get("MAX_ENTRIES", size // 1024))
+        slots = max(1, -(-max_entries // stripes))
+        data_bytes = size // stripes - STRIPE.size - slots * (HASH + SLOT.size)
+        if data_bytes < 1024:
+            raise ValueError("SharedMemoryCache SIZE is too small for its STRIPES and MAX_ENTRIES")
+        self._args = (location or _default_location(), stripes, slots, data_bytes)
+        self._pid = None
+
+    @property
+    def _seg(self) -> _Segment:
+        if self._pid != os.getpid():
+            self._segment = _segment(*self._args)
+            self._pid = os.getpid()
+        return self._segment
+
+    def _locate(self, key, version):
+        key = self.make_key(key, version)  # as django-redis: no memcached key warnings
+        digest = _digest(key)
+        seg = self._seg
+        return seg, int.from_bytes(digest, "little") % seg.stripes, digest, key.encode()
+
+    def _expires(self, timeout) -> float:
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def get(self, key, default=None, version=None):
+        seg, i, digest, bkey = self._locate(key, version)
+        with seg.locked(i) as stripe:
+            found = stripe.find(digest, bkey)
+            if found is None:
+                return default
+            raw = stripe.read(*found)
+        return pickle.loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version, replace=True)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, replace=False)
+
+    def _store(self, key, value, timeout, version, replace: bool) -> bool:
+        seg, i, digest, bkey = self._locate(key, version)
+        raw = pickle.dumps(value, self.pickle_protocol)
+        expires = self._expires(timeout)
+        with seg.locked(i) as stripe:
+            found = stripe.find(digest, bkey)
+            if found is not None:
+                if not replace:
+                    return False
+                stripe.remove(found[0])
+            return stripe.insert(digest, bkey, raw, expires)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        seg, i, digest, bkey = self._locate(key, version)
+        with seg.locked(i) as stripe:
+            found = stripe.find(digest, bkey)
+            if found is None:
+                return False
+            stripe.touch(*found, self._expires(timeout))
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        seg, i, digest, bkey = self._locate(key, version)
+        with seg.locked(i) as stripe:
+            found = stripe.find(digest, bkey)
+            if found is None:
+                raise ValueError("Key '%s' not found" % key)
+            n, slot = found
+            value = pickle.loads(stripe.read(n, slot)) + delta
+            raw = pickle.dumps(value, self.pickle_protocol)
+            if len(raw) == slot[2]:
+                stripe.write(n, slot, raw)
+            elif stripe.fits(bkey, raw):
+                # insert makes room by evicting other entries, never this one
+                stripe.remove(n)
+                stripe.insert(digest, bkey, raw, slot[3])
+            else:
+                # dropping it would lose the counter (dataset generations): refuse instead
+                raise OverflowError(f"Key '{key}' incremented to a value too large for its cache stripe")
+        return value
+
+    def has_key(self, key, version=None):
+        seg, i, digest, bkey = self._locate(key, version)
+        with seg.locked(i) as stripe:
+            return stripe.find(digest, bkey) is not None
+
+    def delete(self, key, version=None):
+        seg, i, digest, bkey = self._locate(key, version)
+        with seg.locked(i) as stripe:
+            found = stripe.find(digest, bkey)
+            if found is None:
+                return False
+            stripe.remove(found[0])
+            return True
+
+    def clear(self):
+        seg = self._seg
+        for i in range(seg.stripes):
+            with seg.locked(i) as stripe:
+                stripe.clear()
+
+    def stats(self) -> dict:
+        """Entries and data bytes held, summed over the stripes."""
+        seg = self._seg
+        entries = used = 0
+        for i in range(seg.stripes):
+            with seg.locked(i) as stripe:
+                entries += stripe.count
+                used += stripe.used
+        return {"entries": entries, "bytes": used, "capacity": seg.stripes * seg.data_bytes}
@@ -7,4 +7,6 @@ urlpatterns = [
     path("api/", include("records.urls")),
     path("api/", include("dashboard.urls")),
     path("api/", include("admin_import.urls")),
+    path("api/", include("metrics.urls")),
+    path("api/", include("audit.urls")),
 ]
@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = "records_salaryrecord"
+
+_lock = threading.Lock()
+_seen = Counter()
+_last_flush = time.monotonic()
+
+def observe(dims):
+    """Count one records query filtered on ``dims``; flushed to FilterUsage periodically."""
+    global _last_flush
+    key = ",".join(sorted(dims))
+    with _lock:
+        _seen[key] += 1
+        due = time.monotonic() - _last_flush >= getattr(settings, "DASHBOARD_FILTER_USAGE_FLUSH_SECONDS", 60)
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        try:
+            flush()
+        except Exception:
+            logger.exception("filter usage flush failed")
+
+def flush():
+    from .models import FilterUsage
+
+    with _lock:
+        seen = dict(_seen)
+        _seen.clear()
+    now = timezone.now()
+    for key, n in seen.items():
+        if FilterUsage.objects.filter(dimensions=key).update(hits=F("hits") + n, last_seen=now):
+            continue
+        try:
+            with transaction.atomic():
+                FilterUsage.objects.create(dimensions=key, hits=n, last_seen=now)
+        except IntegrityError:
+            # another process created it first
+            FilterUsage.objects.filter(dimensions=key).update(hits=F("hits") + n, last_seen=now)
+
+def existing_indexes():
+    """{index name: (key columns, partial on live rows)} for the records table (Postgres)."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [TABLE])
+        rows = cur.fetchall()
+    out = {}
+    for name, definition in rows:
+        cols = definition.split("(", 1)[1].split(")", 1)[0]
+        out[name] = (tuple(c.strip().strip('"') for c in cols.split(",")), "deleted_at IS NULL" in definition)
+    return out
+
+def covered(columns, indexes) -> bool:
+    # a live partial index whose leading key columns are exactly these columns, in any order
+    want = set(columns)
+    return any(partial and set(keys[: len(want)]) == want for keys, partial in indexes.values())
+
+def index_sql(columns, name) -> str:
+    cols = ", ".join(columns)
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {TABLE} ({cols}) "
+        f"INCLUDE (salary_eur) WHERE deleted_at IS NULL"
+    )
@@ -1,5 +1,20 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 class DashboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dashboard"
+
+    def ready(self):
+        from . import checks  # registers the system checks
+
+        # warm the hot dashboard keys in servers only, not in one-off management commands
+        command = sys.argv[1] if len(sys.argv) > 1 else ""
+        if os.path.basename(sys.argv[0]) == "manage.py" and command != "runserver":
+            return
+        if getattr(settings, "DASHBOARD_WARM_ON_START", False):
+            from .caching import warm_async
+            warm_async(delay=getattr(settings, "DASHBOARD_WARM_DELAY_SECONDS", 5))
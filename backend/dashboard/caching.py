@@ -0,0 +1,324 @@
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from metrics.registry import cache_event
+from records.dictionary import MISS_TTL
+from . import payload
+from .dataset import cache_key, cache_ttl, lock_key, stale_key
+from .filters import FilterParams, filter_values, has_unknown_values, normalize_key
+from .localcache import cache
+
+logger = logging.getLogger(__name__)
+
+HOT_KEY = "dash:hot"
+# cache kind -> services function that recomputes it
+SERVICE_FUNCS = {
+    "summary": "summary",
+    "options": "options",
+    "grouped": "grouped",
+    "dist": "distribution",
+    "bundle": "bundle",
+    "pivot": "pivot",
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_inflight = set()
+_flights = {}  # key -> _Flight of the caller computing it in this process
+_UNSET = object()
+_hits = Counter()
+_specs = {}
+_last_flush = time.monotonic()
+_executor = None
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+def cached(kind: str, params, parts: tuple, compute, raw: bool = False, disjunctive: bool = False):
+    """Return the cached result for (kind, parts, params), computing it on a miss.
+
+    Results are cached as their JSON response body (see dashboard.payload); ``raw`` returns
+    that body as bytes instead of the decoded value. When only the stale copy exists (the
+    generation moved or the TTL ran out) it is returned immediately and the fresh value is
+    recomputed on a background thread. Concurrent misses on one key compute it once.
+    ``disjunctive`` marks results that count records outside a filter (see dataset.generation).
+
+    A filter on a name the lookup tables do not know matches nothing. Such results are kept
+    for MISS_TTL seconds only, without a stale copy: the name may be created by another
+    process at any moment (records.dictionary remembers misses as long).
+    """
+    _track(kind, params, parts)
+    key = cache_key(kind, params, *parts, disjunctive=disjunctive)
+    hit = cache.get(key)
+    if hit is not None:
+        cache_event(f"dash:{kind}", "hit")
+        return _result(hit, raw)
+
+    skey = None if has_unknown_values(params) else stale_key(kind, params, *parts)
+    # results composed of other cached results (bundle) must not be built from stale parts
+    if skey and _setting("DASHBOARD_CACHE_STALE_TTL", 0) and not getattr(_local, "computing", 0):
+        stale = cache.get(skey)
+        if stale is not None:
+            cache_event(f"dash:{kind}", "stale")
+            _local.stale = True
+            _refresh_async(key, skey, compute)
+            return _result(stale, raw)
+    body, value = _single_flight(kind, key, skey, compute)
+    if raw:
+        return body
+    return payload.loads(body) if value is _UNSET else value
+
+class _Flight:
+    __slots__ = ("done", "body")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+
+def _single_flight(kind, key, skey, compute):
+    """(JSON body, value or _UNSET) for a missing key, computed once however many callers want it.
+
+    The first caller in the process holds the flight and the others wait for its body. Across
+    processes the flight holder takes lock_key(key) with cache.add; if another process has it,
+    the holder polls the cache for that process's result instead. Nobody waits longer than
+    DASHBOARD_SINGLE_FLIGHT_TIMEOUT seconds (0 disables coalescing); then it computes itself.
+    """
+    timeout = _setting("DASHBOARD_SINGLE_FLIGHT_TIMEOUT", 0)
+    if not timeout:
+        return _compute_and_store(kind, key, skey, compute)
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        if flight.done.wait(timeout) and flight.body is not None:
+            cache_event(f"dash:{kind}", "coalesced")
+            return flight.body, _UNSET
+        return _compute_and_store(kind, key, skey, compute)
+    try:
+        body, value = _lead(kind, key, skey, compute, timeout)
+        flight.body = body
+        return body, value
+    finally:
+        with _lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+def _lead(kind, key, skey, compute, timeout):
+    lock = lock_key(key)
+    token = uuid.uuid4().hex
+    if not cache.add(lock, token, timeout):
+        entry = _await(key, timeout)
+        if entry is not None:
+            cache_event(f"dash:{kind}", "coalesced")
+            return payload.body(entry), _UNSET
+    try:
+        return _compute_and_store(kind, key, skey, compute)
+    finally:
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+def _await(key, timeout):
+    # another process is computing key: poll for its result with backoff
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        delay = min(delay * 2, 0.2)
+    return None
+
+def _compute_and_store(kind, key, skey, compute):
+    cache_event(f"dash:{kind}", "miss")
+    value = _compute(compute)
+    body = payload.dumps(value)
+    _store(key, skey, payload.pack(body))
+    return body, value
+
+def _result(entry, raw):
+    body = payload.body(entry)
+    return body if raw else payload.loads(body)
+
+def reset_stale():
+    _local.stale = False
+
+def mark_stale():
+    _local.stale = True
+
+def served_stale() -> bool:
+    """Whether a stale result was returned on this thread since reset_stale()."""
+    return getattr(_local, "stale", False)
+
+def _compute(compute):
+    _local.computing = getattr(_local, "computing", 0) + 1
+    try:
+        return compute()
+    finally:
+        _local.computing -= 1
+
+def _store(key, skey, entry):
+    if skey is None:
+        # filtered on an unknown name (see cached)
+        cache.set(key, entry, MISS_TTL)
+        return
+    cache.set(key, entry, cache_ttl())
+    stale_ttl = _setting("DASHBOARD_CACHE_STALE_TTL", 0)
+    if stale_ttl:
+        cache.set(skey, entry, stale_ttl)
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_setting("DASHBOARD_REFRESH_WORKERS", 2),
+                thread_name_prefix="dash-refresh",
+            )
+        return _executor
+
+def _refresh_async(key, skey, compute):
+    with _lock:
+        if key in _inflight:
+            return
+        _inflight.add(key)
+    _pool().submit(_refresh, key, skey, compute)
+
+def _refresh(key, skey, compute):
+    try:
+        _store(key, skey, payload.encode(_compute(compute)))
+    except Exception:
+        logger.exception("dashboard refresh failed for %s", key)
+    finally:
+        with _lock:
+            _inflight.discard(key)
+        connections.close_all()
+
+def _track(kind, params, parts):
+    global _last_flush
+    if getattr(_local, "warming", False):
+        return
+    spec = (kind, tuple(parts), normalize_key(params))
+    with _lock:
+        _hits[spec] += 1
+        if spec not in _specs:
+            _specs[spec] = filter_values(params)
+        due = time.monotonic() - _last_flush >= _setting("DASHBOARD_HOT_FLUSH_SECONDS", 60)
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush_hot()
+
+def flush_hot():
+    """Merge this process's request counts into the shared hot-key table.
+
+    Scores decay with a half-life of DASHBOARD_HOT_HALF_LIFE seconds so the warm set
+    follows current traffic. The read-modify-write holds lock_key(HOT_KEY), so concurrent
+    flushes from other processes do not overwrite each other. Flushes run on the request
+    path and do not wait: while another process holds the lock, the counts are kept for
+    this process's next flush.
+    """
+    with _lock:
+        local, specs = dict(_hits), dict(_specs)
+        _hits.clear()
+        _specs.clear()
+    if not local:
+        return
+
+    lock = lock_key(HOT_KEY)
+    token = uuid.uuid4().hex
+    if not cache.add(lock, token, 10):
+        with _lock:
+            _hits.update(local)
+            for spec, filters in specs.items():
+                _specs.setdefault(spec, filters)
+        return
+    try:
+        _merge_hot(local, specs)
+    finally:
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+def _merge_hot(local, specs):
+    now = time.time()
+    half_life = _setting("DASHBOARD_HOT_HALF_LIFE", 3600)
+    hot = cache.get(HOT_KEY) or {}
+    merged = {}
+    for spec, (score, seen, filters) in hot.items():
+        merged[spec] = (score * 0.5 ** ((now - seen) / half_life), now, filters)
+    for spec, n in local.items():
+        score, _, filters = merged.get(spec, (0.0, now, specs[spec]))
+        merged[spec] = (score + n, now, filters)
+
+    keep = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)
+    keep = keep[: max(4 * _setting("DASHBOARD_WARM_TOP_N", 20), 100)]
+    cache.set(HOT_KEY, dict(keep), None)
+
+def _default_warm():
+    # the unfiltered page, with the parts the services pass to cached() (so the same keys
+    # requests read, and the same specs _track records)
+    from . import services
+
+    accuracy = services._accuracy()
+    return [
+        ("options", ("conjunctive",), {}),
+        ("summary", (accuracy,), {}),
+        ("bundle", ("city", "median", 20, 20, accuracy), {}),
+    ]
+
+def hot_specs(top_n: int):
+    hot = cache.get(HOT_KEY) or {}
+    ranked = sorted(hot.items(), key=lambda kv: kv[1][0], reverse=True)
+    specs = [(kind, parts, filters) for (kind, parts, _), (_, _, filters) in ranked[:top_n]]
+    seen = {(kind, parts, normalize_key(FilterParams(filters))) for kind, parts, filters in specs}
+    for kind, parts, filters in _default_warm():
+        if (kind, parts, normalize_key(FilterParams(filters))) not in seen:
+            specs.append((kind, parts, filters))
+    return specs
+
+def can_warm() -> bool:
+    # only the snapshot engine runs without PostgreSQL (percentile_cont, GROUPING SETS, :: casts)
+    return _setting("DASHBOARD_ENGINE", "sql") == "snapshot" or connections["default"].vendor == "postgresql"
+
+def warm(top_n: int | None = None) -> int:
+    """Compute the most requested dashboard results that are not cached."""
+    from . import services
+
+    if not can_warm():
+        logger.info("dashboard warm-up skipped: the %s engine needs PostgreSQL", _setting("DASHBOARD_ENGINE", "sql"))
+        return 0
+    if top_n is None:
+        top_n = _setting("DASHBOARD_WARM_TOP_N", 20)
+    specs = hot_specs(top_n)
+    _local.warming = True
+    try:
+        for kind, parts, filters in specs:
+            try:
+                getattr(services, SERVICE_FUNCS[kind])(FilterParams(filters), *parts, raw=True)
+            except Exception:
+                logger.exception("dashboard warm-up failed for %s %s", kind, parts)
+    finally:
+        _local.warming = False
+    return len(specs)
+
+def _warm_thread():
+    try:
+        warm()
+    except Exception:
+        logger.exception("dashboard warm-up failed")
+    finally:
+        connections.close_all()
+
+def warm_async(delay: float = 0):
+    t = threading.Timer(delay, _warm_thread)
+    t.daemon = True
+    t.start()
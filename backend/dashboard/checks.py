@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+
+from .dataset import shared_cache
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if shared_cache():
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process, so dashboard generation bumps made by other "
+            "processes (web workers, run_import_worker) are not seen here.",
+            hint=(
+                "Set REDIS_URL, or SHARED_CACHE_MB on a single host. Until then dashboard results and "
+                f"generations expire after DASHBOARD_UNSHARED_CACHE_TTL ({getattr(settings, 'DASHBOARD_UNSHARED_CACHE_TTL', 60)} s)."
+            ),
+            id="dashboard.W001",
+        )
+    ]
+
+@register(Tags.caches)
+def check_shared_memory_cache(app_configs, **kwargs):
+    if settings.CACHES["default"]["BACKEND"] != "config.shmcache.SharedMemoryCache":
+        return []
+    try:
+        caches["default"].get("dash:version")  # opens (or creates) the mapped file
+    except ImproperlyConfigured as e:
+        return [Error(str(e), id="dashboard.E001")]
+    return []
@@ -0,0 +1,106 @@
+import hashlib
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+
+from .filters import ALLOWED_FILTERS, normalize_key
+from .localcache import cache
+
+VERSION_KEY = "dash:version"
+MAX_KEY_TAIL = 200  # longer generation/filter parts of a key are replaced by their hash
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+def shared_cache() -> bool:
+    """Whether the default cache (and so every generation counter) is shared by all processes."""
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+def _counter_timeout():
+    # a bump made by another process never reaches a process-local cache: let the counters
+    # expire instead, so every process moves to a new generation within that time
+    return None if shared_cache() else cache_ttl()
+
+def _seed() -> int:
+    # if a counter is evicted, restart from a value no process can have seen yet
+    return int(time.time() * 1000)
+
+def _value_key(dim: str, value: str) -> str:
+    return f"dash:gen:{dim}:{quote(value, safe='')}"
+
+def _incr(key: str) -> int:
+    try:
+        return int(cache.incr(key))
+    except ValueError:
+        v = _seed()
+        cache.set(key, v, _counter_timeout())
+        return v
+
+def current_version() -> int:
+    v = cache.get(VERSION_KEY)
+    if v is None:
+        cache.add(VERSION_KEY, _seed(), _counter_timeout())
+        v = cache.get(VERSION_KEY)
+    return int(v or 0)
+
+def bump_version() -> int:
+    return _incr(VERSION_KEY)
+
+def bump(changes: dict):
+    """Invalidate results touched by a record change.
+
+    ``changes`` maps each dimension to the values the changed records carry. The global
+    version always moves; per-value generations move only for those values.
+    """
+    bump_version()
+    for dim, values in changes.items():
+        for v in values:
+            _incr(_value_key(dim, v))
+
+def generation(params, disjunctive: bool = False) -> str:
+    # unfiltered results depend on every record; filtered ones only on records matching
+    # the filter, and any such record carries one of the filtered values of every dimension.
+    # Disjunctive facet counts drop one dimension's filter at a time, so a counted record
+    # only carries a filtered value of the *other* dimensions: with a single filtered
+    # dimension that is no dimension at all, and only the global version covers it.
+    keys, dims = [], 0
+    for dim in ALLOWED_FILTERS:
+        vals = sorted({v.strip() for v in params.getlist(dim) if v and v.strip()})
+        keys.extend(_value_key(dim, v) for v in vals)
+        dims += bool(vals)
+    if not keys or (disjunctive and dims < 2):
+        return f"g{current_version()}"
+
+    gens = cache.get_many(keys)
+    missing = [k for k in keys if k not in gens]
+    if missing:
+        for k in missing:
+            cache.add(k, _seed(), _counter_timeout())
+        gens.update(cache.get_many(missing))
+    return "g" + ".".join(str(gens.get(k, 0)) for k in keys)
+
+def _tail(*parts) -> str:
+    tail = ":".join(parts)
+    if len(tail) <= MAX_KEY_TAIL:
+        return tail
+    return "h" + hashlib.blake2b(tail.encode(), digest_size=20).hexdigest()
+
+def cache_key(kind: str, params, *parts, disjunctive: bool = False) -> str:
+    gen = generation(params, disjunctive)
+    return ":".join(["dash", kind, *map(str, parts), _tail(gen, normalize_key(params))])
+
+def stale_key(kind: str, params, *parts) -> str:
+    # last computed value for this query, whatever its generation
+    return ":".join(["dash", kind, *map(str, parts), "stale", _tail(normalize_key(params))])
+
+def lock_key(key: str) -> str:
+    # held by the process computing ``key`` (dashboard.caching single flight)
+    return "dash:lock:" + key.removeprefix("dash:")
+
+def cache_ttl() -> int:
+    ttl = int(getattr(settings, "DASHBOARD_CACHE_TTL", 6 * 3600))
+    if not shared_cache():
+        ttl = min(ttl, int(getattr(settings, "DASHBOARD_UNSHARED_CACHE_TTL", 60)))
+    return ttl
@@ -0,0 +1,30 @@
+from django.db import transaction
+
+from records.dictionary import dictionary
+from . import dataset, rollups
+
+ROW_FIELDS = rollups.ROW_FIELDS
+
+def _rows(records):
+    return [r if isinstance(r, tuple) else tuple(getattr(r, f) for f in ROW_FIELDS) for r in records]
+
+def _invalidate(rows):
+    # generations are keyed by the names used in filters
+    changes = {d: {dictionary.name(d, r[i]) for r in rows} for i, d in enumerate(rollups.DIMENSIONS)}
+    transaction.on_commit(lambda: dataset.bump(changes))
+
+def records_added(records):
+    # records: SalaryRecord instances or ROW_FIELDS tuples
+    rows = _rows(records)
+    if rows:
+        if rollups.enabled():
+            rollups.add_rows(rows)
+        _invalidate(rows)
+
+def records_removed(records):
+    # call after the records have been soft-deleted
+    rows = _rows(records)
+    if rows:
+        if rollups.enabled():
+            rollups.remove_rows(rows)
+        _invalidate(rows)
@@ -0,0 +1,26 @@
+from .filters import OPTION_LISTS
+from .privacy import suppress_if_small
+
+def facet_payload(counts: dict, facet_mode: str) -> dict:
+    """Build the options response from {dimension: {value: (count, disjunctive_count)}}.
+
+    The legacy per-dimension lists keep the values present in the filtered set; ``facets``
+    adds a count per value (the disjunctive one in disjunctive mode, where a dimension's own
+    filter is ignored) and hides counts below the k-anonymity threshold.
+    """
+    out = {}
+    facets = {}
+    for name, dim in OPTION_LISTS.items():
+        values = sorted(counts.get(dim, {}).items())
+        out[name] = [v for v, (n, _) in values if n][:5000]
+        entries = []
+        for v, (n, n_disjunctive) in values:
+            c = n_disjunctive if facet_mode == "disjunctive" else n
+            if not c:
+                continue
+            hidden = suppress_if_small(c)
+            entries.append({"value": v, "count": None if hidden else c, "suppressed": hidden})
+        facets[dim] = entries[:5000]
+    out["facets"] = facets
+    out["facet_mode"] = facet_mode
+    return out
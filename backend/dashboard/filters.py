@@ -1,22 +1,53 @@
+import re
+
+from records.dictionary import dictionary
+from . import advisor
+
 ALLOWED_FILTERS = {
-    "city": "r.city",
-    "industry": "r.industry",
-    "occupation": "r.occupation",
-    "major": "r.major",
-    "university": "r.university",
-    "experience_category": "r.experience_category",
+    "city": "r.city_id",
+    "industry": "r.industry_id",
+    "occupation": "r.occupation_id",
+    "major": "r.major_id",
+    "university": "r.university_id",
+    "experience_category": "r.experience_category_id",
 }
 
-def build_where(params):
-    clauses = ["r.deleted_at IS NULL"]
-    values = []
+# options() list name -> dimension
+OPTION_LISTS = {
+    "cities": "city",
+    "industries": "industry",
+    "occupations": "occupation",
+    "majors": "major",
+    "universities": "university",
+    "experience_categories": "experience_category",
+}
+
+def filter_clauses(params):
+    # [(dimension, "col IN (...)", ids)] for every filtered dimension; names are encoded
+    # through the lookup dictionary, and a filter matching no known name matches no rows
+    out = []
     for key, col in ALLOWED_FILTERS.items():
         vals = params.getlist(key)
         vals = [v.strip() for v in vals if v and v.strip()]
         if vals:
-            placeholders = ",".join(["%s"] * len(vals))
-            clauses.append(f"{col} IN ({placeholders})")
-            values.extend(vals)
+            ids = dictionary.ids(key, vals)
+            if not ids:
+                out.append((key, "1=0", []))
+                continue
+            placeholders = ",".join(["%s"] * len(ids))
+            out.append((key, f"{col} IN ({placeholders})", ids))
+    return out
+
+def build_where(params, live_only: bool = True):
+    clauses = ["r.deleted_at IS NULL"] if live_only else ["1=1"]
+    values = []
+    filtered = filter_clauses(params)
+    for _, clause, vals in filtered:
+        clauses.append(clause)
+        values.extend(vals)
+    if live_only:
+        # records-table queries feed the index advisor
+        advisor.observe(dim for dim, _, _ in filtered)
     return " AND ".join(clauses), values
 
 def normalize_key(params) -> str:
@@ -26,3 +57,40 @@ def normalize_key(params) -> str:
         if vals:
             parts.append(f"{key}=" + "|".join(vals))
     return "&".join(parts) if parts else "all"
+
+def has_unknown_values(params) -> bool:
+    # a filtered name the lookup tables do not have (yet): see dashboard.caching.cached
+    return any(dictionary.id(key, v) is None for key, vals in filter_values(params).items() for v in vals)
+
+def filter_values(params) -> dict:
+    out = {}
+    for key in ALLOWED_FILTERS:
+        vals = sorted({v.strip() for v in params.getlist(key) if v and v.strip()})
+        if vals:
+            out[key] = vals
+    return out
+
+class FilterParams(dict):
+    # {dimension: [values]} with the QueryDict.getlist interface used by build_where
+    def getlist(self, key):
+        return list(self.get(key, []))
+
+COHORT_KEY = re.compile(r"^(c\d+)_(" + "|".join(ALLOWED_FILTERS) + r")$")
+
+def prefixed(params, prefix: str) -> FilterParams:
+    # the filters given as <prefix><dimension>=...
+    return FilterParams({
+        key: params.getlist(prefix + key) for key in ALLOWED_FILTERS if params.getlist(prefix + key)
+    })
+
+def cohort_filters(params) -> dict:
+    """{"c1": FilterParams, ...} from c<N>_<dimension>=... parameters, ordered by N.
+
+    Unprefixed filters apply to every cohort unless the cohort sets that dimension itself.
+    """
+    names = {m.group(1) for m in map(COHORT_KEY.match, params.keys()) if m}
+    base = filter_values(params)
+    out = {}
+    for name in sorted(names, key=lambda n: int(n[1:])):
+        out[name] = FilterParams({**base, **prefixed(params, name + "_")})
+    return out
@@ -0,0 +1,39 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import caching, dataset
+
+def _etag(request, *args, **kwargs) -> str:
+    # the same path and arguments give the same body until the dataset version moves;
+    # reading the version is a single cache lookup, so a match never reaches the database
+    query = sorted((k, sorted(v)) for k, v in request.GET.lists())
+    raw = json.dumps([request.path, query, dataset.current_version(), settings.DASHBOARD_ENGINE,
+                      settings.DASHBOARD_ETAG_SALT])
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+def public_cache(view):
+    """Strong ETag, If-None-Match handling and shared-cache headers for a public dashboard GET.
+
+    Apply outside @api_view, so a 304 is sent before DRF authenticates the request. Responses
+    that contain a stale result (see dashboard.caching) or an error get no ETag and no-cache.
+    """
+    conditional = condition(etag_func=_etag)(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        caching.reset_stale()
+        response = conditional(request, *args, **kwargs)
+        if response.status_code in (200, 304) and not caching.served_stale():
+            patch_cache_control(response, public=True, max_age=settings.DASHBOARD_HTTP_MAX_AGE)
+        else:
+            if response.has_header("ETag"):
+                del response["ETag"]
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapped
@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+from metrics.registry import cache_tier_event
+
+logger = logging.getLogger(__name__)
+
+# A process-local LRU+TTL tier in front of the shared (Redis) cache for dash:* keys.
+# Result keys embed their dataset generation and never change; the generation counters
+# (dashboard.dataset) do, so every write to a counter is broadcast on CHANNEL and each
+# process drops its copy. While a process is not subscribed it reads counters from Redis.
+
+CHANNEL = "dash:invalidate"
+LOCAL_PREFIX = "dash:"
+SHARED_PREFIXES = ("dash:hot", "dash:lock:")  # coordinate processes: always remote
+COUNTER_PREFIXES = ("dash:version", "dash:gen:")
+CLEAR_ALL = "*"
+OTHER_SIZE = 64  # nominal bytes for values that are not bytes/str
+
+def _size(value) -> int:
+    return len(value) if isinstance(value, (bytes, str)) else OTHER_SIZE
+
+class LRU:
+    """Thread-safe LRU of values bounded by total size, each entry expiring after ``ttl`` seconds."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires, size, value)
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return item[2]
+
+    def set(self, key, value):
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def __len__(self):
+        return len(self._data)
+
+class TieredCache:
+    """The subset of the Django cache API used by the dashboard, with ``local`` in front of ``remote``.
+
+    ``client`` is a redis-py compatible client (a fakeredis client works) used for the
+    invalidation channel.
+    """
+
+    def __init__(self, remote, client, local: LRU):
+        self.remote = remote
+        self.client = client
+        self.local = local
+        self._lock = threading.Lock()
+        self._pid = None
+        self._subscribed = threading.Event()
+        self._epoch = 0  # invalidations applied; a copy read from Redis before one may be outdated
+
+    def _local_ok(self, key) -> bool:
+        if not key.startswith(LOCAL_PREFIX) or key.startswith(SHARED_PREFIXES):
+            return False
+        if key.startswith(COUNTER_PREFIXES):
+            self._ensure_listener()
+            return self._subscribed.is_set()
+        return True
+
+    def get(self, key, default=None):
+        if self._local_ok(key):
+            value = self.local.get(key)
+            if value is not None:
+                cache_tier_event("local", "hit")
+                return value
+            cache_tier_event("local", "miss")
+            epoch = self._epoch
+            value = self.remote.get(key)
+            cache_tier_event("redis", "miss" if value is None else "hit")
+            if value is not None and epoch == self._epoch:
+                self.local.set(key, value)
+            return default if value is None else value
+        return self.remote.get(key, default)
+
+    def get_many(self, keys):
+        found, missing = {}, []
+        for key in keys:
+            value = self.local.get(key) if self._local_ok(key) else None
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if found:
+            cache_tier_event("local", "hit", len(found))
+        if missing:
+            cache_tier_event("local", "miss", len(missing))
+            epoch = self._epoch
+            fetched = self.remote.get_many(missing)
+            cache_tier_event("redis", "hit", len(fetched))
+            if len(missing) > len(fetched):
+                cache_tier_event("redis", "miss", len(missing) - len(fetched))
+            for key, value in fetched.items():
+                if epoch == self._epoch and self._local_ok(key):
+                    self.local.set(key, value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=None):
+        self.remote.set(key, value, timeout)
+        self._written(key, value)
+
+    def add(self, key, value, timeout=None) -> bool:
+        added = self.remote.add(key, value, timeout)
+        if added:
+            # a failed add changed nothing, so there is nothing to invalidate
+            self._written(key, None)
+        return added
+
+    def incr(self, key, delta: int = 1):
+        value = self.remote.incr(key, delta)
+        self._written(key, value)
+        return value
+
+    def delete(self, key) -> bool:
+        deleted = self.remote.delete(key)
+        self.local.discard([key])
+        if key.startswith(COUNTER_PREFIXES):
+            self.publish([key])
+        return deleted
+
+    def clear(self):
+        self.remote.clear()
+        self.local.clear()
+        self.publish([CLEAR_ALL])
+
+    def _written(self, key, value):
+        if key.startswith(COUNTER_PREFIXES):
+            self.local.discard([key])
+            self.publish([key])
+        elif value is not None and self._local_ok(key):
+            self.local.set(key, value)
+
+    def publish(self, keys):
+        try:
+            self.client.publish(CHANNEL, "\n".join(keys))
+        except Exception:
+            # other processes keep their copies until the local TTL runs out
+            logger.warning("dashboard cache invalidation not published", exc_info=True)
+
+    def _ensure_listener(self):
+        # one subscriber thread per process; a forked worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._subscribed = threading.Event()
+            self.local.clear()
+            threading.Thread(target=self._listen, name="dash-invalidate", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.subscribe(CHANNEL)
+                while (pubsub.get_message(timeout=5) or {}).get("type") != "subscribe":
+                    pass
+                # anything published before the subscription took effect was missed
+                self._apply(CLEAR_ALL)
+                self._subscribed.set()
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply(message["data"])
+            except Exception:
+                logger.warning("dashboard cache invalidation channel lost; reconnecting", exc_info=True)
+            self._subscribed.clear()
+            time.sleep(1)
+
+    def _apply(self, data):
+        self._epoch += 1
+        keys = (data.decode() if isinstance(data, bytes) else str(data)).split("\n")
+        if CLEAR_ALL in keys:
+            self.local.clear()
+        else:
+            self.local.discard(keys)
+
+def _build():
+    size_mb = getattr(settings, "DASHBOARD_LOCAL_CACHE_MB", 0)
+    if not size_mb or "django_redis" not in settings.CACHES["default"]["BACKEND"]:
+        return default_cache
+    from django_redis import get_redis_connection
+
+    local = LRU(int(size_mb * 1024 * 1024), getattr(settings, "DASHBOARD_LOCAL_CACHE_TTL", 30))
+    return TieredCache(default_cache, get_redis_connection("default"), local)
+
+cache = _build()
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dashboard import advisor
+from dashboard.filters import ALLOWED_FILTERS
+from dashboard.models import FilterUsage
+
+class Command(BaseCommand):
+    help = "Recommend (or create) partial covering indexes for the filter combinations the dashboard receives."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10, help="Number of most used combinations to consider.")
+        parser.add_argument("--min-share", type=float, default=0.01, help="Ignore combinations below this share of queries.")
+        parser.add_argument("--create", action="store_true", help="Create the missing indexes (CREATE INDEX CONCURRENTLY).")
+        parser.add_argument("--reset", action="store_true", help="Clear the recorded usage and exit.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = FilterUsage.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {deleted} usage rows."))
+            return
+
+        usage = list(FilterUsage.objects.order_by("-hits"))
+        total = sum(u.hits for u in usage)
+        if not total:
+            self.stdout.write("No filter usage recorded yet.")
+            return
+        if connection.vendor != "postgresql":
+            if options["create"]:
+                raise CommandError("index creation needs PostgreSQL")
+            self.stdout.write(self.style.WARNING("Not PostgreSQL: listing usage only."))
+
+        indexes = advisor.existing_indexes() if connection.vendor == "postgresql" else {}
+        distinct = self._distinct() if indexes else {}
+        for u in usage[: options["top"]]:
+            share = u.hits / total
+            label = u.dimensions or "(unfiltered)"
+            line = f"{label:50} {u.hits:10} {share:6.1%}"
+            if not u.dimensions or share < options["min_share"] or not indexes:
+                self.stdout.write(line)
+                continue
+
+            # most selective column first
+            columns = sorted((ALLOWED_FILTERS[d].split(".")[1] for d in u.dimensions.split(",")),
+                             key=lambda c: -distinct.get(c, 0))
+            if advisor.covered(columns, indexes):
+                self.stdout.write(f"{line}  covered")
+                continue
+            name = "adv_" + hashlib.md5(",".join(columns).encode()).hexdigest()[:12]
+            sql = advisor.index_sql(columns, name)
+            if options["create"]:
+                with connection.cursor() as cur:
+                    cur.execute(sql)
+                indexes[name] = (tuple(columns), True)
+                self.stdout.write(self.style.SUCCESS(f"{line}  created {name}"))
+            else:
+                self.stdout.write(f"{line}  missing: {sql};")
+                self.stdout.write(f"{'':50} to keep it, add live_index({columns!r}, {name!r}) to SalaryRecord.Meta.indexes")
+
+    def _distinct(self):
+        # planner statistics; negative n_distinct is a fraction of the row count, i.e. very selective
+        with connection.cursor() as cur:
+            cur.execute("SELECT attname, n_distinct FROM pg_stats WHERE tablename = %s", [advisor.TABLE])
+            return {col: (n if n > 0 else 1e9 * -n) for col, n in cur.fetchall()}
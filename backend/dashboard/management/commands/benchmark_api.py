@@ -0,0 +1,283 @@
+import json
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from accounts.models import Account, Person
+from admin_import.models import ImportBatch
+from audit import services as audit
+from dashboard import localcache, services
+from dashboard.events import ROW_FIELDS, records_removed
+from dashboard.filters import ALLOWED_FILTERS, FilterParams, OPTION_LISTS
+from records.models import SalaryRecord
+from records.synthetic import PROFILE_FIELDS, SalaryModel, default_sample
+
+ENDPOINTS = (
+    "dashboard_summary", "dashboard_grouped", "dashboard_distribution", "dashboard_options", "dashboard_compare",
+    "submit_record", "my_submissions", "create_import",
+)
+WRITES = ("submit_record", "create_import")
+
+def _percentile(sorted_vals, q):
+    # nearest rank
+    if not sorted_vals:
+        return None
+    return sorted_vals[max(0, math.ceil(q * len(sorted_vals)) - 1)]
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+class _CacheCounter:
+    """Counts dashboard result lookups (dash:<kind>:...) on this thread's cache connection."""
+
+    # bookkeeping keys, not results: generations, hot-key counts and single-flight locks
+    IGNORED = {"gen", "version", "hot", "lock"}
+
+    def __init__(self):
+        self.hits = 0
+        self.lookups = 0
+
+    @contextmanager
+    def installed(self):
+        # the local tier when there is one, so its hits are counted too
+        backend = localcache.cache if isinstance(localcache.cache, localcache.TieredCache) else caches["default"]
+        original = backend.get
+
+        def get(key, *args, **kwargs):
+            value = original(key, *args, **kwargs)
+            parts = str(key).split(":")
+            if parts[0] == "dash" and len(parts) > 1 and parts[1] not in self.IGNORED and "stale" not in parts:
+                self.lookups += 1
+                self.hits += value is not None
+            return value
+
+        backend.get = get
+        try:
+            yield self
+        finally:
+            del backend.get
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the dashboard, submission and import endpoints in-process against the current "
+        "database and save p50/p95/p99 latency, queries per request, cache hit ratio and peak RSS as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100, help="Requests per read endpoint.")
+        parser.add_argument("--writes", type=int, default=20, help="Requests per write endpoint (submit_record, create_import).")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per read endpoint.")
+        parser.add_argument("--variants", type=int, default=20, help="Distinct filter combinations to cycle through.")
+        parser.add_argument("--import-rows", type=int, default=100)
+        parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+        parser.add_argument("--cold", action="store_true", help="Clear the cache before every request.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--sample", default=None, help="CSV the import files are modelled on (default: demo_data.csv).")
+        parser.add_argument("--output", default=None, help="JSON results path (default: benchmark-<rows>-<time>.json).")
+        parser.add_argument("--baseline", default=None, help="Earlier results to compare against.")
+        parser.add_argument("--max-regression", type=float, default=None,
+                            help="Fail when an endpoint's p95 grows by more than this fraction of the baseline.")
+
+    def handle(self, *args, **options):
+        names = [n.strip() for n in options["endpoints"].split(",") if n.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"unknown endpoints: {', '.join(sorted(unknown))}")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.model = SalaryModel(options["sample"] or default_sample(), seed=options["seed"])
+        self.filters = self._filter_variants(options["variants"])
+        self.run_id = uuid.uuid4().hex[:8]
+        self.client = Client(SERVER_NAME=next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if "*" not in h), "localhost"))
+
+        rows = SalaryRecord.objects.filter(deleted_at__isnull=True).count()
+        self.stdout.write(f"{rows} live records, engine {getattr(settings, 'DASHBOARD_ENGINE', 'sql')}, "
+                          f"{connection.vendor}, cache {settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}")
+
+        self.tokens = {}
+        self.admin = self._account("ADMIN")
+        self.users = [self._account("USER") for _ in range(options["writes"])]
+        results = {}
+        try:
+            for name in names:
+                results[name] = self._run(name)
+                r = results[name]
+                self.stdout.write(
+                    f"{name:24} p50 {_fmt_ms(r['p50_ms'])}  p95 {_fmt_ms(r['p95_ms'])}  p99 {_fmt_ms(r['p99_ms'])}  "
+                    f"{r['queries_per_request']:6.1f} q/req  hit ratio {_fmt_ratio(r['cache_hit_ratio'])}  "
+                    f"errors {r['errors']}"
+                )
+        finally:
+            self._cleanup()
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(dt_timezone.utc).isoformat(),
+                "rows": rows,
+                "engine": getattr(settings, "DASHBOARD_ENGINE", "sql"),
+                "database": connection.vendor,
+                "cache": settings.CACHES["default"]["BACKEND"],
+                "cold": options["cold"],
+                "requests": options["requests"],
+                "writes": options["writes"],
+            },
+            "peak_rss_mb": _peak_rss_mb(),
+            "endpoints": results,
+        }
+        output = options["output"] or f"benchmark-{rows}-{int(time.time())}.json"
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"peak RSS {_fmt_mb(report['peak_rss_mb'])}, results written to {output}")
+
+        if baseline:
+            self._compare(baseline, report)
+
+    def _filter_variants(self, n):
+        # the first variant is unfiltered; the rest filter one or two dimensions by real values
+        opts = services.options(FilterParams())
+        values = {dim: opts.get(name) or [] for name, dim in OPTION_LISTS.items()}
+        dims = [d for d in ALLOWED_FILTERS if values[d]]
+        variants = [{}]
+        while dims and len(variants) < n:
+            chosen = self.rng.sample(dims, min(len(dims), self.rng.randint(1, 2)))
+            variants.append({d: [self.rng.choice(values[d])] for d in chosen})
+        return variants
+
+    def _account(self, role):
+        account = Account.objects.create_user(email=f"bench-{self.run_id}-{uuid.uuid4().hex[:8]}@example.com", role=role)
+        self.tokens[account.uid] = f"Bearer {RefreshToken.for_user(account).access_token}"
+        return account
+
+    def _query(self, filters, prefix=""):
+        return {prefix + d: vs for d, vs in filters.items()}
+
+    def _request(self, name, i):
+        variant = self.filters[i % len(self.filters)]
+        if name == "dashboard_summary":
+            return self.client.get("/api/dashboard/summary", self._query(variant))
+        if name == "dashboard_grouped":
+            group_by = ("city", "industry", "occupation")[i % 3]
+            return self.client.get("/api/dashboard/grouped", {**self._query(variant), "group_by": group_by})
+        if name == "dashboard_distribution":
+            return self.client.get("/api/dashboard/distribution", self._query(variant))
+        if name == "dashboard_options":
+            return self.client.get("/api/dashboard/options", self._query(variant))
+        if name == "dashboard_compare":
+            other = self.filters[(i + 1) % len(self.filters)]
+            return self.client.get("/api/dashboard/compare", {**self._query(variant, "a_"), **self._query(other, "b_")})
+        if name == "my_submissions":
+            user = self.users[i % len(self.users)] if self.users else self.admin
+            return self.client.get("/api/my/submissions", HTTP_AUTHORIZATION=self.tokens[user.uid])
+        if name == "submit_record":
+            p, salary, _ = next(self.model.rows(1))
+            body = dict(zip(PROFILE_FIELDS, p))
+            return self.client.post("/api/my/submissions/submit", {**body, "salary_eur": salary},
+                                    content_type="application/json", HTTP_AUTHORIZATION=self.tokens[self.users[i].uid])
+        if name == "create_import":
+            upload = SimpleUploadedFile(f"bench-{self.run_id}-{i}.csv", self.model.csv_text(self.options["import_rows"]).encode(), "text/csv")
+            return self.client.post("/api/admin/imports", {"file": upload}, HTTP_AUTHORIZATION=self.tokens[self.admin.uid])
+        raise CommandError(f"unknown endpoint {name}")
+
+    def _run(self, name):
+        count = self.options["writes"] if name in WRITES else self.options["requests"]
+        if name == "submit_record":
+            count = min(count, len(self.users))
+        if name not in WRITES:
+            for i in range(self.options["warmup"]):
+                self._request(name, i)
+
+        latencies, queries, errors = [], 0, 0
+        counter = _CacheCounter()
+        with counter.installed():
+            for i in range(count):
+                if self.options["cold"]:
+                    localcache.cache.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = self._request(name, i)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                queries += len(ctx.captured_queries)
+                errors += response.status_code >= 400
+
+        latencies.sort()
+        return {
+            "requests": count,
+            "errors": errors,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+            "queries_per_request": queries / count if count else 0.0,
+            "cache_hit_ratio": counter.hits / counter.lookups if counter.lookups else None,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+    def _cleanup(self):
+        # remove what the write endpoints created, keeping rollups and caches consistent
+        audit.flush()
+        uids = list(self.tokens)
+        batches = ImportBatch.objects.filter(admin=self.admin)
+        records = SalaryRecord.objects.filter(Q(batch__in=batches) | Q(user__in=uids), deleted_at__isnull=True)
+        with transaction.atomic():
+            rows = list(records.values_list("record_id", *ROW_FIELDS))
+            SalaryRecord.objects.filter(record_id__in=[r[0] for r in rows]).update(deleted_at=timezone.now())
+            records_removed([r[1:] for r in rows])
+        imported = SalaryRecord.objects.filter(batch__in=batches).values_list("user_id", flat=True)
+        Person.objects.filter(user_id__in=list(imported)).delete()
+        for batch in batches.exclude(file=""):
+            batch.file.delete(save=False)
+        batches.delete()
+        Person.objects.filter(user_id__in=uids).delete()
+
+    def _compare(self, baseline, report):
+        self.stdout.write(f"compared with {self.options['baseline']} ({baseline.get('meta', {}).get('rows')} rows):")
+        worst = None
+        for name, r in report["endpoints"].items():
+            base = baseline.get("endpoints", {}).get(name)
+            if not base or not base.get("p95_ms") or r["p95_ms"] is None:
+                continue
+            change = r["p95_ms"] / base["p95_ms"] - 1
+            worst = change if worst is None else max(worst, change)
+            self.stdout.write(
+                f"{name:24} p50 {base['p50_ms']:8.1f} -> {r['p50_ms']:8.1f} ms  "
+                f"p95 {base['p95_ms']:8.1f} -> {r['p95_ms']:8.1f} ms ({change:+.0%})  "
+                f"q/req {base['queries_per_request']:.1f} -> {r['queries_per_request']:.1f}"
+            )
+        limit = self.options["max_regression"]
+        if limit is not None and worst is not None and worst > limit:
+            raise CommandError(f"p95 regressed by {worst:.0%} (limit {limit:.0%})")
+
+def _fmt_ms(v):
+    return "       - ms" if v is None else f"{v:8.1f} ms"
+
+def _fmt_ratio(v):
+    return "   -" if v is None else f"{v:4.0%}"
+
+def _fmt_mb(v):
+    return "n/a" if v is None else f"{v:.0f} MB"
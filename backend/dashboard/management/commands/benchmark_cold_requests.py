@@ -0,0 +1,114 @@
+import multiprocessing
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from dashboard import localcache
+
+ENDPOINTS = {
+    "summary": "/api/dashboard/summary",
+    "grouped": "/api/dashboard/grouped",
+    "distribution": "/api/dashboard/distribution",
+    "options": "/api/dashboard/options",
+}
+QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+CACHE = re.compile(r'cache;desc="([^"]*)"')
+
+def _host():
+    return next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if "*" not in h), "localhost")
+
+def _request(path, query, barrier, out):
+    client = Client(SERVER_NAME=_host(), raise_request_exception=False)
+    barrier.wait()
+    started = time.perf_counter()
+    try:
+        response = client.get(path, query)
+    finally:
+        connections.close_all()
+    elapsed = (time.perf_counter() - started) * 1000
+    timing = response.get("Server-Timing", "")
+    queries = QUERIES.search(timing)
+    cache = CACHE.search(timing)
+    events = Counter(dict((k, int(v)) for k, v in (e.split("=") for e in cache.group(1).split())) if cache else {})
+    out.append((response.status_code, int(queries.group(1)) if queries else 0, events, elapsed))
+
+def _burst(args):
+    """Fire ``threads`` identical requests at once in this process; a list of (status, queries, cache events, ms)."""
+    path, query, threads, start_at = args
+    out = []
+    barrier = threading.Barrier(threads, action=lambda: time.sleep(max(0.0, start_at - time.time())))
+    workers = [threading.Thread(target=_request, args=(path, query, barrier, out)) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return out
+
+class Command(BaseCommand):
+    help = (
+        "Send N concurrent identical requests for a cold dashboard result and count how many computed it, "
+        "how many waited for that result (single flight) and the database queries they ran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="summary")
+        parser.add_argument("--concurrency", type=int, default=32, help="Identical requests per round.")
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Split the requests over this many forked processes (needs a shared cache).")
+        parser.add_argument("--rounds", type=int, default=3, help="Rounds, each starting from an empty cache.")
+        parser.add_argument("--filter", action="append", default=[], metavar="DIM=VALUE",
+                            help="Dashboard filter to add to the query, e.g. city=Dublin.")
+        parser.add_argument("--no-coalesce", action="store_true", help="Disable single flight, for comparison.")
+
+    def handle(self, *args, **options):
+        n, processes = options["concurrency"], options["processes"]
+        if n < 1 or not 1 <= processes <= n:
+            raise CommandError("need --concurrency >= --processes >= 1")
+        if processes > 1 and "locmem" in settings.CACHES["default"]["BACKEND"].lower():
+            raise CommandError("--processes needs a cache shared between processes (REDIS_URL or SHARED_CACHE_MB)")
+        query = {}
+        for f in options["filter"]:
+            dim, sep, value = f.partition("=")
+            if not sep:
+                raise CommandError(f"bad --filter {f!r}, expected DIM=VALUE")
+            query.setdefault(dim, []).append(value)
+        if options["endpoint"] == "grouped":
+            query.setdefault("group_by", "city")
+        path = ENDPOINTS[options["endpoint"]]
+
+        timeout = 0 if options["no_coalesce"] else getattr(settings, "DASHBOARD_SINGLE_FLIGHT_TIMEOUT", 0)
+        self.stdout.write(f"{n} x GET {path} over {processes} process(es), single flight "
+                          f"{f'on ({timeout} s)' if timeout else 'off'}, cache "
+                          f"{settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}")
+        shares = [n // processes + (i < n % processes) for i in range(processes)]
+        with override_settings(DASHBOARD_SINGLE_FLIGHT_TIMEOUT=timeout):
+            for round_no in range(1, options["rounds"] + 1):
+                localcache.cache.clear()
+                connections.close_all()  # not shared with forked processes
+                start_at = time.time() + 0.2 * processes
+                jobs = [(path, query, k, start_at) for k in shares]
+                if processes == 1:
+                    results = _burst(jobs[0])
+                else:
+                    with multiprocessing.get_context("fork").Pool(processes) as pool:
+                        results = [r for part in pool.map(_burst, jobs) for r in part]
+                self._report(round_no, results)
+
+    def _report(self, round_no, results):
+        events = Counter()
+        for _, _, e, _ in results:
+            events.update(e)
+        latencies = sorted(r[3] for r in results)
+        errors = sum(r[0] >= 400 for r in results)
+        self.stdout.write(
+            f"round {round_no}: computed {events['miss']}, coalesced {events['coalesced']}, hit {events['hit']}, "
+            f"db queries {sum(r[1] for r in results)}, p50 {latencies[len(latencies) // 2]:.1f} ms, "
+            f"max {latencies[-1]:.1f} ms, errors {errors}"
+        )
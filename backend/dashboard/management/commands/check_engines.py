@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dashboard import rollups, services
+from dashboard.filters import FilterParams, OPTION_LISTS
+
+class Command(BaseCommand):
+    help = (
+        "Compare the distribution histograms of the dashboard engines available here (sql on PostgreSQL, "
+        "snapshot with numpy, rollup when DASHBOARD_ROLLUPS is on) for a few filters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bins", type=int, default=20)
+        parser.add_argument("--values", type=int, default=3, help="Single-value filters per dimension to compare.")
+
+    def handle(self, *args, **options):
+        engines = {}
+        if connection.vendor == "postgresql":
+            engines["sql"] = services._distribution_sql
+        try:
+            from dashboard import snapshot
+        except ImportError:
+            pass
+        else:
+            engines["snapshot"] = snapshot.distribution
+        if rollups.enabled():
+            engines["rollup"] = rollups.distribution
+        if len(engines) < 2:
+            raise CommandError(f"only {', '.join(engines) or 'no'} engine(s) available; nothing to compare")
+
+        opts = services.options(FilterParams())
+        filters = [{}] + [
+            {dim: [value]} for name, dim in OPTION_LISTS.items()
+            for value in list(opts.get(name) or [])[:options["values"]]
+        ]
+        problems = []
+        for f in filters:
+            params = FilterParams(f)
+            out = {name: fn(params, bins=options["bins"]) for name, fn in engines.items()}
+            label = ", ".join(f"{d}={v[0]}" for d, v in f.items()) or "all"
+            for name, d in out.items():
+                if not d["suppressed"] and sum(d["counts"]) != d["count"]:
+                    problems.append(f"{label}: {name} bins hold {sum(d['counts'])} of {d['count']} records")
+            # exact engines agree bin for bin; rollup bins may shift by one fine bucket at the edges
+            exact = [out[name] for name in ("sql", "snapshot") if name in out]
+            if len(exact) == 2 and (exact[0]["counts"] != exact[1]["counts"] or exact[0]["count"] != exact[1]["count"]):
+                problems.append(f"{label}: sql and snapshot histograms differ")
+            if "rollup" in out and exact and out["rollup"]["count"] != exact[0]["count"]:
+                problems.append(f"{label}: rollup counts {out['rollup']['count']}, exact engines {exact[0]['count']}")
+        for p in problems:
+            self.stdout.write(p)
+        if problems:
+            raise CommandError(f"{len(problems)} engine mismatch(es) over {len(filters)} filters.")
+        self.stdout.write(self.style.SUCCESS(f"{', '.join(engines)} agree on {len(filters)} filters."))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from dashboard import events, services
+from dashboard.filters import ALLOWED_FILTERS, FilterParams
+from records.dictionary import dictionary
+from records.models import SalaryRecord
+
+class Command(BaseCommand):
+    help = (
+        "Filter on one value of a dimension, add a record with another value of it and check that the "
+        "cached disjunctive facet counts change on the next request. The record is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dimension", default="city", choices=list(ALLOWED_FILTERS))
+
+    def handle(self, *args, **options):
+        dim = options["dimension"]
+        values = [e["value"] for e in services.options(FilterParams())["facets"][dim]]
+        if len(values) < 2:
+            raise CommandError(f"need records with two {dim} values")
+        filtered, other = values[:2]
+        params = FilterParams({dim: [filtered]})
+
+        # stale copies would answer the first request after the change; the check wants the fresh one
+        with override_settings(DASHBOARD_CACHE_STALE_TTL=0):
+            before = self._count(params, dim, other)
+            template = SalaryRecord.objects.filter(
+                deleted_at__isnull=True, **{f"{dim}_id": dictionary.id(dim, other)}
+            ).first()
+            with transaction.atomic():
+                record = SalaryRecord.objects.create(
+                    user_id=template.user_id, university_id=template.university_id, major_id=template.major_id,
+                    industry_id=template.industry_id, occupation_id=template.occupation_id,
+                    experience_category_id=template.experience_category_id, city_id=template.city_id,
+                    salary_eur=template.salary_eur, submission_date=timezone.now(),
+                )
+                events.records_added([record])
+            try:
+                after = self._count(params, dim, other)
+            finally:
+                with transaction.atomic():
+                    record.deleted_at = timezone.now()
+                    record.save(update_fields=["deleted_at"])
+                    events.records_removed([record])
+                    record.delete()
+
+        self.stdout.write(f"{dim}={filtered}: disjunctive count of {other!r} {before} -> {after}")
+        if before is None or after is None:
+            raise CommandError(f"the count of {other!r} is suppressed; pick a dimension with larger groups")
+        if after != before + 1:
+            raise CommandError("the cached disjunctive counts did not see the new record")
+        self.stdout.write(self.style.SUCCESS("Disjunctive facet counts follow record changes."))
+
+    def _count(self, params, dim, value):
+        facets = services.options(params, "disjunctive")["facets"][dim]
+        return next((e["count"] for e in facets if e["value"] == value), 0)
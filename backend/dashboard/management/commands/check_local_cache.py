@@ -0,0 +1,87 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.localcache import LRU, TieredCache
+from metrics.registry import tier_hit_ratios
+
+class Command(BaseCommand):
+    help = (
+        "Run two local cache tiers side by side, as two worker processes would, against the configured "
+        "Redis (or fakeredis with --fake): check that a generation change reaches the other tier over "
+        "pub/sub and compare lookup cost per tier."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fake", action="store_true", help="Use an in-process fakeredis server (pip install fakeredis).")
+        parser.add_argument("--lookups", type=int, default=20000)
+        parser.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait for an invalidation.")
+
+    def handle(self, *args, **options):
+        if options["fake"]:
+            try:
+                import fakeredis
+            except ImportError:
+                raise CommandError("--fake needs the fakeredis package")
+            server = fakeredis.FakeServer()
+            remote = LocMemCache(f"check-local-cache-{uuid.uuid4().hex}", {})
+            clients = [fakeredis.FakeRedis(server=server) for _ in range(2)]
+        elif "django_redis" in settings.CACHES["default"]["BACKEND"]:
+            from django_redis import get_redis_connection
+
+            remote = default_cache
+            clients = [get_redis_connection("default")] * 2
+        else:
+            raise CommandError("no Redis cache configured (set REDIS_URL or pass --fake)")
+
+        ttl = settings.DASHBOARD_LOCAL_CACHE_TTL
+        a, b = (TieredCache(remote, client, LRU(8 * 1024 * 1024, ttl)) for client in clients)
+        run = uuid.uuid4().hex[:8]
+        counter = f"dash:gen:check:{run}"
+        result = f"dash:check:{run}:g1:all"
+        try:
+            for tier in (a, b):
+                tier.get(counter)  # starts the subscriber
+                if not self._wait(tier._subscribed.is_set, options["timeout"]):
+                    raise CommandError("the invalidation channel did not subscribe")
+
+            a.set(result, b'{"ok":true}', 60)
+            a.set(counter, 1, 60)
+            if b.get(counter) != 1 or b.get(counter) != 1 or b.local.get(counter) != 1:
+                raise CommandError("the counter was not cached locally")
+            started = time.monotonic()
+            a.incr(counter)
+            if not self._wait(lambda: b.get(counter) == 2, options["timeout"]):
+                raise CommandError(f"worker B still sees {b.get(counter)} after the change")
+            self.stdout.write(f"generation change reached the other worker in {(time.monotonic() - started) * 1000:.1f} ms")
+
+            n = options["lookups"]
+            local_us = self._per_lookup(lambda: b.get(result), n)
+            remote_us = self._per_lookup(lambda: remote.get(result), n)
+            self.stdout.write(f"lookup of a hot key: local tier {local_us:.1f} us, "
+                              f"{'fakeredis' if options['fake'] else 'Redis'} {remote_us:.1f} us")
+            ratios = tier_hit_ratios()
+            self.stdout.write(self.style.SUCCESS(
+                "hit ratio " + ", ".join(f"{t} {'-' if r is None else f'{r:.1%}'}" for t, r in ratios.items())
+            ))
+        finally:
+            for key in (counter, result):
+                remote.delete(key)
+
+    def _wait(self, predicate, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _per_lookup(self, fn, n: int) -> float:
+        started = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - started) / n * 1e6
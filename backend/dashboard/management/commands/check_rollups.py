@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import rollups
+
+class Command(BaseCommand):
+    help = "Compare the dashboard rollups against records_salaryrecord."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Stop after this many mismatches.")
+        parser.add_argument("--fix", action="store_true", help="Rebuild the rollups when a mismatch is found.")
+
+    def handle(self, *args, **options):
+        problems = rollups.verify(limit=options["limit"])
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("Rollups are consistent."))
+            return
+        for p in problems:
+            self.stdout.write(p)
+        if options["fix"]:
+            cells, _ = rollups.rebuild()
+            self.stdout.write(self.style.WARNING(f"Rebuilt {cells} rollup cells."))
+            return
+        raise CommandError(f"{len(problems)} rollup mismatch(es) found.")
@@ -0,0 +1,54 @@
+import random
+from bisect import bisect_left, bisect_right
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import sketches
+
+class Command(BaseCommand):
+    help = "Measure KLL sketch quantile error against exact values on generated salary data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200000)
+        parser.add_argument("--cells", type=int, default=2000, help="Number of rollup cells to spread rows over.")
+        parser.add_argument("--trials", type=int, default=20, help="Number of random multi-cell filters to merge.")
+        parser.add_argument("--tolerance", type=float, default=0.025, help="Maximum normalized rank error.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        n_cells = options["cells"]
+
+        # log-normal salaries around 45k EUR, like demo_data.csv; cell sizes are skewed
+        weights = [rng.paretovariate(1.2) for _ in range(n_cells)]
+        cells = [[] for _ in range(n_cells)]
+        for i in rng.choices(range(n_cells), weights=weights, k=options["rows"]):
+            cells[i].append(round(rng.lognormvariate(10.7, 0.35), 2))
+        stored = []
+        for values in cells:
+            sk = sketches.KLL()
+            for v in values:
+                sk.update(v)
+            stored.append(sk.to_dict())
+
+        worst_rank, worst_abs = 0.0, 0.0
+        for trial in range(options["trials"]):
+            chosen = rng.sample(range(n_cells), rng.randint(1, n_cells // 2))
+            exact = sorted(v for i in chosen for v in cells[i])
+            if not exact:
+                continue
+            estimates = sketches.merged(stored[i] for i in chosen).quantiles([0.25, 0.50, 0.75])
+            for q, est in zip((0.25, 0.50, 0.75), estimates):
+                truth = exact[int(q * (len(exact) - 1))]
+                # rank error: distance from q to the nearest rank the estimate occupies
+                lo, hi = bisect_left(exact, est) / len(exact), bisect_right(exact, est) / len(exact)
+                rank_err = 0.0 if lo <= q <= hi else min(abs(q - lo), abs(q - hi))
+                worst_rank = max(worst_rank, rank_err)
+                worst_abs = max(worst_abs, abs(est - truth))
+            self.stdout.write(f"trial {trial}: {len(chosen)} cells, {len(exact)} rows, p25/p50/p75 = "
+                              + ", ".join(f"{e:.0f}" for e in estimates))
+
+        self.stdout.write(f"max rank error {worst_rank:.4%}, max absolute error {worst_abs:.0f} EUR")
+        if worst_rank > options["tolerance"]:
+            raise CommandError(f"rank error {worst_rank:.4%} exceeds tolerance {options['tolerance']:.2%}")
+        self.stdout.write(self.style.SUCCESS("Sketch error within tolerance."))
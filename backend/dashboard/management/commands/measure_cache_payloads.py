@@ -0,0 +1,72 @@
+import pickle
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from dashboard import caching, payload, services
+from dashboard.filters import FilterParams
+
+def _cpu_us(fn, iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cost of a dashboard cache hit for the hot keys: a pickled result dict rendered by "
+        "DRF (the old entry format) against a pre-rendered JSON entry. Reports CPU time per hit and "
+        "bytes stored, plus Redis MEMORY USAGE when the cache is django-redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=None, help="Number of hot keys to measure.")
+        parser.add_argument("--iterations", type=int, default=200, help="Simulated hits per key.")
+
+    def handle(self, *args, **options):
+        redis = self._redis()
+        renderer = JSONRenderer()
+        n = options["iterations"]
+        totals = [0.0, 0.0, 0, 0, 0, 0]
+        for kind, parts, filters in caching.hot_specs(options["top"] or settings.DASHBOARD_WARM_TOP_N):
+            value = getattr(services, caching.SERVICE_FUNCS[kind])(FilterParams(filters), *parts)
+            # both formats as the cache backend stores them (pickled)
+            old = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            new = pickle.dumps(payload.encode(value), pickle.HIGHEST_PROTOCOL)
+            old_us = _cpu_us(lambda: renderer.render(pickle.loads(old)), n)
+            new_us = _cpu_us(lambda: payload.body(pickle.loads(new)), n)
+            row = [old_us, new_us, len(old), len(new)]
+            if redis is not None:
+                row += [self._memory_usage(redis, old), self._memory_usage(redis, new)]
+            for i, v in enumerate(row):
+                totals[i] += v
+            label = f"{kind}:{':'.join(map(str, parts))} {filters or 'all'}"
+            self.stdout.write(f"{label[:60]:60} {old_us:8.1f} -> {new_us:7.1f} us/hit  {len(old):8} -> {len(new):7} B")
+
+        old_us, new_us, old_b, new_b, old_mem, new_mem = totals
+        if not old_b:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"CPU per hit {old_us:.0f} -> {new_us:.0f} us ({new_us / old_us - 1:+.0%}), "
+            f"stored {old_b} -> {new_b} bytes ({new_b / old_b - 1:+.0%})"
+        ))
+        if redis is not None:
+            self.stdout.write(f"Redis MEMORY USAGE {old_mem} -> {new_mem} bytes ({new_mem / old_mem - 1:+.0%})")
+
+    def _redis(self):
+        if "django_redis" not in settings.CACHES["default"]["BACKEND"]:
+            return None
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def _memory_usage(self, redis, value: bytes) -> int:
+        key = f"dash:measure:{uuid.uuid4().hex}"
+        redis.set(key, value, ex=60)
+        try:
+            return int(redis.memory_usage(key) or 0)
+        finally:
+            redis.delete(key)
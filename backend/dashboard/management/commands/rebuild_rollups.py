@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import rollups
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard rollup cells and histograms from records_salaryrecord."
+
+    def handle(self, *args, **options):
+        cells, buckets = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {cells} rollup cells ({buckets} histogram buckets)."))
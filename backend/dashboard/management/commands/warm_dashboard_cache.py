@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import caching
+
+class Command(BaseCommand):
+    help = "Compute the most requested dashboard results so the next requests hit the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=None, help="Number of hot keys to warm.")
+
+    def handle(self, *args, **options):
+        if not caching.can_warm():
+            raise CommandError("the configured DASHBOARD_ENGINE needs PostgreSQL; use DASHBOARD_ENGINE=snapshot here")
+        n = caching.warm(options["top"])
+        self.stdout.write(self.style.SUCCESS(f"Warmed {n} dashboard queries."))
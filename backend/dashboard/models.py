@@ -0,0 +1,54 @@
+from django.db import models
+
+class RollupCell(models.Model):
+    # one row per distinct (city, industry, occupation, major, university, experience_category)
+    id = models.BigAutoField(primary_key=True)
+    city = models.ForeignKey("records.City", on_delete=models.PROTECT, related_name="+", db_index=False)  # leads uniq_rollup_cell
+    industry = models.ForeignKey("records.Industry", on_delete=models.PROTECT, related_name="+")
+    occupation = models.ForeignKey("records.Occupation", on_delete=models.PROTECT, related_name="+")
+    major = models.ForeignKey("records.Major", on_delete=models.PROTECT, related_name="+")
+    university = models.ForeignKey("records.University", on_delete=models.PROTECT, related_name="+")
+    experience_category = models.ForeignKey("records.ExperienceCategory", on_delete=models.PROTECT, related_name="+")
+
+    n = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    min_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    max_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    sketch = models.JSONField(default=dict)  # dashboard.sketches.KLL over salary_eur
+    stale = models.BooleanField(default=False)  # min/max/sketch predate a delete (see rollups.refresh_stale)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "industry", "occupation", "major", "university", "experience_category"],
+                name="uniq_rollup_cell",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["id"], name="rollup_stale", condition=models.Q(stale=True)),
+        ]
+
+    def __str__(self):
+        return f"RollupCell({self.id}) n={self.n}"
+
+class RollupBucket(models.Model):
+    # fine histogram: bucket i covers [i * width, (i + 1) * width) EUR
+    id = models.BigAutoField(primary_key=True)
+    cell = models.ForeignKey(RollupCell, on_delete=models.CASCADE, related_name="buckets")
+    bucket = models.IntegerField()
+    n = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cell", "bucket"], name="uniq_rollup_bucket"),
+        ]
+
+class FilterUsage(models.Model):
+    # how often each combination of filtered dimensions reached build_where (see dashboard.advisor)
+    id = models.BigAutoField(primary_key=True)
+    dimensions = models.CharField(max_length=255, unique=True)  # sorted, comma separated; "" = unfiltered
+    hits = models.BigIntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return f"FilterUsage({self.dimensions or 'all'}) hits={self.hits}"
@@ -0,0 +1,51 @@
+import json
+import zlib
+from decimal import Decimal
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder writes the same JSON, slower
+    orjson = None
+
+# Dashboard cache entries are the final JSON response bodies. Bodies of at least
+# DASHBOARD_CACHE_COMPRESS_MIN_BYTES are stored zlib-compressed behind a b"z" marker
+# (a JSON document never starts with "z").
+
+COMPRESSED = b"z"
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    if hasattr(o, "tolist"):  # NumPy scalars and arrays from the snapshot engine
+        return o.tolist()
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+def encode(value) -> bytes:
+    return pack(dumps(value))
+
+def pack(body: bytes) -> bytes:
+    """Cache entry for a JSON body: the body itself, compressed when large."""
+    threshold = getattr(settings, "DASHBOARD_CACHE_COMPRESS_MIN_BYTES", 0)
+    if threshold and len(body) >= threshold:
+        return COMPRESSED + zlib.compress(body, 1)
+    return body
+
+def body(entry) -> bytes:
+    """The JSON body of a cache entry."""
+    if not isinstance(entry, bytes):  # written before entries were pre-rendered
+        return dumps(entry)
+    if entry[:1] == COMPRESSED:
+        return zlib.decompress(entry[1:])
+    return entry
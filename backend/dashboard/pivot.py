@@ -0,0 +1,42 @@
+from .filters import ALLOWED_FILTERS
+from .privacy import suppress_if_small
+
+def check_dims(rows: str, cols: str):
+    if rows not in ALLOWED_FILTERS or cols not in ALLOWED_FILTERS or rows == cols:
+        raise ValueError("invalid pivot dimensions")
+
+def pivot_payload(rows: str, cols: str, cells: dict) -> dict:
+    """Build the pivot response from {(row_value, col_value): (n, mean, median)}.
+
+    Matrices are indexed [row][col]. In ``n`` a 0 means no records and ``None`` a cell
+    below the k-anonymity threshold; ``median``/``mean`` are ``None`` for both.
+    """
+    cnt = sum(n for n, _, _ in cells.values())
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True, "rows": [], "cols": []}
+
+    row_keys = sorted({r for r, _ in cells})
+    col_keys = sorted({c for _, c in cells})
+    n_m, mean_m, median_m = [], [], []
+    for r in row_keys:
+        n_row, mean_row, median_row = [], [], []
+        for c in col_keys:
+            n, mean, median = cells.get((r, c), (0, None, None))
+            hidden = bool(n) and suppress_if_small(n)
+            n_row.append(None if hidden else n)
+            mean_row.append(None if hidden or not n else mean)
+            median_row.append(None if hidden or not n else median)
+        n_m.append(n_row)
+        mean_m.append(mean_row)
+        median_m.append(median_row)
+    return {
+        "count": cnt,
+        "suppressed": False,
+        "row_dim": rows,
+        "col_dim": cols,
+        "rows": row_keys,
+        "cols": col_keys,
+        "n": n_m,
+        "mean": mean_m,
+        "median": median_m,
+    }
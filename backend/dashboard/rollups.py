@@ -0,0 +1,376 @@
+import json
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from records.dictionary import dictionary
+from records.models import SalaryRecord
+from .facets import facet_payload
+from .filters import ALLOWED_FILTERS, build_where, filter_clauses
+from .models import RollupCell, RollupBucket
+from .pivot import pivot_payload
+from .privacy import suppress_if_small
+from .sketches import KLL, merged
+from .sql import fetch_one, fetch_all
+
+DIMENSIONS = tuple(ALLOWED_FILTERS.keys())
+ID_FIELDS = tuple(f"{d}_id" for d in DIMENSIONS)
+ROW_FIELDS = ID_FIELDS + ("salary_eur",)
+
+CELLS = RollupCell._meta.db_table
+BUCKETS = RollupBucket._meta.db_table
+
+def enabled() -> bool:
+    # maintained on writes only when something reads them (DASHBOARD_ENGINE=rollup, accuracy=approx)
+    return bool(getattr(settings, "DASHBOARD_ROLLUPS", False))
+
+def bucket_width() -> int:
+    return int(getattr(settings, "DASHBOARD_ROLLUP_BUCKET_EUR", 500))
+
+class _Delta:
+    __slots__ = ("n", "total", "lo", "hi", "buckets", "sketch")
+
+    def __init__(self):
+        self.n = 0
+        self.total = Decimal(0)
+        self.lo = None
+        self.hi = None
+        self.buckets = Counter()
+        self.sketch = KLL()
+
+    def add(self, salary, width):
+        salary = Decimal(salary)
+        self.n += 1
+        self.total += salary
+        self.lo = salary if self.lo is None else min(self.lo, salary)
+        self.hi = salary if self.hi is None else max(self.hi, salary)
+        self.buckets[int(salary // width)] += 1
+        self.sketch.update(salary)
+
+def _aggregate(rows):
+    # rows: iterable of ROW_FIELDS tuples
+    width = bucket_width()
+    cells = defaultdict(_Delta)
+    for row in rows:
+        cells[tuple(row[:-1])].add(row[-1], width)
+    return cells
+
+def _new_cell(key, d):
+    return RollupCell(**dict(zip(ID_FIELDS, key)), n=d.n, total=d.total, min_salary=d.lo, max_salary=d.hi,
+                      sketch=d.sketch.to_dict())
+
+def _merge(cell, d):
+    cell.n += d.n
+    cell.total += d.total
+    cell.min_salary = min(cell.min_salary, d.lo)
+    cell.max_salary = max(cell.max_salary, d.hi)
+    cell.sketch = KLL.from_dict(cell.sketch).merge(d.sketch).to_dict()
+
+def _locked_cells(keys) -> dict:
+    # one query for a superset (IN per dimension), narrowed to the exact keys here
+    wanted = set(keys)
+    qs = RollupCell.objects.select_for_update().filter(
+        **{f"{f}__in": sorted({k[i] for k in wanted}) for i, f in enumerate(ID_FIELDS)}
+    ).order_by("id")
+    cells = ((tuple(getattr(c, f) for f in ID_FIELDS), c) for c in qs)
+    return {key: c for key, c in cells if key in wanted}
+
+def _add_one(key, d):
+    cell, created = RollupCell.objects.select_for_update().get_or_create(
+        **dict(zip(ID_FIELDS, key)),
+        defaults={"n": d.n, "total": d.total, "min_salary": d.lo, "max_salary": d.hi, "sketch": d.sketch.to_dict()},
+    )
+    if created:
+        RollupBucket.objects.bulk_create([RollupBucket(cell=cell, bucket=b, n=c) for b, c in d.buckets.items()])
+        return
+    _merge(cell, d)
+    cell.save(update_fields=["n", "total", "min_salary", "max_salary", "sketch"])
+    for b, c in d.buckets.items():
+        if not RollupBucket.objects.filter(cell=cell, bucket=b).update(n=F("n") + c):
+            RollupBucket.objects.create(cell=cell, bucket=b, n=c)
+
+def add_rows(rows):
+    # a constant number of statements per call, however many rows and cells it touches
+    cells = _aggregate(rows)
+    if not cells:
+        return
+    with transaction.atomic():
+        existing = _locked_cells(cells)
+        new = [k for k in cells if k not in existing]
+        try:
+            with transaction.atomic():
+                created = RollupCell.objects.bulk_create([_new_cell(k, cells[k]) for k in new], batch_size=1000)
+        except IntegrityError:
+            # another transaction inserted some of these cells first: merge them one by one
+            created = []
+            for k in new:
+                _add_one(k, cells[k])
+        buckets = [RollupBucket(cell=cell, bucket=b, n=c) for cell in created
+                   for b, c in cells[tuple(getattr(cell, f) for f in ID_FIELDS)].buckets.items()]
+
+        for key, cell in existing.items():
+            _merge(cell, cells[key])
+        # ON CONFLICT DO UPDATE on rows known to exist: cheaper than bulk_update's CASE expressions
+        RollupCell.objects.bulk_create(
+            existing.values(), batch_size=1000, update_conflicts=True, unique_fields=["id"],
+            update_fields=["n", "total", "min_salary", "max_salary", "sketch"],
+        )
+        # bucket rows only change under their cell's lock, which is held here
+        touched = {b for key in existing for b in cells[key].buckets}
+        stored = dict(((cell_id, b), n) for cell_id, b, n in RollupBucket.objects.filter(
+            cell_id__in=[c.id for c in existing.values()], bucket__in=touched).values_list("cell_id", "bucket", "n"))
+        buckets += [
+            RollupBucket(cell=cell, bucket=b, n=stored.get((cell.id, b), 0) + c)
+            for key, cell in existing.items() for b, c in cells[key].buckets.items()
+        ]
+        RollupBucket.objects.bulk_create(buckets, batch_size=1000, update_conflicts=True,
+                                         unique_fields=["cell", "bucket"], update_fields=["n"])
+
+def remove_rows(rows):
+    # min/max and the quantile sketch cannot forget values: the cells keep them and are marked
+    # stale, and refresh_stale() rebuilds them from the base rows before the next query
+    cells = _aggregate(rows)
+    if not cells:
+        return
+    with transaction.atomic():
+        existing = _locked_cells(cells)
+        gone = [cell.id for key, cell in existing.items() if cell.n <= cells[key].n]
+        RollupCell.objects.filter(id__in=gone).delete()
+        kept = {key: cell for key, cell in existing.items() if cell.id not in gone}
+        for key, cell in kept.items():
+            cell.n -= cells[key].n
+            cell.total -= cells[key].total
+            cell.stale = True
+        RollupCell.objects.bulk_update(kept.values(), ["n", "total", "stale"], batch_size=1000)
+
+        touched = {b for key in kept for b in cells[key].buckets}
+        stored = dict(((cell_id, b), n) for cell_id, b, n in RollupBucket.objects.filter(
+            cell_id__in=[c.id for c in kept.values()], bucket__in=touched).values_list("cell_id", "bucket", "n"))
+        RollupBucket.objects.bulk_create(
+            [RollupBucket(cell=cell, bucket=b, n=stored.get((cell.id, b), 0) - c)
+             for key, cell in kept.items() for b, c in cells[key].buckets.items()],
+            batch_size=1000, update_conflicts=True, unique_fields=["cell", "bucket"], update_fields=["n"],
+        )
+        RollupBucket.objects.filter(cell_id__in=[c.id for c in kept.values()], n__lte=0).delete()
+
+def refresh_stale() -> int:
+    """Rebuild min/max and the sketch of the cells remove_rows() marked stale; returns how many."""
+    if not RollupCell.objects.filter(stale=True).exists():
+        return 0
+    width = bucket_width()
+    with transaction.atomic():
+        cells = list(RollupCell.objects.select_for_update().filter(stale=True).order_by("id"))
+        for cell in cells:
+            remaining = _Delta()
+            dims = {f: getattr(cell, f) for f in ID_FIELDS}
+            rows = SalaryRecord.objects.filter(deleted_at__isnull=True, **dims).order_by("record_id")
+            for salary in rows.values_list("salary_eur", flat=True):
+                remaining.add(salary, width)
+            cell.min_salary, cell.max_salary = remaining.lo, remaining.hi
+            cell.sketch = remaining.sketch.to_dict()
+            cell.stale = False
+        RollupCell.objects.bulk_update(cells, ["min_salary", "max_salary", "sketch", "stale"], batch_size=1000)
+    return len(cells)
+
+def _expected():
+    qs = SalaryRecord.objects.filter(deleted_at__isnull=True).order_by("record_id").values_list(*ROW_FIELDS)
+    return _aggregate(qs.iterator(chunk_size=5000))
+
+def rebuild(batch_size: int = 1000):
+    cells = _expected()
+    with transaction.atomic():
+        RollupBucket.objects.all().delete()
+        RollupCell.objects.all().delete()
+        keys = list(cells.keys())
+        objs = RollupCell.objects.bulk_create(
+            [
+                RollupCell(**dict(zip(ID_FIELDS, k)), n=cells[k].n, total=cells[k].total,
+                           min_salary=cells[k].lo, max_salary=cells[k].hi, sketch=cells[k].sketch.to_dict())
+                for k in keys
+            ],
+            batch_size=batch_size,
+        )
+        buckets = [
+            RollupBucket(cell=obj, bucket=b, n=c)
+            for k, obj in zip(keys, objs)
+            for b, c in cells[k].buckets.items()
+        ]
+        RollupBucket.objects.bulk_create(buckets, batch_size=batch_size)
+    return len(keys), len(buckets)
+
+def verify(limit: int = 50):
+    refresh_stale()
+    expected = _expected()
+    stored = {tuple(getattr(c, f) for f in ID_FIELDS): c for c in RollupCell.objects.all()}
+    stored_buckets = defaultdict(dict)
+    for cell_id, b, n in RollupBucket.objects.values_list("cell_id", "bucket", "n"):
+        stored_buckets[cell_id][b] = n
+
+    problems = []
+    for key in expected.keys() | stored.keys():
+        exp, cell = expected.get(key), stored.get(key)
+        label = "/".join(dictionary.name(d, i) for d, i in zip(DIMENSIONS, key))
+        if cell is None:
+            problems.append(f"missing cell {label}")
+        elif exp is None:
+            problems.append(f"orphan cell {label} n={cell.n}")
+        else:
+            got = (cell.n, cell.total, cell.min_salary, cell.max_salary)
+            want = (exp.n, exp.total, exp.lo, exp.hi)
+            if got != want:
+                problems.append(f"cell {label}: stored {got} expected {want}")
+            if stored_buckets.get(cell.id, {}) != dict(exp.buckets):
+                problems.append(f"cell {label}: histogram mismatch")
+            if (cell.sketch or {}).get("n") != exp.n:
+                problems.append(f"cell {label}: sketch holds {(cell.sketch or {}).get('n')} values, expected {exp.n}")
+        if len(problems) >= limit:
+            break
+    return problems
+
+def _histogram(where_sql, args):
+    rows = fetch_all(
+        f"""
+        SELECT b.bucket, SUM(b.n)
+        FROM {BUCKETS} b JOIN {CELLS} r ON r.id = b.cell_id
+        WHERE {where_sql}
+        GROUP BY b.bucket
+        ORDER BY b.bucket
+        """,
+        args,
+    )
+    return [(int(b), int(c)) for b, c in rows]
+
+def _sketches(where_sql, args, group_col=None):
+    # group_col may list several columns ("r.city, r.industry"); groups are then keyed by tuple
+    sel = f"{group_col}, " if group_col else ""
+    # merge in a fixed order: the result of a merge depends on it
+    rows = fetch_all(f"SELECT {sel}r.sketch FROM {CELLS} r WHERE {where_sql} ORDER BY r.id", args)
+    load = lambda v: json.loads(v) if isinstance(v, str) else v
+    if not group_col:
+        return merged(load(r[0]) for r in rows)
+    groups = defaultdict(list)
+    for *g, sk in rows:
+        groups[g[0] if len(g) == 1 else tuple(g)].append(load(sk))
+    return {g: merged(sks) for g, sks in groups.items()}
+
+def _totals(where_sql, args):
+    row = fetch_one(
+        f"SELECT COALESCE(SUM(r.n), 0), SUM(r.total), MIN(r.min_salary), MAX(r.max_salary) FROM {CELLS} r WHERE {where_sql}",
+        args,
+    )
+    cnt = int(row[0] or 0)
+    if not cnt:
+        return 0, None, None, None
+    return cnt, float(row[1]) / cnt, float(row[2]), float(row[3])
+
+def summary(params):
+    refresh_stale()
+    where_sql, args = build_where(params, live_only=False)
+    cnt, mean, minv, maxv = _totals(where_sql, args)
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True}
+
+    p25, median, p75 = _sketches(where_sql, args).quantiles([0.25, 0.50, 0.75])
+    return {
+        "count": cnt,
+        "suppressed": False,
+        "mean": mean,
+        "min": minv,
+        "max": maxv,
+        "p25": p25,
+        "median": median,
+        "p75": p75,
+    }
+
+def options(params, facet_mode: str = "conjunctive"):
+    # the cell table is small: read it once and count every dimension in Python. The counts
+    # are exact; a cell that misses only dimension d's filter counts towards d's disjunctive facet.
+    wanted = {dim: set(ids) for dim, _, ids in filter_clauses(params)}
+    counts = {d: Counter() for d in DIMENSIONS}
+    others = {d: Counter() for d in DIMENSIONS}
+    for *key, n in RollupCell.objects.values_list(*ID_FIELDS, "n").iterator(chunk_size=5000):
+        misses = [j for j, d in enumerate(DIMENSIONS) if d in wanted and key[j] not in wanted[d]]
+        if not misses:
+            for d, i in zip(DIMENSIONS, key):
+                counts[d][i] += n
+        elif len(misses) == 1 and facet_mode == "disjunctive":
+            j = misses[0]
+            others[DIMENSIONS[j]][key[j]] += n
+
+    out = {}
+    for d in DIMENSIONS:
+        out[d] = {
+            dictionary.name(d, i): (counts[d][i], counts[d][i] + others[d][i] if d in wanted else counts[d][i])
+            for i in counts[d].keys() | others[d].keys()
+        }
+    return facet_payload(out, facet_mode)
+
+def grouped(params, group_by: str, metric: str = "median", limit: int = 20):
+    refresh_stale()
+    if group_by not in ALLOWED_FILTERS:
+        raise ValueError("invalid group_by")
+
+    where_sql, args = build_where(params, live_only=False)
+    cnt = _totals(where_sql, args)[0]
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True, "data": []}
+
+    col = ALLOWED_FILTERS[group_by]
+    rows = fetch_all(
+        f"""
+        SELECT {col}, SUM(r.n), SUM(r.total)
+        FROM {CELLS} r
+        WHERE {where_sql}
+        GROUP BY {col}
+        """,
+        args,
+    )
+    sketches = _sketches(where_sql, args, col) if metric != "mean" else {}
+    data = []
+    for key, n, total in rows:
+        n = int(n)
+        if metric == "mean":
+            value = float(total) / n
+        else:
+            value = sketches[key].quantiles([0.50])[0]
+        data.append({"key": dictionary.name(group_by, key), "value": value, "n": n})
+    data.sort(key=lambda d: d["value"], reverse=True)
+    return {"count": cnt, "suppressed": False, "data": data[:limit]}
+
+def distribution(params, bins: int = 20):
+    refresh_stale()
+    where_sql, args = build_where(params, live_only=False)
+    cnt, _, minv, maxv = _totals(where_sql, args)
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True, "bins": [], "counts": []}
+    if minv == maxv:
+        return {"count": cnt, "suppressed": False, "bins": [minv], "counts": [cnt]}
+
+    width = bucket_width()
+    step = (maxv - minv) / bins
+    counts = [0] * bins
+    # fine buckets are assigned to the output bin containing their midpoint
+    for b, c in _histogram(where_sql, args):
+        mid = min(max((b + 0.5) * width, minv), maxv)
+        counts[min(int((mid - minv) / step), bins - 1)] += c
+    bin_edges = [minv + step * i for i in range(bins + 1)]
+    return {"count": cnt, "suppressed": False, "bins": bin_edges, "counts": counts}
+
+def pivot(params, rows: str, cols: str):
+    refresh_stale()
+    where_sql, args = build_where(params, live_only=False)
+    rc, cc = ALLOWED_FILTERS[rows], ALLOWED_FILTERS[cols]
+    stats = fetch_all(
+        f"SELECT {rc}, {cc}, SUM(r.n), SUM(r.total) FROM {CELLS} r WHERE {where_sql} GROUP BY {rc}, {cc}",
+        args,
+    )
+    sketches = _sketches(where_sql, args, f"{rc}, {cc}")
+    cells = {}
+    for r, c, n, total in stats:
+        n = int(n)
+        names = (dictionary.name(rows, r), dictionary.name(cols, c))
+        cells[names] = (n, float(total) / n, sketches[(r, c)].quantiles([0.50])[0])
+    return pivot_payload(rows, cols, cells)
@@ -1,24 +1,59 @@
-from django.core.cache import cache
-from .filters import build_where, normalize_key
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from django.conf import settings
+from django.db import close_old_connections
+from metrics import registry
+from . import rollups
+from records.dictionary import dictionary
+from . import caching
+from .caching import cached
+from .facets import facet_payload
+from .filters import ALLOWED_FILTERS, OPTION_LISTS, build_where, cohort_filters, filter_clauses, prefixed
+from .pivot import check_dims, pivot_payload
 from .privacy import suppress_if_small
 from .sql import fetch_one, fetch_all
 
+ACCURACY = ("exact", "approx")
+
+def _accuracy(accuracy=None) -> str:
+    # "approx" answers quantiles from merged rollup sketches, "exact" from the records themselves;
+    # without maintained rollups (DASHBOARD_ROLLUPS) every answer is exact
+    if not rollups.enabled():
+        return "exact"
+    if accuracy in ACCURACY:
+        return accuracy
+    return "approx" if getattr(settings, "DASHBOARD_ENGINE", "sql") == "rollup" else "exact"
+
+def _backend(name: str, accuracy=None):
+    # None means the live SQL implementations below
+    engine = getattr(settings, "DASHBOARD_ENGINE", "sql")
+    if _accuracy(accuracy) == "approx":
+        backend = rollups
+    elif engine == "snapshot":
+        from . import snapshot  # needs numpy
+        backend = snapshot
+    else:
+        return None
+    if not hasattr(backend, name):
+        return None
+    return backend
+
 def _count(where_sql: str, args: list) -> int:
     row = fetch_one(f"SELECT COUNT(*) FROM records_salaryrecord r WHERE {where_sql}", args)
     return int(row[0]) if row else 0
 
-def summary(params):
-    where_sql, args = build_where(params)
-    key = f"dash:summary:{normalize_key(params)}"
-    cached = cache.get(key)
-    if cached:
-        return cached
+def summary(params, accuracy=None, raw: bool = False):
+    accuracy = _accuracy(accuracy)
+    backend = _backend("summary", accuracy)
+    return cached("summary", params, (accuracy,), lambda: backend.summary(params) if backend else _summary_sql(params), raw)
 
+def _summary_sql(params):
+    where_sql, args = build_where(params)
     cnt = _count(where_sql, args)
     if suppress_if_small(cnt):
-        out = {"count": cnt, "suppressed": True}
-        cache.set(key, out, 60)
-        return out
+        return {"count": cnt, "suppressed": True}
 
     sql = f"""
     SELECT
@@ -32,7 +67,7 @@ def summary(params):
     WHERE {where_sql}
     """
     row = fetch_one(sql, args)
-    out = {
+    return {
         "count": cnt,
         "suppressed": False,
         "mean": row[0],
@@ -42,57 +77,80 @@ def summary(params):
         "median": row[4],
         "p75": row[5],
     }
-    cache.set(key, out, 60)
-    return out
 
-def options(params):
-    where_sql, args = build_where(params)
-    key = f"dash:options:{normalize_key(params)}"
-    cached = cache.get(key)
-    if cached:
-        return cached
-
-    def distinct(col):
-        rows = fetch_all(
-            f"SELECT DISTINCT {col} FROM records_salaryrecord r WHERE {where_sql} ORDER BY {col} LIMIT 5000",
-            args,
-        )
-        return [r[0] for r in rows if r and r[0] is not None]
-
-    out = {
-        "cities": distinct("r.city"),
-        "industries": distinct("r.industry"),
-        "occupations": distinct("r.occupation"),
-        "majors": distinct("r.major"),
-        "universities": distinct("r.university"),
-        "experience_categories": distinct("r.experience_category"),
-    }
-    cache.set(key, out, 300)
-    return out
+FACET_MODES = ("conjunctive", "disjunctive")
 
-def grouped(params, group_by: str, metric: str = "median", limit: int = 20):
-    allowed = {
-        "city": "r.city",
-        "industry": "r.industry",
-        "occupation": "r.occupation",
-        "major": "r.major",
-        "university": "r.university",
-        "experience_category": "r.experience_category",
-    }
-    if group_by not in allowed:
+def options(params, facet_mode: str = "conjunctive", raw: bool = False):
+    if facet_mode not in FACET_MODES:
+        raise ValueError("invalid facet mode")
+    backend = _backend("options")
+    return cached(
+        "options", params, (facet_mode,),
+        lambda: backend.options(params, facet_mode) if backend else _options_sql(params, facet_mode),
+        raw, disjunctive=facet_mode == "disjunctive",
+    )
+
+def _options_sql(params, facet_mode: str = "conjunctive"):
+    # one scan: GROUPING SETS yields every (dimension, value) pair; disjunctive counts for a
+    # filtered dimension use every filter except that dimension's own
+    clauses = filter_clauses(params)
+    disjunctive = facet_mode == "disjunctive" and clauses
+    cols = list(ALLOWED_FILTERS.items())
+
+    counts_sql, args = [], []
+    if disjunctive:
+        conj = " AND ".join(c for _, c, _ in clauses)
+        counts_sql.append(f"COUNT(*) FILTER (WHERE {conj})")
+        args.extend(v for _, _, vals in clauses for v in vals)
+        for key, _, _ in clauses:
+            others = [(c, vals) for k, c, vals in clauses if k != key]
+            if others:
+                counts_sql.append(f"COUNT(*) FILTER (WHERE {' AND '.join(c for c, _ in others)})")
+                args.extend(v for _, vals in others for v in vals)
+            else:
+                counts_sql.append("COUNT(*)")
+        where_sql = "r.deleted_at IS NULL"
+    else:
+        counts_sql.append("COUNT(*)")
+        where_sql, where_args = build_where(params)
+        args.extend(where_args)
+
+    sql = f"""
+    SELECT CASE {" ".join(f"WHEN GROUPING({col}) = 0 THEN '{key}'" for key, col in cols)} END AS dim,
+           COALESCE({", ".join(col for _, col in cols)}) AS value,
+           {", ".join(counts_sql)}
+    FROM records_salaryrecord r
+    WHERE {where_sql}
+    GROUP BY GROUPING SETS ({", ".join(f"({col})" for _, col in cols)})
+    """
+    filtered = [key for key, _, _ in clauses] if disjunctive else []
+    counts = {key: {} for key in ALLOWED_FILTERS}
+    for dim, value, n, *own in fetch_all(sql, args):
+        if value is None:
+            continue
+        n_disjunctive = own[filtered.index(dim)] if dim in filtered else n
+        counts[dim][dictionary.name(dim, value)] = (int(n), int(n_disjunctive))
+    return facet_payload(counts, facet_mode)
+
+def grouped(params, group_by: str, metric: str = "median", limit: int = 20, accuracy=None, raw: bool = False):
+    if group_by not in ALLOWED_FILTERS:
         raise ValueError("invalid group_by")
 
-    where_sql, args = build_where(params)
-    key = f"dash:grouped:{group_by}:{metric}:{limit}:{normalize_key(params)}"
-    cached = cache.get(key)
-    if cached:
-        return cached
+    accuracy = _accuracy(accuracy)
+    backend = _backend("grouped", accuracy)
 
+    def compute():
+        if backend:
+            return backend.grouped(params, group_by, metric, limit)
+        return _grouped_sql(params, group_by, metric, limit)
+
+    return cached("grouped", params, (group_by, metric, limit, accuracy), compute, raw)
+
+def _grouped_sql(params, group_by: str, metric: str = "median", limit: int = 20):
+    where_sql, args = build_where(params)
     cnt = _count(where_sql, args)
     if suppress_if_small(cnt):
-        out = {"count": cnt, "suppressed": True, "data": []}
-        cache.set(key, out, 60)
-        return out
+        return {"count": cnt, "suppressed": True, "data": []}
 
     if metric == "mean":
         metric_sql = "AVG(r.salary_eur)::float"
@@ -100,36 +158,32 @@ def grouped(params, group_by: str, metric: str = "median", limit: int = 20):
         metric_sql = "percentile_cont(0.50) WITHIN GROUP (ORDER BY r.salary_eur)::float"
 
     sql = f"""
-    SELECT {allowed[group_by]} AS key,
+    SELECT {ALLOWED_FILTERS[group_by]} AS key,
            {metric_sql} AS value,
            COUNT(*)::int AS n
     FROM records_salaryrecord r
     WHERE {where_sql}
-    GROUP BY {allowed[group_by]}
+    GROUP BY {ALLOWED_FILTERS[group_by]}
     ORDER BY value DESC NULLS LAST
     LIMIT %s
     """
     rows = fetch_all(sql, args + [limit])
-    out = {
+    return {
         "count": cnt,
         "suppressed": False,
-        "data": [{"key": r[0], "value": r[1], "n": r[2]} for r in rows],
+        "data": [{"key": dictionary.name(group_by, r[0]), "value": r[1], "n": r[2]} for r in rows],
     }
-    cache.set(key, out, 60)
-    return out
 
-def distribution(params, bins: int = 20):
-    where_sql, args = build_where(params)
-    key = f"dash:dist:{bins}:{normalize_key(params)}"
-    cached = cache.get(key)
-    if cached:
-        return cached
+def distribution(params, bins: int = 20, accuracy=None, raw: bool = False):
+    accuracy = _accuracy(accuracy)
+    backend = _backend("distribution", accuracy)
+    return cached("dist", params, (bins, accuracy), lambda: backend.distribution(params, bins) if backend else _distribution_sql(params, bins), raw)
 
+def _distribution_sql(params, bins: int = 20):
+    where_sql, args = build_where(params)
     cnt = _count(where_sql, args)
     if suppress_if_small(cnt):
-        out = {"count": cnt, "suppressed": True, "bins": [], "counts": []}
-        cache.set(key, out, 60)
-        return out
+        return {"count": cnt, "suppressed": True, "bins": [], "counts": []}
 
     mm = fetch_one(
         f"SELECT MIN(r.salary_eur)::float, MAX(r.salary_eur)::float FROM records_salaryrecord r WHERE {where_sql}",
@@ -137,21 +191,19 @@ def distribution(params, bins: int = 20):
     )
     minv, maxv = float(mm[0]), float(mm[1])
     if minv == maxv:
-        out = {"count": cnt, "suppressed": False, "bins": [minv], "counts": [cnt]}
-        cache.set(key, out, 60)
-        return out
+        return {"count": cnt, "suppressed": False, "bins": [minv], "counts": [cnt]}
 
     sql = f"""
     SELECT bucket, COUNT(*)::int
     FROM (
-      SELECT width_bucket(r.salary_eur, %s, %s, %s) AS bucket
+      SELECT LEAST(width_bucket(r.salary_eur, %s, %s, %s), %s) AS bucket  -- the maximum goes in the last bin
       FROM records_salaryrecord r
       WHERE {where_sql}
     ) t
     GROUP BY bucket
     ORDER BY bucket
     """
-    rows = fetch_all(sql, [minv, maxv, bins] + args)
+    rows = fetch_all(sql, [minv, maxv, bins, bins] + args)
     step = (maxv - minv) / bins
     bin_edges = [minv + step * i for i in range(bins + 1)]
     counts = [0] * bins
@@ -161,24 +213,218 @@ def distribution(params, bins: int = 20):
         idx = int(b) - 1
         if 0 <= idx < bins:
             counts[idx] = c
-    out = {"count": cnt, "suppressed": False, "bins": bin_edges, "counts": counts}
-    cache.set(key, out, 60)
-    return out
+    return {"count": cnt, "suppressed": False, "bins": bin_edges, "counts": counts}
 
-def compare(params, a_prefix="a_", b_prefix="b_"):
-    class PWrap:
-        def __init__(self, qp, prefix):
-            self.qp = qp
-            self.prefix = prefix
-        def getlist(self, key):
-            return self.qp.getlist(self.prefix + key)
+def pivot(params, rows: str, cols: str, accuracy=None, raw: bool = False):
+    check_dims(rows, cols)
+    accuracy = _accuracy(accuracy)
+    backend = _backend("pivot", accuracy)
+    return cached("pivot", params, (rows, cols, accuracy), lambda: backend.pivot(params, rows, cols) if backend else _pivot_sql(params, rows, cols), raw)
 
-    a = summary(PWrap(params, a_prefix))
-    b = summary(PWrap(params, b_prefix))
+def _pivot_sql(params, rows: str, cols: str):
+    where_sql, args = build_where(params)
+    rc, cc = ALLOWED_FILTERS[rows], ALLOWED_FILTERS[cols]
+    sql = f"""
+    SELECT {rc}, {cc},
+           COUNT(*)::int,
+           AVG(r.salary_eur)::float,
+           percentile_cont(0.50) WITHIN GROUP (ORDER BY r.salary_eur)::float
+    FROM records_salaryrecord r
+    WHERE {where_sql}
+    GROUP BY {rc}, {cc}
+    """
+    cells = {
+        (dictionary.name(rows, r), dictionary.name(cols, c)): (n, mean, median)
+        for r, c, n, mean, median in fetch_all(sql, args)
+    }
+    return pivot_payload(rows, cols, cells)
+
+DELTA_METRICS = ("median", "p25", "p75", "mean")
 
+def _delta(a: dict, b: dict) -> dict:
     delta = {}
     if not a.get("suppressed") and not b.get("suppressed"):
-        for k in ("median","p25","p75","mean"):
+        for k in DELTA_METRICS:
             if a.get(k) is not None and b.get(k) is not None:
                 delta[k] = a[k] - b[k]
-    return {"a": a, "b": b, "delta": delta}
+    return delta
+
+def compare(params, a_prefix="a_", b_prefix="b_", accuracy=None):
+    a = summary(prefixed(params, a_prefix), accuracy)
+    b = summary(prefixed(params, b_prefix), accuracy)
+    return {"a": a, "b": b, "delta": _delta(a, b)}
+
+_cohort_lock = threading.Lock()
+_cohort_executor = None
+
+def _cohort_pool():
+    global _cohort_executor
+    with _cohort_lock:
+        if _cohort_executor is None:
+            _cohort_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DASHBOARD_COHORT_WORKERS", 6),
+                thread_name_prefix="dash-cohort",
+            )
+        return _cohort_executor
+
+def _cohort_summary(params, accuracy, stats):
+    # pool threads keep their own connections; recycle them like a request would
+    close_old_connections()
+    caching.reset_stale()
+    try:
+        if stats is None:
+            return summary(params, accuracy), caching.served_stale()
+        # count this thread's queries and cache lookups into the request's Server-Timing
+        with registry.attached(stats):
+            return summary(params, accuracy), caching.served_stale()
+    finally:
+        close_old_connections()
+
+def cohorts(params, accuracy=None):
+    """Summaries for every c<N>_* cohort, computed concurrently, with pairwise deltas."""
+    filters = cohort_filters(params)
+    if not filters or len(filters) > getattr(settings, "DASHBOARD_MAX_COHORTS", 8):
+        raise ValueError("invalid cohorts")
+
+    names = list(filters)
+    # the first cohort runs on the request thread, the rest on the pool
+    stats = registry.current()
+    futures = [_cohort_pool().submit(_cohort_summary, filters[n], accuracy, stats) for n in names[1:]]
+    results = [summary(filters[names[0]], accuracy)]
+    for f in futures:
+        result, stale = f.result()
+        results.append(result)
+        if stale:
+            caching.mark_stale()  # see dashboard.http_cache
+
+    return {
+        "cohorts": [
+            {"name": n, "filters": dict(filters[n]), "summary": r}
+            for n, r in zip(names, results)
+        ],
+        "deltas": [
+            {"a": names[i], "b": names[j], "delta": _delta(results[i], results[j])}
+            for i, j in combinations(range(len(names)), 2)
+        ],
+    }
+
+def bundle(params, group_by: str = "city", metric: str = "median", limit: int = 20, bins: int = 20, accuracy=None,
+           raw: bool = False):
+    if group_by not in ALLOWED_FILTERS:
+        raise ValueError("invalid group_by")
+
+    accuracy = _accuracy(accuracy)
+
+    def compute():
+        if _backend("summary", accuracy):
+            return {
+                "options": options(params),
+                "summary": summary(params, accuracy),
+                "grouped": grouped(params, group_by, metric, limit, accuracy),
+                "distribution": distribution(params, bins, accuracy),
+            }
+        return _bundle_sql(params, group_by, metric, limit, bins)
+
+    return cached("bundle", params, (group_by, metric, limit, bins, accuracy), compute, raw)
+
+def _bundle_sql(params, group_by: str, metric: str, limit: int, bins: int):
+    # every panel in one statement: the filtered set is materialized once as the CTE "f"
+    where_sql, args = build_where(params)
+    if metric == "mean":
+        metric_sql = "AVG(f.salary_eur)::float"
+    else:
+        metric_sql = "percentile_cont(0.50) WITHIN GROUP (ORDER BY f.salary_eur)::float"
+    facets = "\n".join(
+        f"UNION ALL SELECT 'opt:{col}', f.{col}::text, COUNT(*)::int, NULL, NULL, NULL, NULL, NULL, NULL FROM f GROUP BY f.{col}"
+        for col in OPTION_LISTS.values()
+    )
+
+    sql = f"""
+    WITH f AS (
+      SELECT {", ".join(f"{col} AS {dim}" for dim, col in ALLOWED_FILTERS.items())}, r.salary_eur
+      FROM records_salaryrecord r
+      WHERE {where_sql}
+    ),
+    s AS (
+      SELECT COUNT(*)::int AS n,
+             AVG(f.salary_eur)::float AS mean,
+             MIN(f.salary_eur)::float AS lo,
+             MAX(f.salary_eur)::float AS hi,
+             percentile_cont(0.25) WITHIN GROUP (ORDER BY f.salary_eur)::float AS p25,
+             percentile_cont(0.50) WITHIN GROUP (ORDER BY f.salary_eur)::float AS median,
+             percentile_cont(0.75) WITHIN GROUP (ORDER BY f.salary_eur)::float AS p75
+      FROM f
+    ),
+    g AS (
+      SELECT f.{group_by} AS key, {metric_sql} AS value, COUNT(*)::int AS n
+      FROM f
+      GROUP BY f.{group_by}
+      ORDER BY value DESC NULLS LAST
+      LIMIT %s
+    ),
+    d AS (
+      SELECT LEAST(width_bucket(f.salary_eur, s.lo, s.hi, %s), %s) AS bucket, COUNT(*)::int AS n
+      FROM f, s
+      WHERE s.lo < s.hi
+      GROUP BY 1
+    )
+    SELECT 'summary', NULL, s.n, s.mean, s.lo, s.hi, s.p25, s.median, s.p75 FROM s
+    UNION ALL SELECT 'grouped', g.key::text, g.n, g.value, NULL, NULL, NULL, NULL, NULL FROM g
+    UNION ALL SELECT 'dist', d.bucket::text, d.n, NULL, NULL, NULL, NULL, NULL, NULL FROM d
+    {facets}
+    """
+    rows = fetch_all(sql, args + [limit, bins, bins])
+
+    stats = None
+    top, buckets = [], []
+    facets = {dim: {} for dim in OPTION_LISTS.values()}
+    for panel, key, n, v, lo, hi, p25, median, p75 in rows:
+        if panel == "summary":
+            stats = (n, v, lo, hi, p25, median, p75)
+        elif panel == "grouped":
+            top.append({"key": dictionary.name(group_by, int(key)), "value": v, "n": n})
+        elif panel == "dist":
+            buckets.append((key, n))
+        elif key is not None:
+            dim = panel[4:]
+            facets[dim][dictionary.name(dim, int(key))] = (n, n)
+
+    out = {"options": facet_payload(facets, "conjunctive")}
+    cnt, mean, minv, maxv, p25, median, p75 = stats
+    if suppress_if_small(cnt):
+        out["summary"] = {"count": cnt, "suppressed": True}
+        out["grouped"] = {"count": cnt, "suppressed": True, "data": []}
+        out["distribution"] = {"count": cnt, "suppressed": True, "bins": [], "counts": []}
+        return out
+
+    top.sort(key=lambda g: (g["value"] is None, -(g["value"] or 0)))
+    out["summary"] = {
+        "count": cnt,
+        "suppressed": False,
+        "mean": mean,
+        "min": minv,
+        "max": maxv,
+        "p25": p25,
+        "median": median,
+        "p75": p75,
+    }
+    out["grouped"] = {"count": cnt, "suppressed": False, "data": top}
+
+    if minv == maxv:
+        out["distribution"] = {"count": cnt, "suppressed": False, "bins": [minv], "counts": [cnt]}
+        return out
+    step = (maxv - minv) / bins
+    counts = [0] * bins
+    for b, c in buckets:
+        if b is None:
+            continue
+        idx = int(b) - 1
+        if 0 <= idx < bins:
+            counts[idx] = c
+    out["distribution"] = {
+        "count": cnt,
+        "suppressed": False,
+        "bins": [minv + step * i for i in range(bins + 1)],
+        "counts": counts,
+    }
+    return out
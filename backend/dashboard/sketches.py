@@ -0,0 +1,107 @@
+import math
+
+# KLL quantile sketch (Karnin, Lang, Liberty 2016).
+# With k=200 the normalized rank error is about 1.65% at 99% confidence, independent of
+# the number of values and preserved by merging: a p50 estimate lies between the true
+# p48.35 and p51.65.
+DEFAULT_K = 200
+C = 2 / 3
+
+MASK = (1 << 64) - 1
+
+def _coin(n: int, level: int, filled: int) -> int:
+    # the compaction's "random" bit, mixed (splitmix64) from the sketch state, so the same values
+    # in the same order give the same sketch in every process and rebuild
+    x = (n * 0x9E3779B97F4A7C15 + level * 0xBF58476D1CE4E5B9 + filled) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return (x ^ (x >> 31)) & 1
+
+class KLL:
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * C ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(l) for l in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        while self._size() > self._max_size():
+            for h, items in enumerate(self.levels):
+                if len(items) >= self._capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    offset = _coin(self.n, h, len(self.levels[h + 1]))
+                    self.levels[h + 1].extend(items[offset::2])
+                    self.levels[h] = []
+                    break
+
+    def update(self, value: float):
+        self.levels[0].append(float(value))
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLL"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        if not any(self.levels[1:]):
+            # nothing compacted yet: every value is present, interpolate like percentile_cont
+            vals = sorted(self.levels[0])
+            if not vals:
+                return [None for _ in qs]
+            out = []
+            for q in qs:
+                pos = q * (len(vals) - 1)
+                lo = int(pos)
+                hi = min(lo + 1, len(vals) - 1)
+                out.append(vals[lo] + (vals[hi] - vals[lo]) * (pos - lo))
+            return out
+
+        weighted = sorted((v, 1 << h) for h, items in enumerate(self.levels) for v in items)
+        total = sum(w for _, w in weighted)
+        out = []
+        for q in qs:
+            target = q * total
+            cum = 0
+            value = weighted[-1][0]
+            for v, w in weighted:
+                cum += w
+                if cum >= target:
+                    value = v
+                    break
+            out.append(value)
+        return out
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data) -> "KLL":
+        sketch = cls(data.get("k", DEFAULT_K)) if data else cls()
+        if data:
+            sketch.n = data["n"]
+            sketch.levels = [list(l) for l in data["levels"]] or [[]]
+        return sketch
+
+def merged(dicts, k: int = DEFAULT_K) -> KLL:
+    out = KLL(k)
+    for d in dicts:
+        out.merge(KLL.from_dict(d))
+    return out
@@ -0,0 +1,198 @@
+import threading
+from array import array
+
+import numpy as np
+
+from records.dictionary import dictionary
+from records.models import SalaryRecord
+from . import dataset
+from .facets import facet_payload
+from .pivot import pivot_payload
+from .filters import ALLOWED_FILTERS
+from .privacy import suppress_if_small
+
+DIMENSIONS = tuple(ALLOWED_FILTERS.keys())
+ID_FIELDS = tuple(f"{d}_id" for d in DIMENSIONS)
+
+class Snapshot:
+    """Non-deleted salary records as columns, sorted by salary.
+
+    ``codes[dim]`` holds the records' int32 lookup-table ids and ``names[dim][id]`` the name.
+    Because rows are sorted by salary, any masked subset is already sorted too.
+    """
+
+    def __init__(self, version: int):
+        self.version = version
+        cols = [array("i") for _ in DIMENSIONS]
+        salary = array("d")
+        qs = SalaryRecord.objects.filter(deleted_at__isnull=True).values_list(*ID_FIELDS, "salary_eur")
+        for row in qs.iterator(chunk_size=20000):
+            for col, v in zip(cols, row):
+                col.append(v)
+            salary.append(float(row[-1]))
+
+        order = np.argsort(np.frombuffer(salary, dtype=np.float64), kind="stable")
+        self.salary = np.frombuffer(salary, dtype=np.float64)[order]
+        self.codes = {d: np.frombuffer(col, dtype=np.int32)[order] for d, col in zip(DIMENSIONS, cols)}
+        self.names = {}
+        for d, codes in self.codes.items():
+            names = [None] * (int(codes.max()) + 1 if codes.size else 0)
+            for i in np.unique(codes):
+                names[i] = dictionary.name(d, int(i))
+            self.names[d] = names
+        self.lookup = {d: {n: i for i, n in enumerate(names) if n is not None} for d, names in self.names.items()}
+
+    def dim_masks(self, params) -> dict:
+        masks = {}
+        for d in DIMENSIONS:
+            vals = [v.strip() for v in params.getlist(d) if v and v.strip()]
+            if not vals:
+                continue
+            selected = np.zeros(len(self.names[d]), dtype=bool)
+            selected[[self.lookup[d][v] for v in vals if v in self.lookup[d]]] = True
+            masks[d] = selected[self.codes[d]]
+        return masks
+
+    def mask(self, params, masks=None, exclude=None):
+        if masks is None:
+            masks = self.dim_masks(params)
+        mask = None
+        for d, m in masks.items():
+            if d != exclude:
+                mask = m if mask is None else mask & m
+        return mask
+
+    def select(self, params):
+        mask = self.mask(params)
+        return mask, (self.salary if mask is None else self.salary[mask])
+
+_lock = threading.Lock()
+_current = None
+
+def get() -> Snapshot:
+    global _current
+    version = dataset.current_version()
+    snap = _current
+    if snap is not None and snap.version == version:
+        return snap
+    with _lock:
+        if _current is None or _current.version != version:
+            _current = Snapshot(version)
+        return _current
+
+def _percentile(sorted_vals, q):
+    # same interpolation as percentile_cont
+    pos = q * (len(sorted_vals) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return float(sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo))
+
+def summary(params):
+    _, vals = get().select(params)
+    cnt = int(vals.size)
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True}
+    return {
+        "count": cnt,
+        "suppressed": False,
+        "mean": float(vals.mean()),
+        "min": float(vals[0]),
+        "max": float(vals[-1]),
+        "p25": _percentile(vals, 0.25),
+        "median": _percentile(vals, 0.50),
+        "p75": _percentile(vals, 0.75),
+    }
+
+def options(params, facet_mode: str = "conjunctive"):
+    snap = get()
+    masks = snap.dim_masks(params)
+    mask = snap.mask(params, masks)
+
+    def count(d, m):
+        codes = snap.codes[d] if m is None else snap.codes[d][m]
+        return np.bincount(codes, minlength=len(snap.names[d]))
+
+    counts = {}
+    for d in DIMENSIONS:
+        n = count(d, mask)
+        if facet_mode == "disjunctive" and d in masks:
+            n_disjunctive = count(d, snap.mask(params, masks, exclude=d))
+        else:
+            n_disjunctive = n
+        counts[d] = {
+            snap.names[d][i]: (int(n[i]), int(n_disjunctive[i]))
+            for i in np.flatnonzero(n + n_disjunctive)
+        }
+    return facet_payload(counts, facet_mode)
+
+def _medians(groups, vals, n, present):
+    # a stable sort by group keeps each group's salaries in ascending order
+    by_group = vals[np.argsort(groups, kind="stable")]
+    starts = (np.cumsum(n) - n)[present]
+    pos = 0.5 * (n[present] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, n[present] - 1)
+    a, b = by_group[starts + lo], by_group[starts + hi]
+    return a + (b - a) * (pos - lo)
+
+def grouped(params, group_by: str, metric: str = "median", limit: int = 20):
+    if group_by not in ALLOWED_FILTERS:
+        raise ValueError("invalid group_by")
+
+    snap = get()
+    mask, vals = snap.select(params)
+    cnt = int(vals.size)
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True, "data": []}
+
+    groups = snap.codes[group_by] if mask is None else snap.codes[group_by][mask]
+    n = np.bincount(groups, minlength=len(snap.names[group_by]))
+    present = np.flatnonzero(n)
+    if metric == "mean":
+        values = np.bincount(groups, weights=vals, minlength=n.size)[present] / n[present]
+    else:
+        values = _medians(groups, vals, n, present)
+
+    top = np.argsort(-values, kind="stable")[:limit]
+    names = snap.names[group_by]
+    return {
+        "count": cnt,
+        "suppressed": False,
+        "data": [
+            {"key": names[present[i]], "value": float(values[i]), "n": int(n[present[i]])}
+            for i in top
+        ],
+    }
+
+def pivot(params, rows: str, cols: str):
+    snap = get()
+    mask, vals = snap.select(params)
+    row_codes, col_codes = (snap.codes[d] if mask is None else snap.codes[d][mask] for d in (rows, cols))
+    width = len(snap.names[cols])
+    groups = row_codes.astype(np.int64) * width + col_codes
+    n = np.bincount(groups, minlength=len(snap.names[rows]) * width)
+    present = np.flatnonzero(n)
+    means = np.bincount(groups, weights=vals, minlength=n.size)[present] / n[present]
+    medians = _medians(groups, vals, n, present)
+    cells = {
+        (snap.names[rows][g // width], snap.names[cols][g % width]): (int(n[g]), float(means[i]), float(medians[i]))
+        for i, g in enumerate(present)
+    }
+    return pivot_payload(rows, cols, cells)
+
+def distribution(params, bins: int = 20):
+    _, vals = get().select(params)
+    cnt = int(vals.size)
+    if suppress_if_small(cnt):
+        return {"count": cnt, "suppressed": True, "bins": [], "counts": []}
+
+    minv, maxv = float(vals[0]), float(vals[-1])
+    if minv == maxv:
+        return {"count": cnt, "suppressed": False, "bins": [minv], "counts": [cnt]}
+
+    # equal-width bins, the last one closed so the maximum is counted (as in every engine)
+    idx = np.floor((vals - minv) / (maxv - minv) * bins).astype(np.int64)
+    counts = np.bincount(np.minimum(idx, bins - 1), minlength=bins)
+    step = (maxv - minv) / bins
+    bin_edges = [minv + step * i for i in range(bins + 1)]
+    return {"count": cnt, "suppressed": False, "bins": bin_edges, "counts": [int(c) for c in counts]}
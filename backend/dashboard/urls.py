@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import dashboard_options, dashboard_summary, dashboard_grouped, dashboard_distribution, dashboard_compare
+from .views import dashboard_options, dashboard_summary, dashboard_grouped, dashboard_distribution, dashboard_pivot, dashboard_compare, dashboard_cohorts, dashboard_bundle
 
 urlpatterns = [
     path("dashboard/options", dashboard_options),
     path("dashboard/summary", dashboard_summary),
     path("dashboard/grouped", dashboard_grouped),
     path("dashboard/distribution", dashboard_distribution),
+    path("dashboard/pivot", dashboard_pivot),
     path("dashboard/compare", dashboard_compare),
+    path("dashboard/cohorts", dashboard_cohorts),
+    path("dashboard/bundle", dashboard_bundle),
 ]
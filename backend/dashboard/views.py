@@ -1,31 +1,111 @@
+import time
+
+from django.http import HttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from . import services
+from metrics.registry import render_time
+from . import payload, services
+from .http_cache import public_cache
+
+INVALID_ACCURACY = {"error": "INVALID_ACCURACY"}
+
+def _json(result):
+    # cached results arrive as finished JSON bodies; composed ones are serialized here
+    if isinstance(result, bytes):
+        return HttpResponse(result, content_type="application/json")
+    started = time.perf_counter()
+    body = payload.dumps(result)
+    render_time(time.perf_counter() - started)
+    return HttpResponse(body, content_type="application/json")
 
+def _accuracy(request):
+    # None (engine default), "exact" or "approx"; anything else is rejected by the views
+    return request.query_params.get("accuracy") or None
+
+@public_cache
 @api_view(["GET"])
 def dashboard_options(request):
-    return Response(services.options(request.query_params))
+    facet_mode = request.query_params.get("facet_mode", "conjunctive")
+    try:
+        return _json(services.options(request.query_params, facet_mode, raw=True))
+    except ValueError:
+        return Response({"error": "INVALID_FACET_MODE"}, status=status.HTTP_400_BAD_REQUEST)
 
+@public_cache
 @api_view(["GET"])
 def dashboard_summary(request):
-    return Response(services.summary(request.query_params))
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    return _json(services.summary(request.query_params, accuracy, raw=True))
 
+@public_cache
 @api_view(["GET"])
 def dashboard_grouped(request):
     group_by = request.query_params.get("group_by", "city")
     metric = request.query_params.get("metric", "median")
     limit = int(request.query_params.get("limit", "20"))
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
     try:
-        return Response(services.grouped(request.query_params, group_by, metric, limit))
+        return _json(services.grouped(request.query_params, group_by, metric, limit, accuracy, raw=True))
     except ValueError:
         return Response({"error": "INVALID_GROUP_BY"}, status=status.HTTP_400_BAD_REQUEST)
 
+@public_cache
 @api_view(["GET"])
 def dashboard_distribution(request):
     bins = int(request.query_params.get("bins", "20"))
-    return Response(services.distribution(request.query_params, bins=bins))
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    return _json(services.distribution(request.query_params, bins=bins, accuracy=accuracy, raw=True))
 
+@public_cache
+@api_view(["GET"])
+def dashboard_pivot(request):
+    rows = request.query_params.get("rows", "city")
+    cols = request.query_params.get("cols", "industry")
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return _json(services.pivot(request.query_params, rows, cols, accuracy, raw=True))
+    except ValueError:
+        return Response({"error": "INVALID_PIVOT"}, status=status.HTTP_400_BAD_REQUEST)
+
+@public_cache
 @api_view(["GET"])
 def dashboard_compare(request):
-    return Response(services.compare(request.query_params))
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    return _json(services.compare(request.query_params, accuracy=accuracy))
+
+@public_cache
+@api_view(["GET"])
+def dashboard_cohorts(request):
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return _json(services.cohorts(request.query_params, accuracy))
+    except ValueError:
+        return Response({"error": "INVALID_COHORTS"}, status=status.HTTP_400_BAD_REQUEST)
+
+@public_cache
+@api_view(["GET"])
+def dashboard_bundle(request):
+    group_by = request.query_params.get("group_by", "city")
+    metric = request.query_params.get("metric", "median")
+    limit = int(request.query_params.get("limit", "20"))
+    bins = int(request.query_params.get("bins", "20"))
+    accuracy = _accuracy(request)
+    if accuracy not in (None, *services.ACCURACY):
+        return Response(INVALID_ACCURACY, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return _json(services.bundle(request.query_params, group_by, metric, limit, bins, accuracy, raw=True))
+    except ValueError:
+        return Response({"error": "INVALID_GROUP_BY"}, status=status.HTTP_400_BAD_REQUEST)
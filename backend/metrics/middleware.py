@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import registry
+
+class RequestMetricsMiddleware:
+    """Count queries, query time, dashboard cache lookups and render time per endpoint.
+
+    The totals go to the process registry served at /api/metrics and to a Server-Timing
+    header on the response. Endpoints are labelled by URL route, so label cardinality
+    stays bounded.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with registry.attached(registry.RequestStats()) as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.route if match else "unmatched"
+        registry.record_request(endpoint, request.method, response.status_code, elapsed, stats)
+        response["Server-Timing"] = stats.server_timing(elapsed)
+        origin = request.headers.get("Origin")
+        if origin and origin in getattr(settings, "CORS_ALLOWED_ORIGINS", ()):
+            # lets the frontend's devtools show the timings cross-origin
+            response["Timing-Allow-Origin"] = origin
+        return response
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+# Process-local counters and histograms rendered in the Prometheus text format.
+# Nothing combines the processes: with several workers behind one target each scrape reaches
+# one of them, so every series carries a worker="<pid>" label. rate() then works per worker;
+# aggregate with sum without (worker) (...).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+HELP = {
+    "http_requests_total": ("counter", "Requests by endpoint, method and status."),
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint."),
+    "db_queries_per_request": ("histogram", "Database queries per request by endpoint."),
+    "db_queries_total": ("counter", "Database queries by endpoint."),
+    "db_query_seconds_total": ("counter", "Time spent in database queries by endpoint."),
+    "render_seconds_total": ("counter", "Time spent serializing responses by endpoint."),
+    "dashboard_cache_requests_total": ("counter", "Dashboard result cache lookups by key prefix and result."),
+    "dashboard_cache_tier_requests_total": ("counter", "Dashboard cache key lookups by tier (local, redis) and result."),
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters = defaultdict(float)
+_histograms = {}
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "render_seconds", "cache")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.cache = Counter()
+
+    def timed_query(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: covers raw cursors (dashboard.sql) and the ORM
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            # a request's pool threads (dashboard cohorts) add to the same stats
+            with _lock:
+                self.db_seconds += elapsed
+                self.queries += 1
+
+    def server_timing(self, total: float) -> str:
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f"render;dur={self.render_seconds * 1000:.1f}",
+        ]
+        if self.cache:
+            parts.append('cache;desc="' + " ".join(f"{k}={v}" for k, v in sorted(self.cache.items())) + '"')
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def current():
+    return getattr(_local, "stats", None)
+
+@contextmanager
+def attached(stats: RequestStats):
+    """Count this thread's queries and cache lookups into ``stats`` while the block runs.
+
+    The middleware uses it for the request thread; pool threads doing work for a request
+    use it with the request's stats, so their queries are not missed.
+    """
+    _local.stats = stats
+    try:
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats.timed_query))
+            yield stats
+    finally:
+        _local.stats = None
+
+def _observe(name, labels, value, buckets):
+    h = _histograms.get((name, labels))
+    if h is None:
+        h = _histograms[(name, labels)] = _Histogram(buckets)
+    h.observe(value)
+
+def record_request(endpoint: str, method: str, status: int, seconds: float, stats: RequestStats):
+    ep = (("endpoint", endpoint),)
+    with _lock:
+        _counters[("http_requests_total", ep + (("method", method), ("status", str(status))))] += 1
+        _observe("http_request_duration_seconds", ep, seconds, LATENCY_BUCKETS)
+        _observe("db_queries_per_request", ep, stats.queries, QUERY_BUCKETS)
+        _counters[("db_queries_total", ep)] += stats.queries
+        _counters[("db_query_seconds_total", ep)] += stats.db_seconds
+        _counters[("render_seconds_total", ep)] += stats.render_seconds
+
+def render_time(seconds: float):
+    stats = current()
+    if stats is not None:
+        stats.render_seconds += seconds
+
+def cache_event(prefix: str, result: str):
+    # result: hit | miss | stale | coalesced (waited for another caller's miss)
+    with _lock:
+        _counters[("dashboard_cache_requests_total", (("prefix", prefix), ("result", result)))] += 1
+        stats = current()
+        if stats is not None:
+            stats.cache[result] += 1
+
+def cache_tier_event(tier: str, result: str, n: int = 1):
+    # tier: local | redis; result: hit | miss
+    with _lock:
+        _counters[("dashboard_cache_tier_requests_total", (("tier", tier), ("result", result)))] += n
+
+def tier_hit_ratios() -> dict:
+    """{tier: hit ratio or None} over this process's lifetime."""
+    with _lock:
+        counts = {labels: v for (name, labels), v in _counters.items() if name == "dashboard_cache_tier_requests_total"}
+    out = {}
+    for tier in ("local", "redis"):
+        hits = counts.get((("tier", tier), ("result", "hit")), 0)
+        misses = counts.get((("tier", tier), ("result", "miss")), 0)
+        out[tier] = hits / (hits + misses) if hits + misses else None
+    return out
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+def _num(v):
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def render() -> str:
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in _histograms.items()}
+
+    worker = (("worker", str(os.getpid())),)
+    lines = []
+    for name, (kind, text) in HELP.items():
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, labels), v in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(worker + labels)} {_num(v)}")
+            continue
+        for (n, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if n != name:
+                continue
+            labels = worker + labels
+            cum = 0
+            for le, c in zip(buckets, counts):
+                cum += c
+                lines.append(f"{name}_bucket{_labels(labels, [('le', _num(le))])} {cum}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_num(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
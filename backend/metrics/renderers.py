@@ -0,0 +1,14 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from . import registry
+
+class TimedJSONRenderer(JSONRenderer):
+    # serialization time shows up as "render" in Server-Timing and render_seconds_total
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            registry.render_time(time.perf_counter() - started)
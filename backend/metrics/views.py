@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import registry
+
+def _allowed(request) -> bool:
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        return request.headers.get("Authorization") == f"Bearer {token}"
+    if settings.DEBUG:
+        return True
+    # no scrape token in production: only ADMIN accounts may read the metrics
+    try:
+        auth = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return auth is not None and getattr(auth[0], "role", None) == "ADMIN"
+
+@require_GET
+def metrics(request):
+    if not _allowed(request):
+        return JsonResponse({"error": "FORBIDDEN"}, status=403)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
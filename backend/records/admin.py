@@ -1,8 +1,19 @@
 from django.contrib import admin
-from .models import SalaryRecord
+from .models import City, ExperienceCategory, Industry, Major, Occupation, SalaryRecord, University
 
 @admin.register(SalaryRecord)
 class SalaryRecordAdmin(admin.ModelAdmin):
     list_display = ("record_id","user","city","industry","occupation","salary_eur","submission_date","deleted_at","batch")
-    search_fields = ("record_id","user__user_id","city","industry","occupation","university","major")
+    list_select_related = ("user","city","industry","occupation","batch")
+    search_fields = ("record_id","user__user_id","city__name","industry__name","occupation__name","university__name","major__name")
     list_filter = ("city","industry","experience_category","deleted_at","batch")
+    raw_id_fields = ("user","batch")
+
+@admin.register(City, ExperienceCategory, Industry, Major, Occupation, University)
+class DimensionAdmin(admin.ModelAdmin):
+    list_display = ("id","name")
+    search_fields = ("name",)
+
+    def get_readonly_fields(self, request, obj=None):
+        # names are cached per process by records.dictionary and must not change
+        return ("name",) if obj else ()
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from django.db import IntegrityError, transaction
+
+from .models import City, ExperienceCategory, Industry, Major, Occupation, University
+
+# SalaryRecord dimension -> lookup model
+LOOKUPS = {
+    "university": University,
+    "major": Major,
+    "industry": Industry,
+    "occupation": Occupation,
+    "experience_category": ExperienceCategory,
+    "city": City,
+}
+MISS_TTL = 5.0  # seconds a name missing from its lookup table is remembered as missing
+MAX_MISSES = 10000  # per dimension; the names come from query strings, so the set is bounded
+
+class Dictionary:
+    """Process-level cache of the dimension lookup tables.
+
+    Lookup rows are never renamed or deleted, so a cached pair stays valid for the life of
+    the process. An unknown name is looked up on its own (it may have been created by another
+    process since) and a miss is remembered for MISS_TTL seconds; an unknown id reloads the
+    table. A value created inside a transaction is only cached once that transaction commits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {d: {} for d in LOOKUPS}
+        self._names = {d: {} for d in LOOKUPS}
+        self._misses = {d: {} for d in LOOKUPS}  # name -> time.monotonic() it stops counting
+        self._local = threading.local()
+
+    def _pending(self) -> set:
+        if not hasattr(self._local, "pending"):
+            self._local.pending = set()
+        return self._local.pending
+
+    def _reload(self, dim: str):
+        rows = list(LOOKUPS[dim].objects.values_list("id", "name"))
+        pending = self._pending()
+        with self._lock:
+            for i, name in rows:
+                self._names[dim][i] = name
+                if (dim, name) not in pending:
+                    self._ids[dim][name] = i
+
+    def _remember(self, dim: str, name: str, i: int):
+        with self._lock:
+            self._ids[dim][name] = i
+            self._names[dim][i] = name
+            self._misses[dim].pop(name, None)
+
+    def id(self, dim: str, name: str):
+        i = self._ids[dim].get(name)
+        if i is not None:
+            return i
+        if self._misses[dim].get(name, 0) > time.monotonic():
+            return None
+        # one indexed lookup, so a value another process just added is found
+        i = LOOKUPS[dim].objects.filter(name=name).values_list("id", flat=True).first()
+        if i is None:
+            with self._lock:
+                if len(self._misses[dim]) >= MAX_MISSES:
+                    self._misses[dim].clear()
+                self._misses[dim][name] = time.monotonic() + MISS_TTL
+        elif (dim, name) not in self._pending():
+            self._remember(dim, name, i)
+        return i
+
+    def ids(self, dim: str, names) -> list:
+        return [i for i in (self.id(dim, n) for n in names) if i is not None]
+
+    def name(self, dim: str, i: int) -> str:
+        name = self._names[dim].get(i)
+        if name is None:
+            self._reload(dim)
+            name = self._names[dim].get(i)
+        return name
+
+    def resolve(self, dim: str, name: str) -> int:
+        """Id for ``name``, inserting it into the lookup table if it is new."""
+        i = self._ids[dim].get(name)
+        if i is not None:
+            return i
+        model = LOOKUPS[dim]
+        i = model.objects.filter(name=name).values_list("id", flat=True).first()
+        if i is None:
+            try:
+                with transaction.atomic():
+                    i = model.objects.create(name=name).id
+            except IntegrityError:
+                # created concurrently and already committed
+                i = model.objects.get(name=name).id
+            else:
+                key = (dim, name)
+                self._pending().add(key)
+
+                def committed():
+                    self._pending().discard(key)
+                    self._remember(dim, name, i)
+
+                transaction.on_commit(committed)
+                return i
+        if (dim, name) not in self._pending():
+            self._remember(dim, name, i)
+        return i
+
+    def encode(self, values: dict, memo: dict | None = None) -> dict:
+        """{dimension: name} -> {"<dimension>_id": id}; ``memo`` avoids repeat lookups within one transaction."""
+        out = {}
+        for dim, name in values.items():
+            key = (dim, name)
+            i = memo.get(key) if memo is not None else None
+            if i is None:
+                i = self.resolve(dim, name)
+                if memo is not None:
+                    memo[key] = i
+            out[f"{dim}_id"] = i
+        return out
+
+dictionary = Dictionary()
@@ -0,0 +1,125 @@
+import math
+import queue
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import Account, Person
+from audit import services as audit
+from dashboard.events import ROW_FIELDS, records_removed
+from records.models import SalaryRecord
+from records.services import YEARLY_LIMIT, submission_year, submissions_count_for_year
+from records.synthetic import PROFILE_FIELDS, SalaryModel, default_sample
+
+def _percentile(sorted_vals, q):
+    # nearest rank
+    return sorted_vals[max(0, math.ceil(q * len(sorted_vals)) - 1)] if sorted_vals else float("nan")
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent POST /api/my/submissions/submit requests, several per account at once, then "
+        "check that no account got more than the yearly limit and that the counters match the records."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--attempts", type=int, default=5, help="Submits per account, sent concurrently.")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--sample", default=None, help="CSV the submitted records are modelled on (default: demo_data.csv).")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["attempts"] < 1 or options["threads"] < 1:
+            raise CommandError("--users, --attempts and --threads must be positive")
+        sample = options["sample"] or default_sample()
+        try:
+            model = SalaryModel(sample, seed=options["seed"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"cannot read sample {sample}: {e}")
+        run_id = uuid.uuid4().hex[:8]
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if "*" not in h), "localhost")
+        users = [
+            Account.objects.create_user(email=f"bench-{run_id}-{i}@example.com") for i in range(options["users"])
+        ]
+        tokens = {u.uid: f"Bearer {RefreshToken.for_user(u).access_token}" for u in users}
+
+        # each account's attempts sit next to each other in the queue, so they run at the same time
+        tasks = queue.Queue()
+        for u in users:
+            for _ in range(options["attempts"]):
+                p, salary, _ = next(model.rows(1))
+                tasks.put((u.uid, {**dict(zip(PROFILE_FIELDS, p)), "salary_eur": str(salary)}))
+        results = []  # (status code, latency ms)
+        lock = threading.Lock()
+
+        def worker():
+            client = Client(SERVER_NAME=host)
+            try:
+                while True:
+                    try:
+                        uid, body = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        status = client.post("/api/my/submissions/submit", body, content_type="application/json",
+                                             HTTP_AUTHORIZATION=tokens[uid]).status_code
+                    except Exception as e:
+                        self.stderr.write(f"submit failed: {e}")
+                        status = 500
+                    with lock:
+                        results.append((status, (time.perf_counter() - started) * 1000))
+            finally:
+                connections.close_all()
+
+        try:
+            started = time.perf_counter()
+            threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            self._report(users, results, elapsed, options)
+        finally:
+            self._cleanup(list(tokens))
+
+    def _report(self, users, results, elapsed, options):
+        created = sum(s == 201 for s, _ in results)
+        limited = sum(s == 403 for s, _ in results)
+        errors = len(results) - created - limited
+        latencies = sorted(ms for _, ms in results)
+        self.stdout.write(
+            f"{len(results)} submits from {options['threads']} threads in {elapsed:.2f} s "
+            f"({len(results) / elapsed:,.0f}/s): {created} created, {limited} limited, {errors} errors; "
+            f"p50 {_percentile(latencies, 0.5):.1f} ms, p95 {_percentile(latencies, 0.95):.1f} ms"
+        )
+        year = submission_year()
+        expected = min(options["attempts"], YEARLY_LIMIT)
+        wrong = []
+        for u in users:
+            records = SalaryRecord.objects.filter(user_id=u.uid, deleted_at__isnull=True).count()
+            counter = submissions_count_for_year(u.uid, year)
+            if records > YEARLY_LIMIT or counter != records or (not errors and records != expected):
+                wrong.append(f"user {u.uid}: {records} records, counter {counter}")
+        if wrong:
+            raise CommandError(f"{len(wrong)} accounts inconsistent: " + "; ".join(wrong[:10]))
+        self.stdout.write(self.style.SUCCESS(
+            f"all {len(users)} accounts have at most {YEARLY_LIMIT} records and matching counters"
+        ))
+
+    def _cleanup(self, uids):
+        audit.flush()
+        records = SalaryRecord.objects.filter(user_id__in=uids, deleted_at__isnull=True)
+        with transaction.atomic():
+            rows = list(records.values_list("record_id", *ROW_FIELDS))
+            SalaryRecord.objects.filter(record_id__in=[r[0] for r in rows]).update(deleted_at=timezone.now())
+            records_removed([r[1:] for r in rows])
+        Person.objects.filter(user_id__in=uids).delete()  # cascades to accounts, records and counters
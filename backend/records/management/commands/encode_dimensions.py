@@ -0,0 +1,90 @@
+import copy
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from dashboard import rollups
+from dashboard.models import RollupBucket, RollupCell
+from records.dictionary import LOOKUPS
+from records.models import SalaryRecord
+
+class Command(BaseCommand):
+    help = (
+        "Convert a database created before the dimension lookup tables: fill them from the distinct text "
+        "values, backfill SalaryRecord.<dimension>_id, drop the text columns and recreate the rollup tables. "
+        "Run it before migrate; it does nothing on an empty or already encoded database."
+    )
+
+    def handle(self, *args, **options):
+        table = SalaryRecord._meta.db_table
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+            columns = set()
+            if table in tables:
+                columns = {c.name for c in connection.introspection.get_table_description(cursor, table)}
+        # a text column still named after the dimension means the table predates the lookups
+        legacy = [dim for dim in LOOKUPS if dim in columns]
+        if not legacy:
+            self.stdout.write("no text dimension columns to convert")
+            return
+
+        qn = connection.ops.quote_name
+        fields = {dim: SalaryRecord._meta.get_field(dim) for dim in legacy}
+        nullable = {}
+        with connection.schema_editor() as editor:
+            for dim in legacy:
+                lookup = LOOKUPS[dim]._meta.db_table
+                if lookup not in tables:
+                    editor.create_model(LOOKUPS[dim])
+                editor.execute(
+                    f"INSERT INTO {qn(lookup)} (name) SELECT DISTINCT {qn(dim)} FROM {qn(table)} "
+                    f"WHERE {qn(dim)} NOT IN (SELECT name FROM {qn(lookup)})"
+                )
+                # added nullable, backfilled, then tightened to the model's NOT NULL
+                nullable[dim] = copy.copy(fields[dim])
+                nullable[dim].null = True
+                editor.add_field(SalaryRecord, nullable[dim])
+
+            # one pass over the table for all dimensions
+            assignments = ", ".join(
+                f"{qn(fields[dim].column)} = (SELECT l.id FROM {qn(LOOKUPS[dim]._meta.db_table)} l "
+                f"WHERE l.name = {qn(table)}.{qn(dim)})"
+                for dim in legacy
+            )
+            editor.execute(f"UPDATE {qn(table)} SET {assignments}")
+
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, table)
+            for name, info in constraints.items():
+                if info["index"] and not info["primary_key"] and set(info["columns"] or ()) & set(legacy):
+                    editor.execute(f"DROP INDEX {qn(name)}")
+            for dim in legacy:
+                text = models.CharField(max_length=255)
+                text.set_attributes_from_name(dim)
+                text.model = SalaryRecord
+                editor.remove_field(SalaryRecord, text)
+            # after the text columns are gone: SQLite rebuilds the table from the model here
+            for dim in legacy:
+                editor.alter_field(SalaryRecord, nullable[dim], fields[dim])
+
+            # rollups are derived data: recreate them keyed by id rather than converting
+            if RollupCell._meta.db_table in tables:
+                editor.delete_model(RollupBucket)
+                editor.delete_model(RollupCell)
+            editor.create_model(RollupCell)
+            editor.create_model(RollupBucket)
+
+        # the partial indexes on the dimensions went with the text columns
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.get_constraints(cursor, table))
+        with connection.schema_editor() as editor:
+            for index in SalaryRecord._meta.indexes:
+                if index.name not in existing:
+                    editor.add_index(SalaryRecord, index)
+
+        for dim in legacy:
+            self.stdout.write(f"{dim}: {LOOKUPS[dim].objects.count()} values")
+        if rollups.enabled():
+            rollups.rebuild()
+            self.stdout.write(f"rebuilt {RollupCell.objects.count()} rollup cells")
+        self.stdout.write(self.style.SUCCESS(f"Encoded {len(legacy)} dimension columns of {table}."))
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Person
+from admin_import.models import ImportBatch
+from dashboard import dataset, rollups
+from records.dictionary import dictionary
+from records.models import SalaryRecord
+from records.synthetic import PROFILE_FIELDS, SalaryModel, default_sample
+
+class Command(BaseCommand):
+    help = "Bulk insert synthetic salary records that follow the distributions of demo_data.csv."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--sample", default=None, help="CSV to learn distributions from (default: demo_data.csv).")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--days", type=int, default=365, help="Spread submission dates over this many days.")
+        parser.add_argument("--skip-rollups", action="store_true", help="Do not rebuild the dashboard rollups afterwards.")
+
+    def handle(self, *args, **options):
+        sample = options["sample"] or default_sample()
+        try:
+            model = SalaryModel(sample, seed=options["seed"], days=options["days"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"cannot read sample {sample}: {e}")
+
+        total, size = options["rows"], options["batch_size"]
+        batch = ImportBatch.objects.create(filename=f"synthetic:{total}", status="RUNNING", rows_total=total)
+        rows = model.rows(total)
+        values = {f: set() for f in PROFILE_FIELDS}
+        memo = {}
+        started = time.monotonic()
+        done = 0
+        while done < total:
+            chunk = [next(rows) for _ in range(min(size, total - done))]
+            with transaction.atomic():
+                people = Person.objects.bulk_create([Person() for _ in chunk])
+                SalaryRecord.objects.bulk_create([
+                    SalaryRecord(user=person, batch=batch, **dictionary.encode(dict(zip(PROFILE_FIELDS, p)), memo),
+                                 salary_eur=salary, submission_date=when)
+                    for person, (p, salary, when) in zip(people, chunk)
+                ])
+            for p, _, _ in chunk:
+                for f, v in zip(PROFILE_FIELDS, p):
+                    values[f].add(v)
+            done += len(chunk)
+            if done % (size * 20) < size or done == total:
+                rate = done / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f"{done}/{total} rows ({rate:,.0f} rows/s)")
+
+        batch.rows_success = done
+        batch.status = "SUCCESS"
+        batch.save(update_fields=["rows_success", "status"])
+        dataset.bump(values)
+
+        if options["skip_rollups"] and rollups.enabled():
+            self.stdout.write(self.style.WARNING("Rollups not rebuilt; run rebuild_rollups before using approximate results."))
+        elif rollups.enabled():
+            cells, _ = rollups.rebuild()
+            self.stdout.write(f"Rebuilt {cells} rollup cells.")
+        self.stdout.write(self.style.SUCCESS(f"Inserted {done} records as import batch {batch.batch_id}."))
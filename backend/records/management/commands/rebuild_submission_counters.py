@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from records import services
+from records.models import SubmissionCounter
+
+class Command(BaseCommand):
+    help = "Recompute records_submissioncounter (yearly submission limits) from the live records of every account."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--if-empty", action="store_true",
+            help="Only fill the table when it is empty, creating it if missing (the Docker image runs this on start).",
+        )
+
+    def handle(self, *args, **options):
+        if options["if_empty"]:
+            table = SubmissionCounter._meta.db_table
+            with connection.cursor() as cursor:
+                exists = table in connection.introspection.table_names(cursor)
+            if not exists:
+                # a database migrated before the counters: the regenerated records migration is already applied
+                with connection.schema_editor() as editor:
+                    editor.create_model(SubmissionCounter)
+            elif SubmissionCounter.objects.exists():
+                self.stdout.write("submission counters already filled")
+                return
+        counters = services.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {counters} submission counters."))
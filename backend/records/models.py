@@ -10,18 +10,57 @@ EXPERIENCE_CHOICES = [
     ("above 10 years", "above 10 years"),
 ]
 
+class Dimension(models.Model):
+    # dictionary-encoded dimension value; rows are only ever added (see records.dictionary)
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+class University(Dimension):
+    pass
+
+class Major(Dimension):
+    pass
+
+class Industry(Dimension):
+    class Meta(Dimension.Meta):
+        verbose_name_plural = "industries"
+
+class Occupation(Dimension):
+    pass
+
+class ExperienceCategory(Dimension):
+    class Meta(Dimension.Meta):
+        verbose_name_plural = "experience categories"
+
+class City(Dimension):
+    class Meta(Dimension.Meta):
+        verbose_name_plural = "cities"
+
+def live_index(fields, name):
+    # partial covering index over live rows: the dashboard filters deleted_at IS NULL and reads salary_eur
+    include = [] if fields == ["salary_eur"] else ["salary_eur"]
+    return models.Index(fields=fields, name=name, condition=models.Q(deleted_at__isnull=True), include=include)
+
 class SalaryRecord(models.Model):
     record_id = models.BigAutoField(primary_key=True)
     user = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="salary_records")
     batch = models.ForeignKey(ImportBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name="records")
 
-    university = models.CharField(max_length=255)
-    major = models.CharField(max_length=255)
-    industry = models.CharField(max_length=255)
-    occupation = models.CharField(max_length=255)
-    experience_category = models.CharField(max_length=32, choices=EXPERIENCE_CHOICES)
+    # integer keys into the lookup tables; the live_index entries below cover them
+    university = models.ForeignKey(University, on_delete=models.PROTECT, related_name="+", db_index=False)
+    major = models.ForeignKey(Major, on_delete=models.PROTECT, related_name="+", db_index=False)
+    industry = models.ForeignKey(Industry, on_delete=models.PROTECT, related_name="+", db_index=False)
+    occupation = models.ForeignKey(Occupation, on_delete=models.PROTECT, related_name="+", db_index=False)
+    experience_category = models.ForeignKey(ExperienceCategory, on_delete=models.PROTECT, related_name="+", db_index=False)
 
-    city = models.CharField(max_length=128)
+    city = models.ForeignKey(City, on_delete=models.PROTECT, related_name="+", db_index=False)
     salary_eur = models.DecimalField(max_digits=12, decimal_places=2)
 
     submission_date = models.DateTimeField()  # server assigned
@@ -30,17 +69,36 @@ class SalaryRecord(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["city"]),
-            models.Index(fields=["industry"]),
-            models.Index(fields=["occupation"]),
-            models.Index(fields=["major"]),
-            models.Index(fields=["university"]),
-            models.Index(fields=["experience_category"]),
             models.Index(fields=["salary_eur"]),
             models.Index(fields=["submission_date"]),
             models.Index(fields=["user", "submission_date"]),
             models.Index(fields=["batch"]),
+            # index-only scans for the common dashboard filters (backends without INCLUDE skip these)
+            live_index(["salary_eur"], "rec_live_salary"),
+            live_index(["city"], "rec_live_city"),
+            live_index(["industry"], "rec_live_industry"),
+            live_index(["occupation"], "rec_live_occupation"),
+            live_index(["major"], "rec_live_major"),
+            live_index(["university"], "rec_live_university"),
+            live_index(["experience_category"], "rec_live_experience"),
+            live_index(["industry", "occupation"], "rec_live_industry_occ"),
+            live_index(["city", "industry"], "rec_live_city_industry"),
         ]
 
     def __str__(self):
         return f"Record({self.record_id}) user={self.user_id} {self.salary_eur} EUR"
+
+class SubmissionCounter(models.Model):
+    # live records an account submitted per calendar year (local time); maintained by records.services
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="+", db_index=False)  # leads uniq_submission_counter
+    year = models.SmallIntegerField()
+    count = models.SmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year"], name="uniq_submission_counter"),
+        ]
+
+    def __str__(self):
+        return f"SubmissionCounter(user={self.user_id}, {self.year}) = {self.count}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .dictionary import dictionary
 from .models import SalaryRecord, EXPERIENCE_CHOICES
 
 class SalaryRecordCreateSerializer(serializers.Serializer):
@@ -10,8 +11,23 @@ class SalaryRecordCreateSerializer(serializers.Serializer):
     city = serializers.CharField(max_length=128)
     salary_eur = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
 
+class DimensionField(serializers.ReadOnlyField):
+    # dimension name for a dictionary-encoded column, without joining the lookup table
+    def __init__(self, dim, **kwargs):
+        self.dim = dim
+        super().__init__(source=f"{dim}_id", **kwargs)
+
+    def to_representation(self, value):
+        return dictionary.name(self.dim, value)
+
 class SalaryRecordSerializer(serializers.ModelSerializer):
     user_id = serializers.IntegerField(source="user.user_id", read_only=True)
+    university = DimensionField("university")
+    major = DimensionField("major")
+    industry = DimensionField("industry")
+    occupation = DimensionField("occupation")
+    experience_category = DimensionField("experience_category")
+    city = DimensionField("city")
 
     class Meta:
         model = SalaryRecord
@@ -1,22 +1,64 @@
-from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
 from django.db.models.functions import ExtractYear
-from django.db.models import Count
-from .models import SalaryRecord
+from django.utils import timezone
+
+from .models import SalaryRecord, SubmissionCounter
+
+YEARLY_LIMIT = 2
 
 class UploadLimitReached(Exception):
     pass
 
+def submission_year(when=None) -> int:
+    return timezone.localtime(when or timezone.now()).year
+
 def submissions_count_for_year(user_id: int, year: int) -> int:
-    return SalaryRecord.objects.filter(
-        user_id=user_id,
-        deleted_at__isnull=True,
-        submission_date__year=year,
-    ).count()
-
-def enforce_yearly_limit(user_id: int, now=None):
-    now = timezone.localtime(now or timezone.now())
-    year = now.year
-    cnt = submissions_count_for_year(user_id, year)
-    if cnt >= 2:
-        raise UploadLimitReached(year)
-    return year, cnt
+    try:
+        return SubmissionCounter.objects.values_list("count", flat=True).get(user_id=user_id, year=year)
+    except SubmissionCounter.DoesNotExist:
+        return 0
+
+def reserve_submission(user_id: int, now=None) -> int:
+    """Count one more submission for the user this year, or raise UploadLimitReached(year).
+
+    Call inside the transaction that inserts the record. The conditional UPDATE only matches a
+    counter below YEARLY_LIMIT and row-locks it until commit, so concurrent submits cannot
+    overshoot; a missing counter is INSERTed, and losing that race to another submit means
+    retrying the UPDATE once.
+    """
+    year = submission_year(now)
+    counters = SubmissionCounter.objects.filter(user_id=user_id, year=year)
+    for _ in range(2):
+        if counters.filter(count__lt=YEARLY_LIMIT).update(count=F("count") + 1):
+            return year
+        try:
+            with transaction.atomic():
+                SubmissionCounter.objects.create(user_id=user_id, year=year, count=1)
+            return year
+        except IntegrityError:
+            pass  # the counter exists: at the limit, or created concurrently
+    raise UploadLimitReached(year)
+
+def release_submission(record):
+    """Uncount a deleted record; call in the transaction that sets its deleted_at."""
+    SubmissionCounter.objects.filter(
+        user_id=record.user_id, year=submission_year(record.submission_date), count__gt=0,
+    ).update(count=F("count") - 1)
+
+def rebuild_counters() -> int:
+    """Recompute every counter from the live records of account holders; returns the counters written."""
+    counts = (
+        SalaryRecord.objects.filter(deleted_at__isnull=True, user__account__isnull=False)
+        .annotate(year=ExtractYear("submission_date"))
+        .values("user_id", "year")
+        .annotate(n=Count("record_id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        SubmissionCounter.objects.all().delete()
+        created = SubmissionCounter.objects.bulk_create(
+            (SubmissionCounter(user_id=c["user_id"], year=c["year"], count=c["n"]) for c in counts.iterator()),
+            batch_size=5000,
+        )
+    return len(created)
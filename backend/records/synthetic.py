@@ -0,0 +1,76 @@
+import csv
+import math
+import random
+from collections import defaultdict
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.utils import timezone
+
+# demo_data.csv columns describing a profile, in SalaryRecord field order
+PROFILE_COLUMNS = ("University", "Major", "Industry", "Occupation", "Experience", "City")
+PROFILE_FIELDS = ("university", "major", "industry", "occupation", "experience_category", "city")
+
+def default_sample():
+    return settings.BASE_DIR.parent / "demo_data.csv"
+
+class SalaryModel:
+    """Synthetic salary records that follow the distributions of a demo_data.csv style sample.
+
+    Profiles are drawn from the sample's joint frequencies, so correlations such as
+    university/major are kept; a share of ``mix`` profiles is recombined from per-column
+    frequencies to add unseen combinations. Salaries are log-normal with the log mean/sd of
+    the sample rows with the same occupation and experience (falling back to occupation,
+    then to all rows).
+    """
+
+    def __init__(self, path=None, seed=None, mix: float = 0.1, days: int = 365):
+        self.rng = random.Random(seed)
+        self.mix = mix
+        self.days = days
+        with open(path or default_sample(), newline="", encoding="utf-8-sig") as f:
+            sample = list(csv.DictReader(f))
+        if not sample:
+            raise ValueError("empty sample")
+
+        self.profiles = [tuple(row[c].strip() for c in PROFILE_COLUMNS) for row in sample]
+        self.columns = list(zip(*self.profiles))
+        logs = defaultdict(list)
+        for profile, row in zip(self.profiles, sample):
+            v = math.log(float(row["Salary"]))
+            logs[(profile[3], profile[4])].append(v)
+            logs[profile[3]].append(v)
+            logs[None].append(v)
+        self.salary = {k: _log_params(vs) for k, vs in logs.items() if len(vs) >= 5}
+
+    def profile(self):
+        if self.rng.random() < self.mix:
+            return tuple(self.rng.choice(col) for col in self.columns)
+        return self.rng.choice(self.profiles)
+
+    def salary_for(self, profile) -> int:
+        mu, sigma = self.salary.get((profile[3], profile[4])) or self.salary.get(profile[3]) or self.salary[None]
+        return max(1, round(self.rng.lognormvariate(mu, sigma)))
+
+    def rows(self, n: int):
+        """Yield n (profile tuple, salary, submission datetime) rows."""
+        end = timezone.now()
+        span = self.days * 86400
+        for _ in range(n):
+            p = self.profile()
+            yield p, self.salary_for(p), end - timedelta(seconds=self.rng.randrange(span))
+
+    def csv_text(self, n: int) -> str:
+        # an import file in the admin CSV format
+        out = StringIO()
+        w = csv.writer(out)
+        w.writerow(["email", *PROFILE_COLUMNS, "Salary", "Submission_Date"])
+        for i, (p, salary, when) in enumerate(self.rows(n)):
+            w.writerow([f"synthetic{i}@example.com", *p, salary, when.strftime("%Y-%m-%d")])
+        return out.getvalue()
+
+def _log_params(vs):
+    mu = sum(vs) / len(vs)
+    sigma = math.sqrt(sum((v - mu) ** 2 for v in vs) / max(len(vs) - 1, 1))
+    return mu, sigma
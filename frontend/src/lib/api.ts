@@ -56,11 +56,16 @@ export const api = {
   grouped: (qs: string) => request(`/dashboard/grouped${qs ? `?${qs}` : ""}`, { method: "GET" }),
   distribution: (qs: string) => request(`/dashboard/distribution${qs ? `?${qs}` : ""}`, { method: "GET" }),
   compare: (qs: string) => request(`/dashboard/compare${qs ? `?${qs}` : ""}`, { method: "GET" }),
+  cohorts: (qs: string) => request(`/dashboard/cohorts${qs ? `?${qs}` : ""}`, { method: "GET" }),
+  pivot: (qs: string) => request(`/dashboard/pivot${qs ? `?${qs}` : ""}`, { method: "GET" }),
+  bundle: (qs: string) => request(`/dashboard/bundle${qs ? `?${qs}` : ""}`, { method: "GET" }),
 
   // admin
   adminImportsList: () => request("/admin/imports/list", { method: "GET" }),
   adminDeleteRecord: (recordId: number) => request(`/admin/records/${recordId}`, { method: "DELETE" }),
   adminDeleteBatch: (batchId: number) => request(`/admin/imports/${batchId}`, { method: "DELETE" }),
+  adminImportStatus: (batchId: number) => request(`/admin/imports/${batchId}/status`, { method: "GET" }),
+  adminImportResume: (batchId: number) => request(`/admin/imports/${batchId}/resume`, { method: "POST" }),
   adminImportCsv: async (file: File) => {
     const { access } = getTokens();
     const form = new FormData();
@@ -21,18 +21,42 @@ export default function AdminImportsPage() {
 
   React.useEffect(() => { load(); }, []);
 
+  // imports run in a background worker; poll the batch until it finishes
+  async function watch(batchId: number) {
+    for (;;) {
+      const s = await api.adminImportStatus(batchId);
+      const pct = s.progress == null ? "" : ` ${Math.round(s.progress * 100)}%`;
+      const rate = s.rows_per_second ? `, ${Math.round(s.rows_per_second)} rows/s` : "";
+      setMsg(`Batch ${batchId}: ${s.status}${pct} (${s.rows_processed} rows${rate})`);
+      if (!["QUEUED", "RUNNING"].includes(s.status)) break;
+      await new Promise((r) => setTimeout(r, 2000));
+    }
+    await load();
+  }
+
   async function upload() {
     if (!file) return;
     setErr(""); setMsg("");
     try {
       const res = await api.adminImportCsv(file);
-      setMsg(`Imported batch ${res.batch_id} (${res.status})`);
+      setMsg(`Queued batch ${res.batch_id}`);
       await load();
+      await watch(res.batch_id);
     } catch (e: any) {
       setErr(e.message || "Import failed");
     }
   }
 
+  async function resume(batchId: number) {
+    setErr(""); setMsg("");
+    try {
+      await api.adminImportResume(batchId);
+      await watch(batchId);
+    } catch (e: any) {
+      setErr(e.message || "Resume failed");
+    }
+  }
+
   async function delBatch(batchId: number) {
     if (!confirm(`Delete batch ${batchId} (soft-delete its records)?`)) return;
     setErr(""); setMsg("");
@@ -81,10 +105,13 @@ export default function AdminImportsPage() {
               {imports.map((b) => (
                 <tr key={b.batch_id} className="border-t border-black/5">
                   <td className="py-2">{b.batch_id}</td>
-                  <td>{b.status}</td>
+                  <td>{b.status}{b.error ? ` (${b.error})` : ""}</td>
                   <td>{b.rows_success}/{b.rows_total} (failed {b.rows_failed})</td>
                   <td>{new Date(b.created_at).toLocaleString()}</td>
                   <td className="text-right">
+                    {b.status === "FAILED" && b.error ? (
+                      <Button variant="outline" size="sm" className="mr-2" onClick={() => resume(b.batch_id)}>Resume</Button>
+                    ) : null}
                     <Button variant="destructive" size="sm" onClick={() => delBatch(b.batch_id)}>Delete batch</Button>
                   </td>
                 </tr>
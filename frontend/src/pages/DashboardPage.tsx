@@ -55,15 +55,15 @@ export default function DashboardPage() {
     let alive = true;
     setLoading(true);
     setError("");
-    Promise.all([
-      api.options(qs),
-      api.summary(qs),
-      api.grouped(new URLSearchParams({ ...Object.fromEntries(new URLSearchParams(qs)), group_by: groupBy, metric: "median", limit: "20" } as any).toString()),
-    ]).then(([o, s, g]) => {
+    const p = new URLSearchParams(qs);
+    p.set("group_by", groupBy);
+    p.set("metric", "median");
+    p.set("limit", "20");
+    api.bundle(p.toString()).then((b) => {
       if (!alive) return;
-      setOptions(o);
-      setSummary(s);
-      setGrouped(g);
+      setOptions(b.options);
+      setSummary(b.summary);
+      setGrouped(b.grouped);
     }).catch((e) => {
       if (!alive) return;
       setError(e.message || "Failed to load");